@@ -0,0 +1,86 @@
+"""
+Compares the load modes of LocalLLM (auto, bfloat16, int8): memory estimate, load time, resident memory and generation speed.
+
+    python benchmarks/llm_load_modes.py                                  # Qwen/Qwen3-0.6B, every mode, on CPU
+    python benchmarks/llm_load_modes.py --model Qwen/Qwen3-4B --modes bfloat16 int8
+    python benchmarks/llm_load_modes.py --tokens 128 --prompts 5
+
+Each mode runs in a fresh process, so the RSS of one model does not count towards the next.
+RSS is the resident memory after loading, peak RSS includes the loading itself (psutil gives the current RSS,
+without it only the peak is reported on POSIX systems).
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from freeai_utils.localLLM import LocalLLM
+
+MODES = ("auto", "bfloat16", "int8")
+
+PROMPTS = ["Explain what a hash table is in two sentences.",
+           "Write a short poem about the sea.",
+           "List three uses of a command line.",
+           "What is the difference between a list and a tuple in Python?",
+           "Summarize the plot of a detective story in a few lines."]
+
+def rss_bytes() -> tuple:
+    """Returns (current RSS, peak RSS) of this process in bytes, None when unknown."""
+    current = peak = None
+    try:
+        import psutil
+        current = psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024 #kilobytes on Linux, bytes on macOS
+    except ImportError:
+        pass
+    return current, peak
+
+def run(model: str, mode: str, device: str, tokens: int, prompts: int) -> dict:
+    """
+    Loads the model with one mode and generates tokens for each prompt, thinking off so every token is answer text.
+    Only the public API is used: generated tokens are counted by encoding each answer again with llm.tokenizer.
+    """
+    start = time.perf_counter()
+    llm = LocalLLM(model_name=model, preferred_device=device, load_mode=mode)
+    load_seconds = time.perf_counter() - start
+    rss, _ = rss_bytes()
+
+    llm.ask(PROMPTS[0], enable_thinking=False, max_new_tokens=tokens) #warm up
+    generated = 0
+    start = time.perf_counter()
+    for i in range(prompts):
+        content, _ = llm.ask(PROMPTS[i % len(PROMPTS)], enable_thinking=False, max_new_tokens=tokens)
+        generated += len(llm.tokenizer(content, add_special_tokens=False).input_ids)
+    seconds = time.perf_counter() - start
+    _, peak = rss_bytes()
+    return {"load_seconds": load_seconds, "rss": rss, "peak_rss": peak, "tokens": generated, "tokens_per_sec": generated / seconds if seconds else 0.0}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="Qwen/Qwen3-0.6B")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--tokens", type=int, default=64, help="max new tokens per prompt")
+    parser.add_argument("--prompts", type=int, default=3, help="prompts generated per mode")
+    args = parser.parse_args()
+
+    gb = lambda value: f"{value / 1024 ** 3:.2f}" if value is not None else "-"
+    print(f"{args.model} on {args.device}")
+    print(f"{'mode':<10}{'estimate GB':>12}{'load s':>8}{'RSS GB':>8}{'peak GB':>9}{'tokens':>8}{'tokens/s':>10}")
+    context = multiprocessing.get_context("spawn")
+    for mode in args.modes:
+        estimate = LocalLLM.estimate_memory(args.model, mode)
+        with context.Pool(1) as pool:
+            result = pool.apply(run, (args.model, mode, args.device, args.tokens, args.prompts))
+        print(f"{mode:<10}{gb(estimate):>12}{result['load_seconds']:>8.1f}{gb(result['rss']):>8}{gb(result['peak_rss']):>9}"
+              f"{result['tokens']:>8}{result['tokens_per_sec']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares the text extraction throughput of the PDF backends used by PDF_DOCX_Reader (pymupdf, pypdf, pdfplumber).
+
+    python benchmarks/pdf_backends.py                      # generated corpus: 5 files of 50 text-heavy pages
+    python benchmarks/pdf_backends.py --files 10 --pages 200
+    python benchmarks/pdf_backends.py --dir your_folder    # your own PDFs instead
+
+"auto" is PDF_DOCX_Reader(backend="auto"), it includes the time spent sampling pages to pick a backend.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import fitz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from freeai_utils.pdf_docx_reader import PDF_DOCX_Reader, _PDF_BACKENDS
+from freeai_utils.document_ingest import collect_file_paths
+
+WORDS = ("document extraction backend throughput page text layout column table figure "
+         "section paragraph reference model search index result value sample").split()
+
+def generate_corpus(directory: str, files: int, pages: int, seed: int = 0) -> list:
+    """Writes PDFs of pages full of random sentences, two columns on every other page."""
+    rng = random.Random(seed)
+    paths = []
+    for n in range(files):
+        doc = fitz.open()
+        for p in range(pages):
+            page = doc.new_page()
+            columns = [fitz.Rect(50, 50, 550, 800)] if p % 2 == 0 else [fitz.Rect(50, 50, 290, 800), fitz.Rect(310, 50, 550, 800)]
+            for rect in columns:
+                text = " ".join(rng.choice(WORDS) for _ in range(700 // len(columns))) + "."
+                page.insert_textbox(rect, text, fontsize=9)
+        path = os.path.join(directory, f"generated_{n}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+def run(name: str, paths: list) -> tuple:
+    """Returns (seconds, pages, words) to extract every page of every file with one backend."""
+    pages = words = 0
+    start = time.perf_counter()
+    if name == "auto":
+        reader = PDF_DOCX_Reader(backend="auto")
+        for path in paths:
+            for _, text in reader.iter_pages(path):
+                pages += 1
+                words += len(text.split())
+    else:
+        for path in paths:
+            for _, text in _PDF_BACKENDS[name](path, 0, None):
+                pages += 1
+                words += len(text.split())
+    return time.perf_counter() - start, pages, words
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="folder of PDFs to use instead of a generated corpus")
+    parser.add_argument("--files", type=int, default=5, help="number of generated files")
+    parser.add_argument("--pages", type=int, default=50, help="pages per generated file")
+    parser.add_argument("--backends", nargs="+", default=list(_PDF_BACKENDS) + ["auto"], choices=list(_PDF_BACKENDS) + ["auto"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            paths, _ = collect_file_paths(args.dir)
+        else:
+            paths = generate_corpus(tmp, args.files, args.pages)
+        if not paths:
+            sys.exit("No PDF found")
+
+        print(f"{len(paths)} files")
+        print(f"{'backend':<12}{'seconds':>10}{'pages/s':>10}{'words':>10}")
+        for name in args.backends:
+            seconds, pages, words = run(name, paths)
+            print(f"{name:<12}{seconds:>10.2f}{pages / seconds if seconds else 0:>10.1f}{words:>10}")
+
+if __name__ == "__main__":
+    main()
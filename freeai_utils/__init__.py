@@ -10,7 +10,9 @@ _module_to_names = {
     'clean_text_for_tts': ['clean_ai_text_for_tts'],
     'cleaner': ['Cleaner'],
     'decider': ['DecisionMaker'],
-    'document_filter': ['AIDocumentSearcher', 'DocumentFilter', 'collect_file_paths'],
+    'document_filter': ['AIDocumentSearcher', 'DocumentFilter', 'SemanticDocumentSearcher'],
+    'embedding_index': ['EmbeddingIndex'],
+    'corpus_store': ['CorpusStore'],
     'geminiAPI': ['GeminiChatBot', 'GeminiClient'],
     'google_search': ['WebScraper'],
     'image_to_text': ['ImageCaptioner'],
@@ -18,8 +20,12 @@ _module_to_names = {
     'text_to_speech_gtts': ['gtts_print_supported_languages', 'gtts_speak'],
     'text_to_speech_pyttsx3': ['Text_To_Speech_Pyttsx3'],
     'pdf_docx_reader': ['PDF_DOCX_Reader'],
+    'extraction_cache': ['ExtractionCache'],
+    'document_ingest': ['ingest_documents', 'collect_file_paths'],
     'language_detection': ['LangTranslator', 'LocalTranslator', 'MBartTranslator', 'M2M100Translator'],
-    'localLLM': ['LocalLLM'],
+    'localLLM': ['LocalLLM', 'ChatSession', 'PrefixCache'],
+    'llm_scheduler': ['LLMScheduler'],
+    'model_registry': ['ModelRegistry', 'get_model_registry'],
     'image_creator': ['SDXL_TurboImage', 'SD15_Image'],
     'live_stt_vosk': ['STT_Vosk'],
     'utils':        ['enforce_type', 'time_it', 'get_free_space_gb', 'colorize', 'apiRequest'],
@@ -54,7 +60,9 @@ if TYPE_CHECKING:
     from .audio_to_text_vn         import VN_Whisper
     from .clean_text_for_tts       import clean_ai_text_for_tts
     from .cleaner                  import Cleaner
-    from .document_filter          import AIDocumentSearcher, DocumentFilter, collect_file_paths
+    from .document_filter          import AIDocumentSearcher, DocumentFilter, SemanticDocumentSearcher
+    from .embedding_index          import EmbeddingIndex
+    from .corpus_store             import CorpusStore
     from .geminiAPI                import GeminiChatBot, GeminiClient
     from .google_search            import WebScraper
     from .image_to_text            import ImageCaptioner
@@ -62,9 +70,13 @@ if TYPE_CHECKING:
     from .text_to_speech_gtts      import gtts_print_supported_languages, gtts_speak
     from .text_to_speech_pyttsx3   import Text_To_Speech_Pyttsx3
     from .pdf_docx_reader          import PDF_DOCX_Reader
+    from .extraction_cache         import ExtractionCache
+    from .document_ingest          import ingest_documents, collect_file_paths
     from .decider                  import DecisionMaker
     from .language_detection       import LangTranslator, LocalTranslator, MBartTranslator, M2M100Translator
-    from .localLLM                 import LocalLLM
+    from .localLLM                 import LocalLLM, ChatSession, PrefixCache
+    from .llm_scheduler            import LLMScheduler
+    from .model_registry           import ModelRegistry, get_model_registry
     from .image_creator            import SDXL_TurboImage, SD15_Image
     from .live_stt_vosk            import STT_Vosk
     from .utils                    import enforce_type, time_it, get_free_space_gb, colorize, apiRequest
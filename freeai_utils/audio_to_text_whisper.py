@@ -10,6 +10,7 @@ import torch # need pip install torch
 from typing import Dict, Any, List
 from typing import Optional
 from freeai_utils.log_set_up import setup_logging
+from .model_registry import get_model_registry
 import ffmpeg #need pip install ffmpeg-python
 import imageio_ffmpeg as iioff #need pip install imageio-ffmpeg
 from .utils import enforce_type
@@ -21,7 +22,7 @@ from .utils import enforce_type
 
 class OpenAIWhisper:
     
-    __slots__ = ("_model", "_initialized", "logger", "_device", "_sample_rate")
+    __slots__ = ("_model", "_initialized", "logger", "_device", "_sample_rate", "__weakref__")
     
     def __init__(self, model: str = "medium", sample_rate: int = 16000, device : Optional[str]  = None) -> None:
         #check type
@@ -54,10 +55,14 @@ class OpenAIWhisper:
 
         last_err = None
         for dev in preferred_devices:
+            # skip cuda if not available, the registry would read the weights before failing to move them
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                self.logger.info(f"Skipping {dev}: no CUDA available.")
+                continue
             try:
                 self.logger.info(f"Loading '{model}' model on {dev}...")
-                self._model = whisper.load_model(model, device=dev)
-                self._model.eval()
+                # weights are shared with other users of the same model, see ModelRegistry
+                self._model = get_model_registry().acquire(("whisper", model, dev, None), lambda: whisper.load_model(model, device=dev).eval(), self)
                 self._device = dev
                 self.logger.info(f"Model successfully loaded on {dev}.")
                 break
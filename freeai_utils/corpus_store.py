@@ -0,0 +1,125 @@
+import os
+import mmap
+import struct
+import numpy as np
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+class CorpusStore(Mapping):
+    """
+    Read-only path -> text mapping backed by a single corpus file opened with mmap.
+    The file holds a header, an offsets table and one blob of UTF-8 paths and texts, so opening it costs a file open
+    and texts are only decoded when read. Processes opening the same file share one copy through the OS page cache.
+    Each entry also keeps the (size, mtime_ns) of its source file, which is what DocumentFilter.refresh() compares against.
+    """
+
+    __slots__ = ("_file_path", "_file", "_map", "_table", "_rows", "_blob_start", "logger")
+
+    _MAGIC = b"FAICORP\x00"
+    _VERSION = 1
+    _HEADER = struct.Struct("<8sIIQQ") #magic, version, reserved, entry count, blob offset
+    # one row per entry, offsets are relative to the start of the blob
+    _ROW = np.dtype([("path_off", "<i8"), ("path_len", "<i8"), ("text_off", "<i8"), ("text_len", "<i8"), ("size", "<i8"), ("mtime_ns", "<i8")])
+
+    def __init__(self, file_path: str) -> None:
+        enforce_type(file_path, str, "file_path")
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"The corpus file '{file_path}' does not exist.")
+        self.logger = setup_logging(self.__class__.__name__)
+        self._file_path = file_path
+        self._file = open(file_path, "rb")
+        self._map = None
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < self._HEADER.size:
+                raise ValueError(f"'{file_path}' is not a corpus file")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _, count, blob_start = self._HEADER.unpack_from(self._map, 0)
+            if magic != self._MAGIC:
+                raise ValueError(f"'{file_path}' is not a corpus file")
+            if version != self._VERSION:
+                raise ValueError(f"Unsupported corpus file version {version}, expected {self._VERSION}")
+            self._table = np.frombuffer(self._map, dtype=self._ROW, count=count, offset=self._HEADER.size)
+            self._blob_start = blob_start
+            # only the paths are decoded up front, texts stay in the mapping until asked for
+            self._rows: Dict[str, int] = {self.__decode(row["path_off"], row["path_len"]): i for i, row in enumerate(self._table)}
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    @property
+    def manifest(self) -> Dict[str, Tuple[int, int]]:
+        """Returns path -> (size, mtime_ns) of the source files as they were when the corpus was written."""
+        return {path: (int(self._table[i]["size"]), int(self._table[i]["mtime_ns"])) for path, i in self._rows.items()}
+
+    def __getitem__(self, path: str) -> str:
+        row = self._table[self._rows[path]]
+        return self.__decode(row["text_off"], row["text_len"])
+
+    def __contains__(self, path) -> bool:
+        return path in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def close(self) -> None:
+        """Releases the mapping, texts can no longer be read afterwards."""
+        self._table = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError: #a numpy view is still alive somewhere, the mapping goes away with it
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __decode(self, offset, length) -> str:
+        start = self._blob_start + int(offset)
+        return self._map[start:start + int(length)].decode("utf-8")
+
+    @classmethod
+    def write(cls, file_path: str, documents: Mapping, manifest: Optional[Dict[str, Tuple[int, int]]] = None,
+              before_replace: Optional[Callable[[], None]] = None) -> None:
+        """
+        Writes the path -> text documents into a corpus file, with the (size, mtime_ns) of each path taken from manifest.
+        The file is written next to the target and then swapped in, processes that still map the old file keep reading it safely
+        (on POSIX, Windows cannot replace a file that is open: close the CorpusStore of this process in before_replace,
+        it runs once the new file is complete and documents are no longer read).
+        """
+        enforce_type(file_path, str, "file_path")
+        manifest = manifest or {}
+        paths = list(documents)
+        table = np.zeros(len(paths), dtype=cls._ROW)
+        blob_start = cls._HEADER.size + table.nbytes
+
+        tmp_path = file_path + ".tmp"
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.seek(blob_start)
+            offset = 0
+            for i, path in enumerate(paths):
+                path_data = path.encode("utf-8")
+                text_data = documents[path].encode("utf-8")
+                f.write(path_data)
+                f.write(text_data)
+                size, mtime_ns = manifest.get(path, (-1, -1))
+                table[i] = (offset, len(path_data), offset + len(path_data), len(text_data), size, mtime_ns)
+                offset += len(path_data) + len(text_data)
+            f.seek(0)
+            f.write(cls._HEADER.pack(cls._MAGIC, cls._VERSION, 0, len(paths), blob_start))
+            f.write(table.tobytes())
+        if before_replace is not None:
+            before_replace()
+        os.replace(tmp_path, file_path)
@@ -1,36 +1,111 @@
 import torch
 from transformers import T5ForConditionalGeneration
 from transformers import T5TokenizerFast
+from transformers.modeling_outputs import BaseModelOutput
 from freeai_utils.log_set_up import setup_logging
+from .model_registry import get_model_registry, _from_pretrained
 import logging
-from typing import Union
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 from .utils import enforce_type
 
 #function to use: 
 # construct_sys_prompt
 # decide
+# decide_batch
+# score
+# score_batch
+# clear_cache
 # _run_examples
+
+def _normalize_question(question: str) -> str:
+    """Case, spacing and trailing punctuation do not change the decision, so near-duplicate questions share a cache entry."""
+    return " ".join(question.lower().split()).rstrip(" ?!.")
+
+class _DecisionCache:
+    """LRU of decisions with an optional time to live in seconds."""
+    __slots__ = ("_entries", "_lock", "max_size", "ttl", "hits", "misses")
+
+    def __init__(self, max_size: int, ttl: Optional[float]) -> None:
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict() #key -> (stored at, result), least recently used first
+        self._lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the cached result, None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.__expired(entry, time.monotonic()):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, result: Any) -> None:
+        with self._lock:
+            self.__purge()
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.__purge()
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __expired(self, entry: Tuple[float, Any], now: float) -> bool:
+        return self.ttl is not None and now - entry[0] > self.ttl
+
+    def __purge(self) -> None:
+        """Drops the expired entries, the lock must be held."""
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if self.__expired(entry, now)]:
+            del self._entries[key]
+
 class DecisionMaker:
-    __slots__ = ("_model_name", "_tokenizer", "_model", "_system_prompt", "_initialized", "generation_params","_device", "logger")
+    __slots__ = ("_model_name", "_tokenizer", "_model", "_system_prompt", "_labels", "_initialized", "generation_params","_device", "_cache", "logger", "__weakref__")
     
     _model_name: str
     _tokenizer: T5TokenizerFast
     _model: T5ForConditionalGeneration
     _system_prompt: Union[str, None] # Or Optional[str]
+    _labels: Tuple[str, str]
     _initialized: bool
     generation_params: dict[str, Union[int, float, bool]]
     _device: str
+    _cache: Optional[_DecisionCache]
     logger: logging.Logger
     
     #a model to answer yes no question
     #this class should only answer in 2 ways only
-    def __init__(self, sample_ques_ans : str = None, positive_ans = "YES", negative_ans = "NO", model_name : str = "google/flan-t5-base", preferred_device : str = "cuda") -> None:
+    def __init__(self, sample_ques_ans : str = None, positive_ans = "YES", negative_ans = "NO", model_name : str = "google/flan-t5-base", preferred_device : str = "cuda",
+                 cache_size: int = 1024, cache_ttl: Optional[float] = None) -> None:
         #check type before setting
         enforce_type(sample_ques_ans, (str, type(None)), "sample_ques_ans")
         enforce_type(positive_ans, str, "positive_ans")
         enforce_type(negative_ans, str, "negative_ans")
         enforce_type(model_name, str, "model_name")
         enforce_type(preferred_device, str, "preferred_device")
+        enforce_type(cache_size, int, "cache_size")
+        enforce_type(cache_ttl, (int, float, type(None)), "cache_ttl")
+        if cache_size < 0:
+            raise ValueError(f"cache_size must be >= 0, but got {cache_size}")
         
         # init not lock
         super().__setattr__("_initialized", False)
@@ -39,12 +114,14 @@ class DecisionMaker:
         self.logger = setup_logging(self.__class__.__name__)
         self.logger.info(f"Loading tokenizer and model: {model_name}...")
         try:
-            self._model = T5ForConditionalGeneration.from_pretrained(model_name, local_files_only=True)
             self._tokenizer = T5TokenizerFast.from_pretrained(model_name, local_files_only=True)
         except:
             self.logger.info(f"Detect local model not found, attemp to download {model_name}")
-            self._model = T5ForConditionalGeneration.from_pretrained(model_name)
             self._tokenizer = T5TokenizerFast.from_pretrained(model_name)
+        self._model = None
+        # the encoder attends both ways, so the fixed prompt cannot be encoded once and reused:
+        # decisions are cached per normalized question instead (0 disables)
+        self._cache = _DecisionCache(cache_size, cache_ttl) if cache_size else None
             
         self._system_prompt = None
         self.construct_sys_prompt(sample_ques_ans=sample_ques_ans, positive_ans=positive_ans, negative_ans=negative_ans)
@@ -76,8 +153,8 @@ class DecisionMaker:
                 self.logger.info(f"Skipping {d}: no CUDA available.")
                 continue
             try:
-                self._model.to(d)
-                self._model.eval()
+                # weights are shared with other users of the same model, see ModelRegistry
+                self._model = get_model_registry().acquire(("t5", model_name, d, None), lambda: _from_pretrained(T5ForConditionalGeneration, model_name, d), self)
                 self._device = d
                 self.logger.info(f"Model successfully loaded on {d}.")
                 break
@@ -101,6 +178,7 @@ class DecisionMaker:
         if sample_ques_ans is type(str) and sample_ques_ans.strip() == "": #ensure it makes a good prompt
             sample_ques_ans = None
             
+        self._labels = (positive_ans, negative_ans) #the answers score chooses between
         self._system_prompt = (
             "Analyze the following question and determine which result is better to answer it. "
             f"Respond with '{positive_ans}' or '{negative_ans}'.\n\n"
@@ -110,18 +188,124 @@ class DecisionMaker:
     def decide(self, user_question: str, temp_prompt : str = None) -> str:
         """Returns the model's decision as a capitalized string."""
         enforce_type(user_question, str, "user_question")
+        return self.decide_batch([user_question], temp_prompt)[0]
+    
+    def decide_batch(self, questions: List[str], temp_prompt : str = None, batch_size: int = 32) -> List[str]:
+        """
+        Same as decide for many questions, Returns the decisions in the same order.
+        Questions are padded into one generate call per batch_size questions, grouped by length so little padding is wasted.
+        Questions answered before (see cache_size) are not run again.
+        """
+        enforce_type(questions, list, "questions")
         enforce_type(temp_prompt, (str, type(None)), "temp_prompt")
-        
+        enforce_type(batch_size, int, "batch_size")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, but got {batch_size}")
+        for question in questions:
+            enforce_type(question, str, "question")
+        settings = repr(sorted(self.generation_params.items())) #other params may give other answers
+        return self.__cached("decide", questions, temp_prompt, settings, lambda missing: self.__generate_decisions(missing, temp_prompt, batch_size))
+    
+    def __generate_decisions(self, questions: List[str], temp_prompt: Optional[str], batch_size: int) -> List[str]:
+        prompts = [self.__prompt(question, temp_prompt) for question in questions]
+        lengths = [len(ids) for ids in self._tokenizer(prompts).input_ids]
+        order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+        decisions = [None] * len(prompts)
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            inputs = self._tokenizer([prompts[i] for i in chunk], return_tensors="pt", padding=True).to(self._device)
+            output_ids = self._model.generate(**inputs, **self.generation_params)
+            # num_return_sequences rows per question, the first one is the best
+            step = self.generation_params.get("num_return_sequences", 1)
+            for i, ids in zip(chunk, output_ids[::step]):
+                decisions[i] = self._tokenizer.decode(ids, skip_special_tokens=True).strip().upper()
+        return decisions
+    
+    def score(self, user_question: str, temp_prompt : str = None, labels: Optional[List[str]] = None) -> Tuple[str, float]:
+        """
+        Faster alternative to decide: instead of generating an answer, scores each allowed label and Returns the most likely one
+        (capitalized, like decide) with its confidence, the probability of that label among the allowed ones.
+        labels defaults to the positive_ans and negative_ans of construct_sys_prompt.
+        """
+        enforce_type(user_question, str, "user_question")
+        return self.score_batch([user_question], temp_prompt, labels)[0]
+    
+    def score_batch(self, questions: List[str], temp_prompt : str = None, labels: Optional[List[str]] = None, batch_size: int = 32) -> List[Tuple[str, float]]:
+        """Same as score for many questions, Returns (label, confidence) in the same order."""
+        enforce_type(questions, list, "questions")
+        enforce_type(temp_prompt, (str, type(None)), "temp_prompt")
+        enforce_type(labels, (list, type(None)), "labels")
+        enforce_type(batch_size, int, "batch_size")
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, but got {batch_size}")
+        for question in questions:
+            enforce_type(question, str, "question")
+        labels = labels or list(self._labels)
+        if len(labels) < 2:
+            raise ValueError(f"labels needs at least 2 answers, but got {labels}")
+        return self.__cached("score", questions, temp_prompt, tuple(labels), lambda missing: self.__score_labels(missing, temp_prompt, labels, batch_size))
+    
+    def __score_labels(self, questions: List[str], temp_prompt: Optional[str], labels: List[str], batch_size: int) -> List[Tuple[str, float]]:
+        results = []
+        for start in range(0, len(questions), batch_size):
+            prompts = [self.__prompt(question, temp_prompt) for question in questions[start:start + batch_size]]
+            probs = self.__label_probs(prompts, labels)
+            for row in probs:
+                best = int(row.argmax())
+                results.append((labels[best].strip().upper(), float(row[best])))
+        return results
+    
+    def __label_probs(self, prompts: List[str], labels: List[str]) -> torch.Tensor:
+        """Returns a (prompts, labels) tensor of the probability of each label, normalized over the labels."""
+        inputs = self._tokenizer(prompts, return_tensors="pt", padding=True).to(self._device)
+        targets = self._tokenizer(labels, return_tensors="pt", padding=True).to(self._device) #each label ends with </s>
+        n, k = len(prompts), len(labels)
+        with torch.no_grad():
+            # the encoder runs once per prompt, its output is shared by every label
+            hidden = self._model.get_encoder()(**inputs).last_hidden_state
+            target_ids = targets.input_ids.repeat(n, 1)
+            logits = self._model(encoder_outputs=BaseModelOutput(last_hidden_state=hidden.repeat_interleave(k, dim=0)),
+                                 attention_mask=inputs.attention_mask.repeat_interleave(k, dim=0),
+                                 decoder_input_ids=self._model._shift_right(target_ids)).logits
+            # log-likelihood of the whole label, padding after the shorter labels left out
+            token_scores = logits.float().log_softmax(-1).gather(-1, target_ids.unsqueeze(-1)).squeeze(-1)
+            scores = (token_scores * targets.attention_mask.repeat(n, 1)).sum(-1).view(n, k)
+        return scores.softmax(-1).cpu()
+    
+    def __cached(self, kind: str, questions: List[str], temp_prompt: Optional[str], settings: Hashable, compute: Callable[[List[str]], list]) -> list:
+        """Returns the cached result of each question, compute() runs once for the distinct questions not cached."""
+        if self._cache is None:
+            return compute(questions)
+        prompt = temp_prompt or self._system_prompt
+        keys = [(kind, prompt, settings, _normalize_question(question)) for question in questions]
+        results = [self._cache.get(key) for key in keys]
+        missing: Dict[Hashable, int] = {}
+        for i, (key, result) in enumerate(zip(keys, results)):
+            if result is None:
+                missing.setdefault(key, i)
+        if missing:
+            computed = dict(zip(missing, compute([questions[i] for i in missing.values()])))
+            for key, result in computed.items():
+                self._cache.put(key, result)
+            results = [computed[key] if result is None else result for key, result in zip(keys, results)]
+        return results
+    
+    @property
+    def cache_info(self) -> Dict[str, Any]:
+        """Returns the size, limits and hit/miss counts of the decision cache, None when it is disabled."""
+        if self._cache is None:
+            return None
+        return {"size": len(self._cache), "max_size": self._cache.max_size, "ttl": self._cache.ttl, "hits": self._cache.hits, "misses": self._cache.misses}
+    
+    def clear_cache(self) -> None:
+        """Forgets every cached decision."""
+        if self._cache is not None:
+            self._cache.clear()
+    
+    def __prompt(self, user_question: str, temp_prompt: str = None) -> str:
         if temp_prompt:
-            prompt = f"{temp_prompt}\nQuestion: {user_question} ->"
-        else: prompt = f"{self._system_prompt}\nQuestion: {user_question} ->"
-        
-        input_ids = self._tokenizer(prompt, return_tensors="pt").input_ids
-        input_ids = input_ids.to(self._device)
-
-        output_ids = self._model.generate(input_ids, **self.generation_params)
-        decision = self._tokenizer.decode(output_ids[0], skip_special_tokens=True).strip().upper()
-        return decision
+            return f"{temp_prompt}\nQuestion: {user_question} ->"
+        return f"{self._system_prompt}\nQuestion: {user_question} ->"
 
     @property
     def model_name(self):
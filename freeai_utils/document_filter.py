@@ -1,16 +1,50 @@
 from collections import Counter
 import os
+import threading
+import time
 os.environ["HF_HUB_OFFLINE"] = "1"
 from haystack import Document
 from haystack.components.readers import ExtractiveReader
+from haystack.components.preprocessors import DocumentSplitter
+from haystack.components.retrievers.in_memory import InMemoryBM25Retriever
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+from haystack.document_stores.types import DuplicatePolicy
 from haystack.utils.device import ComponentDevice
 from typing import List, Optional, Dict, Tuple
-from .pdf_docx_reader import PDF_DOCX_Reader
+from .extraction_cache import ExtractionCache
+from .document_ingest import ingest_documents, collect_file_paths, scan_manifest, diff_manifest, PollingWatcher
+from .keyword_index import KeywordIndex, IndexedDocuments
+from .embedding_index import EmbeddingIndex
+from .corpus_store import CorpusStore
+from transformers import AutoModel, AutoTokenizer
+import numpy as np
 from freeai_utils.log_set_up import setup_logging
 import torch
-import re
 from .utils import enforce_type
 
+# chunk_by option -> DocumentSplitter unit, sentences end at '.' like DocumentFilter's
+_CHUNK_UNITS = {"word": "word", "sentence": "period"}
+
+def _check_chunking(chunk_by: str, chunk_size: int, chunk_overlap: int) -> None:
+    if chunk_by not in _CHUNK_UNITS:
+        raise ValueError(f"chunk_by could only be {', '.join(_CHUNK_UNITS)}. Current value: {chunk_by}")
+    if chunk_size < 1 or not 0 <= chunk_overlap < chunk_size:
+        raise ValueError(f"chunk_size must be >= 1 and 0 <= chunk_overlap < chunk_size, but got chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+
+def _make_splitter(chunk_by: str, chunk_size: int, chunk_overlap: int) -> DocumentSplitter:
+    splitter = DocumentSplitter(split_by=_CHUNK_UNITS[chunk_by], split_length=chunk_size, split_overlap=chunk_overlap)
+    splitter.warm_up()
+    return splitter
+
+def _passage_text_and_page(passage: Document) -> Tuple[str, Optional[int]]:
+    """Returns the passage text without page breaks and the 1-based page it starts on (None when unknown)."""
+    content = passage.content or ""
+    page = passage.meta.get("page_number")
+    if page is not None:
+        # the splitter gives the page a passage starts on, a leading page break belongs to the next page
+        page += content[:len(content) - len(content.lstrip())].count("\f")
+    return content.replace("\f", "\n").strip(), page
+
 #smaller model: deepset/roberta-base-squad2
 class AIDocumentSearcher:
     """
@@ -20,7 +54,9 @@ class AIDocumentSearcher:
     it can find relevant answers even if they are paraphrased or semantically related to the query.
     """
     
-    __slots__ = ("_reader", "threshold", "max_per_doc", "top_k", "_documents", "_initialized", "logger")
+    __slots__ = ("_reader", "threshold", "max_per_doc", "top_k", "_documents", "_cache", "workers", "chunksize", "file_timeout",
+                 "_path", "_manifest", "_lock", "_refresh_lock", "_watcher",
+                 "top_passages", "_splitter", "_store", "_retriever", "_passage_ids", "last_timings", "_initialized", "logger")
     
     _initialized: bool
     _reader: ExtractiveReader
@@ -28,13 +64,37 @@ class AIDocumentSearcher:
     max_per_doc: int
     top_k: int
     _documents: List[Document]
+    _cache: Optional[ExtractionCache]
+    workers: Optional[int]
+    chunksize: int
+    file_timeout: Optional[float]
+    _path: str
+    _manifest: Dict[str, Tuple[int, int]]
+    _watcher: Optional[PollingWatcher]
+    top_passages: Optional[int]
+    _splitter: DocumentSplitter
+    _store: InMemoryDocumentStore
+    _retriever: InMemoryBM25Retriever
+    _passage_ids: Dict[str, List[str]]
+    last_timings: Dict[str, float]
     
-    def __init__(self, model_name="deepset/tinyroberta-squad2", path : Optional[str] = None, threshold : float = 0.4, max_per_doc : int = 2, top_answer : int = 4, device: str = "cuda", auto_init : bool = True) -> None:
+    def __init__(self, model_name="deepset/tinyroberta-squad2", path : Optional[str] = None, threshold : float = 0.4, max_per_doc : int = 2, top_answer : int = 4, device: str = "cuda", auto_init : bool = True,
+                 cache_dir : Optional[str] = None, workers : Optional[int] = 1, chunksize : int = 8, file_timeout : Optional[float] = None,
+                 top_passages : Optional[int] = 10, chunk_by : str = "word", chunk_size : int = 200, chunk_overlap : int = 0) -> None:
         #check type first
         enforce_type(threshold, float, "threshold")
         enforce_type(max_per_doc, int, "max_per_doc")
         enforce_type(top_answer, int, "top_answer")
         enforce_type(auto_init, bool, "auto_init")
+        enforce_type(cache_dir, (str, type(None)), "cache_dir")
+        enforce_type(workers, (int, type(None)), "workers")
+        enforce_type(chunksize, int, "chunksize")
+        enforce_type(file_timeout, (int, float, type(None)), "file_timeout")
+        enforce_type(top_passages, (int, type(None)), "top_passages")
+        enforce_type(chunk_by, str, "chunk_by")
+        enforce_type(chunk_size, int, "chunk_size")
+        enforce_type(chunk_overlap, int, "chunk_overlap")
+        _check_chunking(chunk_by, chunk_size, chunk_overlap)
         self.logger = setup_logging(self.__class__.__name__)
         self.logger.propagate = False  # Prevent propagation to the root logger
         
@@ -83,10 +143,28 @@ class AIDocumentSearcher:
         self.max_per_doc = max_per_doc
         self.top_k = top_answer
         self._documents: List[Document] = [] #init var to hold document
+        self._cache = ExtractionCache(cache_dir) if cache_dir is not None else None #reuse extracted text across restarts
+        # ingestion settings: worker processes (None = all cores), files per task, seconds allowed per file
+        self.workers = workers
+        self.chunksize = chunksize
+        self.file_timeout = file_timeout
+        self._manifest = {} #path -> (size, mtime) of the files loaded, used by refresh
+        self._lock = threading.RLock() #guards _documents while refresh swaps them
+        self._refresh_lock = threading.Lock() #one refresh at a time
+        self._watcher = None
+        # retriever stage: documents are split into passages of chunk_size words or sentences (chunk_overlap shared with the previous one)
+        # and indexed with BM25, only the top_passages best passages go to the reader (None sends whole documents like before)
+        self.top_passages = top_passages
+        self._splitter = _make_splitter(chunk_by, chunk_size, chunk_overlap)
+        self._store = InMemoryDocumentStore()
+        self._retriever = InMemoryBM25Retriever(document_store=self._store)
+        self._passage_ids = {} #source document id -> ids of its passages in the store
+        self.last_timings = {}
         if path is None:
             path = os.getcwd()
         if not os.path.exists(path):
             raise FileNotFoundError(f"The path '{path}' does not exist.")
+        self._path = path
         if auto_init:
             self.__init_documents(path) #init documents from the path
         self.logger.info(f"Initialize successfully at path {path}")
@@ -98,6 +176,10 @@ class AIDocumentSearcher:
     @property
     def documents(self):
         return self._documents
+    
+    @property
+    def cache(self):
+        return self._cache
        
     def __setattr__(self, name, value):
         # once initialized, prevent changing core internals
@@ -105,14 +187,31 @@ class AIDocumentSearcher:
             raise AttributeError(f"Cannot reassign '{name}' after initialization")
         super().__setattr__(name, value)
     
-    def search_document(self, prompt : str = None) -> List[Tuple]: #content text, score, and doc.id
+    def search_document(self, prompt : str = None, return_pages : bool = False) -> List[Tuple]: #content text, score, doc.id (and page)
         """Searches a collection of documents for answers to a given prompt,
         then filters the results based on a threshold score, a limit per document, and uniqueness.\n
-        Returns a list of tuples containing the text, score, and document ID.
+        Returns a list of tuples containing the text, score, and document ID,
+        with return_pages=True the page number the text starts on is added (1-based, None when unknown).
+        Since 0.7.0 the text is the best matching passage of the document (see top_passages), top_passages=None gives whole documents like before.
         """
         enforce_type(prompt, str, "prompt") #check type before start
+        enforce_type(return_pages, bool, "return_pages")
+        
+        start = time.perf_counter()
+        with self._lock:
+            if self.top_passages is None:
+                candidates = list(self._documents) #snapshot, a refresh may swap documents while the reader runs
+            else:
+                self.__sync_passages()
+                candidates = self._retriever.run(query=prompt, top_k=self.top_passages)["documents"]
+        retrieved = time.perf_counter()
+        if not candidates:
+            self.last_timings = {"retrieve": retrieved - start, "read": 0.0}
+            return []
         
-        result = self._reader.run(query=prompt, documents=self._documents, top_k=self.top_k)
+        result = self._reader.run(query=prompt, documents=candidates, top_k=self.top_k)
+        self.last_timings = {"retrieve": retrieved - start, "read": time.perf_counter() - retrieved}
+        self.logger.info(f"Read {len(candidates)} candidates: retrieve {self.last_timings['retrieve']:.3f}s, read {self.last_timings['read']:.3f}s")
         
         seen_texts = set()
         counts = Counter()
@@ -123,21 +222,37 @@ class AIDocumentSearcher:
                 continue
             if ans.document is None:
                 continue
-            text = ans.document.content
-            doc_id = ans.document.id
+            text, page = _passage_text_and_page(ans.document)
+            doc_id = ans.document.meta.get("source_id", ans.document.id) #passages count towards their source document
         
             if counts[doc_id] >= self.max_per_doc:
                 continue
             if text in seen_texts:
                 continue
                 
-            filtered_answers.append((text, ans.score, doc_id))
+            filtered_answers.append((text, ans.score, doc_id, page) if return_pages else (text, ans.score, doc_id))
             seen_texts.add(text)
             counts[doc_id] += 1
         
-        #content text, score, and doc.id
+        #content text, score, doc.id (and page)
         return filtered_answers #return list of document with ranking score that > threshold
 
+    def __sync_passages(self) -> None:
+        """Splits and indexes documents that are not in the passage store yet, and drops the passages of documents that are gone."""
+        current = {doc.id: doc for doc in self._documents}
+        for source_id in [sid for sid in self._passage_ids if sid not in current]:
+            self._store.delete_documents(self._passage_ids.pop(source_id))
+        
+        new_docs = [doc for doc_id, doc in current.items() if doc_id not in self._passage_ids]
+        if not new_docs:
+            return
+        passages = self._splitter.run(documents=new_docs)["documents"]
+        self._store.write_documents(passages, policy=DuplicatePolicy.OVERWRITE)
+        for doc in new_docs:
+            self._passage_ids[doc.id] = []
+        for passage in passages:
+            self._passage_ids[passage.meta["source_id"]].append(passage.id)
+    
     def __init_documents(self, directory : str = "") -> None:
         """
         Initializes and loads documents from a specified directory. 
@@ -145,19 +260,211 @@ class AIDocumentSearcher:
         """
         #get from here
         self._documents.clear()
-        pdf_urls, docx_urls = collect_file_paths(directory)
+        manifest = scan_manifest(directory) #docx then pdf
+        
+        #extract in parallel when workers > 1
+        texts = ingest_documents(list(manifest), workers=self.workers, chunksize=self.chunksize,
+                                 file_timeout=self.file_timeout, cache=self._cache, page_separator="\f") #\f keeps pages for chunk metadata
+        for path, text in texts.items():
+            self._documents.append(Document(content=text, meta={"file_path": path}))
+        self._manifest = {path: stat for path, stat in manifest.items() if path in texts} #failed files are retried by refresh
+    
+    def refresh(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Re-scans the directory and only extracts the files added or changed since the last load, deleted files are dropped.
+        Returns the lists of added, changed and removed paths.
+        """
+        with self._refresh_lock:
+            manifest = scan_manifest(self._path)
+            added, changed, removed = diff_manifest(self._manifest, manifest)
+            texts = {}
+            if added or changed:
+                texts = ingest_documents(added + changed, workers=self.workers, chunksize=self.chunksize,
+                                         file_timeout=self.file_timeout, cache=self._cache, page_separator="\f")
+            failed = set(added + changed) - set(texts) #left out of the manifest, so the next refresh tries them again
+            stale = set(changed) | set(removed)
+            with self._lock:
+                kept = [doc for doc in self._documents if (doc.meta or {}).get("file_path") not in stale]
+                kept.extend(Document(content=text, meta={"file_path": path}) for path, text in texts.items())
+                self._documents[:] = kept
+                self._manifest = {path: stat for path, stat in manifest.items() if path not in failed}
+        self.logger.info(f"Refresh done: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        return added, changed, removed
+    
+    def start_watching(self, interval: float = 60.0) -> None:
+        """Starts a background thread that calls refresh() every interval seconds."""
+        if self._watcher is not None and self._watcher.is_running:
+            return
+        self._watcher = PollingWatcher(self.refresh, interval, name=f"{self.__class__.__name__}Watcher")
+        self._watcher.start()
+    
+    def stop_watching(self) -> None:
+        """Stops the background refresh thread started by start_watching()."""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        
+#other model: sentence-transformers/all-mpnet-base-v2 (slower, more accurate)
+class SemanticDocumentSearcher:
+    """
+    Semantic retrieval over document passages, meant to sit alongside AIDocumentSearcher.
+    Passages are embedded once with a local sentence-embedding model and stored in an EmbeddingIndex,
+    so a query costs one embedding and a nearest neighbour lookup instead of a QA model run over the documents.
+    The index can be saved to a folder and loaded back in milliseconds.
+    """
+    
+    __slots__ = ("_model", "_tokenizer", "_device", "_splitter", "_index", "n_probe", "batch_size", "_initialized", "logger")
+    
+    _model: AutoModel
+    _tokenizer: AutoTokenizer
+    _device: str
+    _splitter: DocumentSplitter
+    _index: EmbeddingIndex
+    n_probe: int
+    batch_size: int
+    _initialized: bool
+    
+    def __init__(self, model_name : str = "sentence-transformers/all-MiniLM-L6-v2", index_dir : Optional[str] = None, device : str = "cuda",
+                 chunk_by : str = "word", chunk_size : int = 200, chunk_overlap : int = 0, batch_size : int = 32, n_probe : int = 8) -> None:
+        #check type first
+        enforce_type(model_name, str, "model_name")
+        enforce_type(index_dir, (str, type(None)), "index_dir")
+        enforce_type(chunk_by, str, "chunk_by")
+        enforce_type(chunk_size, int, "chunk_size")
+        enforce_type(chunk_overlap, int, "chunk_overlap")
+        enforce_type(batch_size, int, "batch_size")
+        enforce_type(n_probe, int, "n_probe")
+        _check_chunking(chunk_by, chunk_size, chunk_overlap)
+        
+        # init not lock
+        super().__setattr__("_initialized", False)
+        self.logger = setup_logging(self.__class__.__name__)
+        
+        preferred_devices = []
+        if device is not None:
+            enforce_type(device, str, "device")
+            preferred_devices.append(device)
+        if torch.cuda.is_available() and "cuda" not in preferred_devices:
+            preferred_devices.append("cuda")
+        if "cpu" not in preferred_devices:
+            preferred_devices.append("cpu")
+        
+        try:
+            self._tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=True)
+            self._model = AutoModel.from_pretrained(model_name, local_files_only=True)
+        except Exception:
+            self.logger.info(f"Detect local model not found, attempt to download {model_name}")
+            self._tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self._model = AutoModel.from_pretrained(model_name)
+        
+        self._device = None
+        last_err = None
+        for dev in preferred_devices:
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                continue
+            try:
+                self._model.to(dev)
+                self._model.eval()
+                self._device = dev
+                self.logger.info(f"Model successfully loaded on {dev}.")
+                break
+            except Exception as e:
+                last_err = e
+                self.logger.error(f"Fail to load {model_name} on {dev}. Reason: {e}")
+        if self._device is None:
+            raise RuntimeError(f"Could not move model to any device {preferred_devices}. Last error: {last_err}")
         
-        reader = PDF_DOCX_Reader() #init reader
+        self._splitter = _make_splitter(chunk_by, chunk_size, chunk_overlap)
+        self._index = EmbeddingIndex()
+        self.batch_size = batch_size
+        self.n_probe = n_probe #number of IVF lists looked into per query, higher is more exact and slower
         
-        #extract from docx
-        for doc in docx_urls:
-            text = reader.extract_ordered_text(doc)
-            self._documents.append(Document(content=text))
-            
-        #extract from pdf
-        for pdf in pdf_urls:
-            text = reader.extract_ordered_text(pdf)
-            self._documents.append(Document(content=text))
+        # lock down
+        super().__setattr__("_initialized", True)
+        
+        if index_dir is not None and os.path.isdir(index_dir):
+            self.load_index(index_dir)
+    
+    @property
+    def model(self):
+        return self._model
+    
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+    
+    @property
+    def device(self):
+        return self._device
+    
+    @property
+    def index(self):
+        return self._index
+    
+    def __setattr__(self, name, value):
+        # once initialized, prevent changing core internals
+        if getattr(self, "_initialized", False) and name in ("_model", "_tokenizer", "_device"):
+            raise AttributeError(f"Cannot reassign '{name}' after initialization")
+        super().__setattr__(name, value)
+    
+    def embed(self, texts : List[str]) -> np.ndarray:
+        """Returns the normalized embeddings of the texts as a (len(texts), dim) float32 array (mean pooling over tokens)."""
+        enforce_type(texts, list, "texts")
+        batches = []
+        for i in range(0, len(texts), self.batch_size):
+            encoded = self._tokenizer(texts[i:i + self.batch_size], padding=True, truncation=True, return_tensors="pt").to(self._device)
+            with torch.inference_mode():
+                hidden = self._model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            batches.append(torch.nn.functional.normalize(pooled, dim=-1).float().cpu().numpy())
+        if not batches:
+            return np.zeros((0, self._model.config.hidden_size), dtype=np.float32)
+        return np.concatenate(batches)
+    
+    def index_documents(self, documents : List[Document], index_dir : Optional[str] = None, n_lists : Optional[int] = None) -> int:
+        """
+        Splits the documents (e.g. AIDocumentSearcher.documents) into passages, embeds them and builds the index.
+        The index is saved to index_dir when given. Returns the number of passages indexed.
+        """
+        enforce_type(documents, list, "documents")
+        enforce_type(index_dir, (str, type(None)), "index_dir")
+        passages = self._splitter.run(documents=documents)["documents"] if documents else []
+        payloads = []
+        for passage in passages:
+            text, page = _passage_text_and_page(passage)
+            payloads.append({"text": text, "doc_id": passage.meta.get("source_id", passage.id), "page": page,
+                             "file_path": passage.meta.get("file_path")})
+        
+        start = time.perf_counter()
+        vectors = self.embed([p["text"] for p in payloads])
+        self.logger.info(f"Embedded {len(payloads)} passages in {time.perf_counter() - start:.2f}s")
+        
+        self._index.close()
+        self._index = EmbeddingIndex.build(vectors, payloads, n_lists=n_lists)
+        if index_dir is not None:
+            self._index.save(index_dir)
+        return len(payloads)
+    
+    def load_index(self, index_dir : str) -> None:
+        """Opens an index saved by index_documents(), the vectors are memory-mapped instead of read."""
+        enforce_type(index_dir, str, "index_dir")
+        start = time.perf_counter()
+        index = EmbeddingIndex.load(index_dir)
+        if len(index) and index.dim != self._model.config.hidden_size:
+            index.close()
+            raise ValueError(f"Index at {index_dir} has dimension {index.dim}, the model produces {self._model.config.hidden_size}")
+        self._index.close()
+        self._index = index
+        self.logger.info(f"Loaded index of {len(index)} passages in {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    def search(self, query : str, top_k : int = 5) -> List[Tuple]: #passage text, score, doc.id and page
+        """Returns the top_k passages closest in meaning to the query as tuples of text, cosine score, document ID and page."""
+        enforce_type(query, str, "query")
+        enforce_type(top_k, int, "top_k")
+        vector = self.embed([query])[0]
+        results = self._index.search(vector, top_k=top_k, n_probe=self.n_probe)
+        return [(payload["text"], score, payload["doc_id"], payload["page"]) for payload, score in results]
         
 class DocumentFilter:
     """
@@ -165,23 +472,53 @@ class DocumentFilter:
     It functions by indexing the raw text of PDF and DOCX files, 
     allowing it to quickly identify and filter documents containing a specific keyword or phrase.
     """
-    def __init__(self, path: Optional[str] = None, auto_init: bool = True) -> None:
+    def __init__(self, path: Optional[str] = None, auto_init: bool = True, cache_dir: Optional[str] = None,
+                 workers: Optional[int] = 1, chunksize: int = 8, file_timeout: Optional[float] = None, corpus_path: Optional[str] = None) -> None:
         enforce_type(auto_init, bool, "auto_init")
+        enforce_type(cache_dir, (str, type(None)), "cache_dir")
+        enforce_type(corpus_path, (str, type(None)), "corpus_path")
+        enforce_type(workers, (int, type(None)), "workers")
+        enforce_type(chunksize, int, "chunksize")
+        enforce_type(file_timeout, (int, float, type(None)), "file_timeout")
         self.logger = setup_logging(self.__class__.__name__)
         self.logger.propagate = False
 
-        self._documents: Dict[str, str] = {}  # Changed to a dictionary
+        self._index = KeywordIndex() #inverted index, kept up to date by _documents
+        self._documents: Dict[str, str] = IndexedDocuments(self._index)  # path -> text, every change is indexed
+        self._cache = ExtractionCache(cache_dir) if cache_dir is not None else None #reuse extracted text across restarts
+        # ingestion settings: worker processes (None = all cores), files per task, seconds allowed per file
+        self.workers = workers
+        self.chunksize = chunksize
+        self.file_timeout = file_timeout
+        self._manifest: Dict[str, Tuple[int, int]] = {} #path -> (size, mtime) of the files loaded, used by refresh
+        self._lock = threading.RLock() #guards _documents and the index while refresh updates them
+        self._refresh_lock = threading.Lock() #one refresh at a time
+        self._watcher: Optional[PollingWatcher] = None
+        self._corpus: Optional[CorpusStore] = None #saved corpus the documents are read from, if any
+        self.corpus_path = corpus_path #where the corpus is saved after loading or refreshing
         if path is None:
             path = os.getcwd()
         if not os.path.exists(path):
             raise FileNotFoundError(f"The path '{path}' does not exist.")
+        self._path = path
         if auto_init:
-            self.__init_documents(path)
+            if corpus_path is not None and os.path.isfile(corpus_path):
+                # open the saved corpus and only extract what changed since it was written
+                self.load_corpus(corpus_path)
+                self.refresh()
+            else:
+                self.__init_documents(path)
+                if corpus_path is not None:
+                    self.save_corpus(corpus_path)
         self.logger.info(f"Initialize successfully at path {path}")
 
     @property
     def documents(self):
         return self._documents
+    
+    @property
+    def cache(self):
+        return self._cache
        
     def search_keyword(self, keyword: str) -> Dict[str, List[str]]:
         """
@@ -189,25 +526,60 @@ class DocumentFilter:
         \n
         Returns a Dict of str,list with str is the path, and list is the place it occurs the matched keyword
         """
-        results = {}
-        
-        pattern = re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE)
-        
-        for path, text in self._documents.items():
-            # Split the document into sentences using '.'
-            sentences = text.split('.')
-            matches = []
-            
-            for sentence in sentences:
-                if pattern.search(sentence):
-                    # Add the matching sentence to the list for this file
-                    matches.append(sentence.strip())
-            
-            # Only add the file to the results if a match was found
-            if matches:
-                results[path] = matches
-                
-        return results
+        enforce_type(keyword, str, "keyword")
+        # postings narrow the search to sentences holding the keyword tokens, no full corpus scan
+        with self._lock:
+            self._documents.ensure_indexed() #a loaded corpus is indexed on the first search
+            return self._index.search(keyword)
+    
+    def save_corpus(self, file_path: str) -> None:
+        """
+        Saves the loaded documents into a single corpus file that load_corpus() or corpus_path can open later.
+        The file is swapped in atomically, processes still reading the previous one are not affected.
+        When saving to corpus_path (or the corpus loaded), the documents are then read from the new file instead of memory.
+        """
+        enforce_type(file_path, str, "file_path")
+        targets = [path for path in (self.corpus_path, self._corpus.file_path if self._corpus is not None else None) if path is not None]
+        adopt = os.path.abspath(file_path) in [os.path.abspath(path) for path in targets]
+        with self._lock:
+            if not adopt:
+                CorpusStore.write(file_path, self._documents, self._manifest)
+            else:
+                mapped = self._corpus is not None and os.path.abspath(self._corpus.file_path) == os.path.abspath(file_path)
+                released = []
+                def release() -> None:
+                    # the file being replaced is mapped here, Windows cannot replace it until the mapping is closed
+                    self._corpus.close()
+                    released.append(True)
+                try:
+                    CorpusStore.write(file_path, self._documents, self._manifest, before_replace=release if mapped else None)
+                except Exception:
+                    if released: #released but not replaced, map the old file again
+                        self._corpus = CorpusStore(file_path)
+                        self._documents.swap_base(self._corpus, merged=False)
+                    raise
+                previous = self._corpus
+                self._corpus = CorpusStore(file_path)
+                self._documents.swap_base(self._corpus) #same documents in the same order, the index stays valid
+                if previous is not None and not mapped:
+                    previous.close()
+        self.logger.info(f"Saved {len(self._documents)} documents to {file_path}")
+    
+    def load_corpus(self, file_path: str) -> None:
+        """
+        Replaces the documents with the ones saved in a corpus file. The file is memory-mapped,
+        so texts are read on demand and every process opening the same file shares one copy of it.
+        """
+        enforce_type(file_path, str, "file_path")
+        corpus = CorpusStore(file_path)
+        with self._lock:
+            previous = self._corpus
+            self._documents.load_base(corpus)
+            self._manifest = corpus.manifest
+            self._corpus = corpus
+        if previous is not None:
+            previous.close()
+        self.logger.info(f"Loaded {len(corpus)} documents from {file_path}")
     
     def __init_documents(self, directory: str = "") -> None:
         """
@@ -215,30 +587,51 @@ class DocumentFilter:
         It finds and extracts text from all PDF and DOCX files in the directory.
         """
         self._documents.clear()
-        pdf_urls, docx_urls = collect_file_paths(directory)
-
-        reader = PDF_DOCX_Reader()
-
-        for doc_path in docx_urls:
-            text = reader.extract_ordered_text(doc_path)
-            self._documents[doc_path] = text
+        if self._corpus is not None:
+            self._corpus.close()
+            self._corpus = None
+        manifest = scan_manifest(directory) #docx then pdf
 
-        for pdf_path in pdf_urls:
-            text = reader.extract_ordered_text(pdf_path)
-            self._documents[pdf_path] = text
-        
-def collect_file_paths(directory : str)-> Tuple[List[str], List[str]]:
-        """a helper that scans a directory for all PDF and DOCX files and returns their file paths in two separate lists."""
-        pdf_urls = []
-        docx_urls = []
-    
-        # Walk through all directories and files
-        for root, _, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file).replace('\\', '/')  # normalize path
-                if file.lower().endswith('.pdf'):
-                    pdf_urls.append(file_path)
-                elif file.lower().endswith('.docx'):
-                    docx_urls.append(file_path)
-        
-        return pdf_urls, docx_urls
\ No newline at end of file
+        texts = ingest_documents(list(manifest), workers=self.workers, chunksize=self.chunksize,
+                                 file_timeout=self.file_timeout, cache=self._cache)
+        self._documents.update(texts)
+        self._manifest = {path: stat for path, stat in manifest.items() if path in texts} #failed files are retried by refresh
+    
+    def refresh(self) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Re-scans the directory and only extracts the files added or changed since the last load, deleted files are dropped.
+        Returns the lists of added, changed and removed paths.
+        """
+        with self._refresh_lock:
+            manifest = scan_manifest(self._path)
+            added, changed, removed = diff_manifest(self._manifest, manifest)
+            texts = {}
+            if added or changed:
+                texts = ingest_documents(added + changed, workers=self.workers, chunksize=self.chunksize,
+                                         file_timeout=self.file_timeout, cache=self._cache)
+            failed = set(added + changed) - set(texts) #left out of the manifest, so the next refresh tries them again
+            with self._lock:
+                for path in removed:
+                    self._documents.pop(path, None)
+                for path in changed:
+                    if path not in texts: #no longer extractable, don't keep the old text
+                        self._documents.pop(path, None)
+                self._documents.update(texts)
+                self._manifest = {path: stat for path, stat in manifest.items() if path not in failed}
+            if self.corpus_path is not None and (texts or changed or removed):
+                self.save_corpus(self.corpus_path)
+        self.logger.info(f"Refresh done: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        return added, changed, removed
+    
+    def start_watching(self, interval: float = 60.0) -> None:
+        """Starts a background thread that calls refresh() every interval seconds."""
+        if self._watcher is not None and self._watcher.is_running:
+            return
+        self._watcher = PollingWatcher(self.refresh, interval, name=f"{self.__class__.__name__}Watcher")
+        self._watcher.start()
+    
+    def stop_watching(self) -> None:
+        """Stops the background refresh thread started by start_watching()."""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
@@ -0,0 +1,267 @@
+import os
+import queue
+import signal
+import threading
+import time
+import multiprocessing
+from typing import List, Dict, Optional, Tuple, Callable
+from .pdf_docx_reader import PDF_DOCX_Reader
+from .extraction_cache import ExtractionCache
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+_METHODS = ("ordered", "all")
+
+# one reader per worker process, created by the pool initializer
+_worker_reader: Optional[PDF_DOCX_Reader] = None
+# workers report (first path of the chunk, start time) here, so a stalled pool knows which chunks were running
+_worker_started = None
+# extra seconds a chunk gets on top of file_timeout per file before its worker is considered stalled
+_STALL_GRACE = 30
+
+class _ExtractionTimeout(BaseException):
+    # BaseException on purpose: the reader catches Exception to try its fallback backends,
+    # a timeout must go straight through instead of starting another slow extraction
+    pass
+
+def ingest_documents(file_paths: List[str], workers: Optional[int] = 1, chunksize: int = 8, file_timeout: Optional[float] = None,
+                     cache: Optional[ExtractionCache] = None, method: str = "ordered", page_separator: str = "\n", backend: Optional[str] = None) -> Dict[str, str]:
+    """
+    Extracts the text of every file in file_paths and returns a Dict of path -> text in the input order.
+    Files already in the cache are served from it, the rest are extracted by a pool of worker processes
+    (workers=None uses every core, workers=1 extracts in this process).
+    Work is sent to the pool in chunks of chunksize files. A file taking longer than file_timeout seconds is skipped,
+    so one pathological PDF cannot stall the pool (file_timeout None waits as long as each file takes).
+    When the timeout cannot be enforced in this process (off the main thread, e.g. from a PollingWatcher, or without SIGALRM)
+    the files go through a one-worker pool instead. Files that fail or time out are logged and left out of the result.
+    PDF pages are joined with page_separator, '\f' keeps the page boundaries for chunking.
+    backend picks the PDF backend tried first (see PDF_DOCX_Reader), e.g. "auto" or "pymupdf" for speed.
+    """
+    enforce_type(file_paths, list, "file_paths")
+    enforce_type(workers, (int, type(None)), "workers")
+    enforce_type(chunksize, int, "chunksize")
+    enforce_type(file_timeout, (int, float, type(None)), "file_timeout")
+    enforce_type(cache, (ExtractionCache, type(None)), "cache")
+    enforce_type(page_separator, str, "page_separator")
+    enforce_type(backend, (str, type(None)), "backend")
+    if method not in _METHODS:
+        raise ValueError(f"method could only be {', '.join(_METHODS)}. Current value: {method}")
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be >= 1, but got {chunksize}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, but got {workers}")
+
+    logger = setup_logging("ingest_documents")
+    cache_method = ExtractionCache.method_key(method, page_separator, backend)
+    texts: Dict[str, str] = {}
+    missing = []
+    for path in file_paths:
+        cached = cache.get(path, cache_method, 0, None) if cache is not None else None
+        if cached is not None:
+            texts[path] = cached
+        else:
+            missing.append(path)
+    if cache is not None:
+        logger.info(f"{len(texts)} files served from cache, {len(missing)} to extract")
+
+    if not missing:
+        results = []
+    elif (workers == 1 or len(missing) == 1) and (not file_timeout or _alarm_available()):
+        results = _extract_chunk((method, page_separator, backend, file_timeout, missing))
+    elif workers == 1 or len(missing) == 1:
+        logger.info("file_timeout cannot be enforced in this thread, extracting in a worker process")
+        results = _extract_parallel(missing, 1, 1, file_timeout, method, page_separator, backend, logger)
+    else:
+        results = _extract_parallel(missing, workers, chunksize, file_timeout, method, page_separator, backend, logger)
+
+    extracted = {}
+    for path, text, error in results:
+        if error is not None:
+            logger.error(f"Fail to extract {path}: {error}")
+            continue
+        extracted[path] = text
+        if cache is not None:
+            try:
+                cache.put(path, cache_method, 0, None, text)
+            except OSError as e:
+                logger.error(f"Fail to store {path} in cache with error {e}")
+    if cache is not None:
+        cache.flush()
+
+    texts.update(extracted)
+    # keep the caller's order (docx first, then pdf, like the sequential version)
+    return {path: texts[path] for path in file_paths if path in texts}
+
+def _extract_parallel(paths: List[str], workers: int, chunksize: int, file_timeout: Optional[float], method: str, page_separator: str, backend: Optional[str], logger) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Runs _extract_chunk over the paths on a process pool, guarding against workers that stop responding."""
+    # workers enforce file_timeout themselves where SIGALRM exists, this is the last resort for the other platforms
+    stall_timeout = file_timeout * chunksize + _STALL_GRACE if file_timeout else None
+
+    results = []
+    while paths:
+        chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+        pending = {chunk[0]: chunk for chunk in chunks} #in submission order
+        paths = []
+        started_queue = multiprocessing.Queue()
+        started: Dict[str, float] = {}
+        pool = multiprocessing.Pool(processes=min(workers, len(chunks)), initializer=_init_worker, initargs=(started_queue,))
+        try:
+            iterator = pool.imap_unordered(_extract_chunk, [(method, page_separator, backend, file_timeout, chunk) for chunk in chunks])
+            for _ in range(len(chunks)):
+                try:
+                    chunk_results = iterator.next(stall_timeout)
+                except multiprocessing.TimeoutError:
+                    stalled = _stalled_chunks(pending, started, started_queue, stall_timeout)
+                    skipped = [path for key in stalled for path in pending.pop(key)]
+                    logger.error(f"No worker finished within {stall_timeout}s, skipping {len(skipped)} files and restarting the pool for the other {sum(len(c) for c in pending.values())}")
+                    results.extend((path, None, "worker stalled") for path in skipped)
+                    # chunks that never started, or started too recently to be the culprit, go to a fresh pool
+                    paths = [path for chunk in pending.values() for path in chunk]
+                    break
+                pending.pop(chunk_results[0][0], None)
+                results.extend(chunk_results)
+        finally:
+            pool.terminate()
+            pool.join()
+            started_queue.close()
+    return results
+
+def _stalled_chunks(pending: Dict[str, List[str]], started: Dict[str, float], started_queue, stall_timeout: float) -> List[str]:
+    """
+    Returns the keys of the pending chunks to give up on: those that have been running for stall_timeout,
+    else the longest running one, else (nothing reported as started) the oldest pending one.
+    """
+    while True:
+        try:
+            key, start = started_queue.get_nowait()
+        except queue.Empty:
+            break
+        started[key] = start
+    running = sorted((start, key) for key, start in started.items() if key in pending)
+    now = time.time()
+    stalled = [key for start, key in running if now - start >= stall_timeout]
+    if stalled:
+        return stalled
+    if running:
+        return [running[0][1]]
+    return [next(iter(pending))]
+
+def _alarm_available() -> bool:
+    """file_timeout is enforced in process with alarms, which only work on the main thread of a POSIX process."""
+    return hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+
+def _init_worker(started_queue=None) -> None:
+    global _worker_reader, _worker_started
+    _worker_reader = PDF_DOCX_Reader()
+    _worker_started = started_queue
+
+def _extract_chunk(task: Tuple[str, str, Optional[str], Optional[float], List[str]]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Extracts a chunk of files, returning (path, text, error) for each one."""
+    global _worker_reader
+    method, page_separator, backend, file_timeout, paths = task
+    if _worker_reader is None:
+        _worker_reader = PDF_DOCX_Reader()
+    if _worker_started is not None:
+        _worker_started.put((paths[0], time.time())) #wall clock: compared in the parent process
+
+    results = []
+    for path in paths:
+        try:
+            results.append((path, _extract_one(_worker_reader, path, method, page_separator, backend, file_timeout), None))
+        except _ExtractionTimeout:
+            results.append((path, None, f"took longer than {file_timeout}s"))
+        except Exception as e:
+            results.append((path, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def _extract_one(reader: PDF_DOCX_Reader, path: str, method: str, page_separator: str, backend: Optional[str], file_timeout: Optional[float]) -> str:
+    extract = reader.extract_ordered_text if method == "ordered" else reader.extract_all_text
+    if not file_timeout or not _alarm_available():
+        return extract(path, page_separator=page_separator, backend=backend)
+
+    def _on_alarm(signum, frame):
+        raise _ExtractionTimeout()
+
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, file_timeout)
+    try:
+        return extract(path, page_separator=page_separator, backend=backend)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def collect_file_paths(directory : str)-> Tuple[List[str], List[str]]:
+        """a helper that scans a directory for all PDF and DOCX files and returns their file paths in two separate lists."""
+        pdf_urls = []
+        docx_urls = []
+    
+        # Walk through all directories and files
+        for root, _, files in os.walk(directory):
+            for file in files:
+                file_path = os.path.join(root, file).replace('\\', '/')  # normalize path
+                if file.lower().endswith('.pdf'):
+                    pdf_urls.append(file_path)
+                elif file.lower().endswith('.docx'):
+                    docx_urls.append(file_path)
+        
+        return pdf_urls, docx_urls
+
+def scan_manifest(directory: str) -> Dict[str, Tuple[int, int]]:
+    """Returns a Dict of path -> (size, mtime_ns) for every PDF and DOCX file in the directory, docx first then pdf."""
+    pdf_urls, docx_urls = collect_file_paths(directory)
+    manifest = {}
+    for path in docx_urls + pdf_urls:
+        try:
+            st = os.stat(path)
+        except OSError: #removed while walking
+            continue
+        manifest[path] = (st.st_size, st.st_mtime_ns)
+    return manifest
+
+def diff_manifest(old: Dict[str, Tuple[int, int]], new: Dict[str, Tuple[int, int]]) -> Tuple[List[str], List[str], List[str]]:
+    """Compares two manifests and returns the added, changed and removed paths."""
+    added = [path for path in new if path not in old]
+    changed = [path for path in new if path in old and old[path] != new[path]]
+    removed = [path for path in old if path not in new]
+    return added, changed, removed
+
+class PollingWatcher:
+    """Calls a function every interval seconds on a daemon thread until stopped. Errors are logged and the polling continues."""
+
+    __slots__ = ("_callback", "_interval", "_stop", "_thread", "logger")
+
+    def __init__(self, callback: Callable[[], object], interval: float = 60.0, name: str = "PollingWatcher") -> None:
+        enforce_type(interval, (int, float), "interval")
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, but got {interval}")
+        self._callback = callback
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.logger = setup_logging(name)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.__run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def __run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self._callback()
+            except Exception as e:
+                self.logger.error(f"Polling callback failed with error {e}")
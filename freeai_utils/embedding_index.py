@@ -0,0 +1,178 @@
+import os
+import json
+import mmap
+import numpy as np
+from typing import List, Optional, Tuple, Dict, Any
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+class EmbeddingIndex:
+    """
+    Approximate nearest neighbour index over normalized embedding vectors (cosine similarity).
+    Vectors are kept as float16 and grouped by IVF list: a spherical k-means splits them into n_lists clusters,
+    a query only scores the vectors of its n_probe closest clusters, and those candidates are ranked exactly in float32.
+    save() writes plain .npy files and a payload file, load() memory-maps them so opening a large index takes milliseconds.
+    """
+
+    __slots__ = ("_vectors", "_centroids", "_offsets", "_payload_offsets", "_payload_file", "_payload_map", "_payloads", "logger")
+
+    _VECTORS = "vectors.npy"
+    _CENTROIDS = "centroids.npy"
+    _OFFSETS = "list_offsets.npy"
+    _PAYLOAD_OFFSETS = "payload_offsets.npy"
+    _PAYLOADS = "payloads.jsonl"
+
+    def __init__(self) -> None:
+        self.logger = setup_logging(self.__class__.__name__)
+        self._vectors = np.zeros((0, 0), dtype=np.float16) #rows grouped by IVF list
+        self._centroids = np.zeros((0, 0), dtype=np.float32)
+        self._offsets = np.zeros(1, dtype=np.int64) #list i owns rows offsets[i]:offsets[i+1]
+        self._payloads: Optional[List[Dict[str, Any]]] = [] #in memory after build, None once loaded from disk
+        self._payload_offsets = None
+        self._payload_file = None
+        self._payload_map = None
+
+    def __len__(self) -> int:
+        return int(self._vectors.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self._vectors.shape[1]) if self._vectors.ndim == 2 else 0
+
+    @property
+    def n_lists(self) -> int:
+        return int(self._centroids.shape[0])
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, payloads: List[Dict[str, Any]], n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0) -> "EmbeddingIndex":
+        """
+        Builds an index from a (n, dim) array of vectors and one JSON-serializable payload per vector.
+        n_lists defaults to about sqrt(n), 1 means a plain exact search.
+        """
+        enforce_type(vectors, np.ndarray, "vectors")
+        enforce_type(payloads, list, "payloads")
+        enforce_type(n_lists, (int, type(None)), "n_lists")
+        if vectors.ndim != 2:
+            raise ValueError(f"vectors must be a 2D array, but got shape {vectors.shape}")
+        if len(payloads) != vectors.shape[0]:
+            raise ValueError(f"Got {vectors.shape[0]} vectors but {len(payloads)} payloads")
+
+        index = cls()
+        n = vectors.shape[0]
+        if n == 0:
+            return index
+        x = _normalize(vectors.astype(np.float32))
+        if n_lists is None:
+            n_lists = int(np.sqrt(n))
+        n_lists = max(1, min(n_lists, n))
+
+        centroids, assign = _spherical_kmeans(x, n_lists, iterations, np.random.default_rng(seed))
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+
+        index._vectors = x[order].astype(np.float16)
+        index._centroids = centroids
+        index._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        index._payloads = [payloads[i] for i in order]
+        index.logger.info(f"Built index of {n} vectors in {n_lists} lists")
+        return index
+
+    def search(self, query: np.ndarray, top_k: int = 5, n_probe: int = 8) -> List[Tuple[Dict[str, Any], float]]:
+        """Returns the top_k (payload, cosine score) pairs for the query vector, looking into the n_probe closest lists."""
+        enforce_type(query, np.ndarray, "query")
+        enforce_type(top_k, int, "top_k")
+        enforce_type(n_probe, int, "n_probe")
+        if len(self) == 0 or top_k < 1:
+            return []
+        q = _normalize(query.astype(np.float32).reshape(1, -1))[0]
+        if q.shape[0] != self.dim:
+            raise ValueError(f"query has dimension {q.shape[0]}, index has {self.dim}")
+
+        # coarse step: pick the closest lists
+        n_probe = max(1, min(n_probe, self.n_lists))
+        lists = np.argsort(-(self._centroids @ q))[:n_probe]
+        rows = np.concatenate([np.arange(self._offsets[i], self._offsets[i + 1]) for i in lists])
+        if rows.size == 0:
+            return []
+
+        # exact step: score every candidate in float32
+        scores = np.asarray(self._vectors[rows], dtype=np.float32) @ q
+        k = min(top_k, rows.size)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.__payload(int(rows[i])), float(scores[i])) for i in best]
+
+    def save(self, directory: str) -> None:
+        """Writes the index into directory, it can be reopened with EmbeddingIndex.load()."""
+        enforce_type(directory, str, "directory")
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, self._VECTORS), np.asarray(self._vectors, dtype=np.float16))
+        np.save(os.path.join(directory, self._CENTROIDS), np.asarray(self._centroids, dtype=np.float32))
+        np.save(os.path.join(directory, self._OFFSETS), np.asarray(self._offsets, dtype=np.int64))
+
+        # one JSON line per vector, byte offsets make single payloads readable without parsing the file
+        offsets = [0]
+        with open(os.path.join(directory, self._PAYLOADS), "wb") as f:
+            for row in range(len(self)):
+                line = json.dumps(self.__payload(row), ensure_ascii=False).encode("utf-8") + b"\n"
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(os.path.join(directory, self._PAYLOAD_OFFSETS), np.asarray(offsets, dtype=np.int64))
+        self.logger.info(f"Saved index of {len(self)} vectors to {directory}")
+
+    @classmethod
+    def load(cls, directory: str) -> "EmbeddingIndex":
+        """Opens an index written by save(), vectors and payloads are memory-mapped rather than read."""
+        enforce_type(directory, str, "directory")
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"The index directory '{directory}' does not exist.")
+        index = cls()
+        index._vectors = np.load(os.path.join(directory, cls._VECTORS), mmap_mode="r")
+        index._centroids = np.load(os.path.join(directory, cls._CENTROIDS))
+        index._offsets = np.load(os.path.join(directory, cls._OFFSETS))
+        index._payload_offsets = np.load(os.path.join(directory, cls._PAYLOAD_OFFSETS), mmap_mode="r")
+        index._payloads = None
+        if len(index) > 0:
+            index._payload_file = open(os.path.join(directory, cls._PAYLOADS), "rb")
+            index._payload_map = mmap.mmap(index._payload_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return index
+
+    def close(self) -> None:
+        """Releases the memory-mapped payload file of a loaded index."""
+        if self._payload_map is not None:
+            self._payload_map.close()
+            self._payload_map = None
+        if self._payload_file is not None:
+            self._payload_file.close()
+            self._payload_file = None
+
+    def __payload(self, row: int) -> Dict[str, Any]:
+        if self._payloads is not None:
+            return self._payloads[row]
+        start, end = int(self._payload_offsets[row]), int(self._payload_offsets[row + 1])
+        return json.loads(self._payload_map[start:end].decode("utf-8"))
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+def _spherical_kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Clusters normalized rows by cosine similarity, returns (centroids, assignment of every row)."""
+    n = x.shape[0]
+    # train on a sample, big corpora do not need every vector to place the centroids
+    sample = x[rng.choice(n, min(n, 256 * k), replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        for j in range(k):
+            members = sample[assign == j]
+            if len(members):
+                centroids[j] = members.sum(axis=0)
+            else: #empty cluster, restart it on a random point
+                centroids[j] = sample[rng.integers(sample.shape[0])]
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32), _assign(x, centroids)
+
+def _assign(x: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+    return np.concatenate([np.argmax(x[i:i + batch] @ centroids.T, axis=1) for i in range(0, x.shape[0], batch)])
@@ -0,0 +1,206 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+class ExtractionCache:
+    """
+    Persistent on-disk cache for the text produced by PDF_DOCX_Reader.
+    Entries are keyed by the content hash of the file, so a copied or renamed file still hits.
+    A (size, mtime) fast path skips re-hashing files that did not change since they were last seen.
+    The total size of stored text is bounded, the least recently used entries are evicted first.
+    """
+
+    __slots__ = ("_cache_dir", "_max_bytes", "_flush_every", "_lock", "_files", "_entries", "_total_bytes", "_pending", "hits", "misses", "logger")
+
+    _INDEX_NAME = "index.json"
+
+    def __init__(self, cache_dir: str = ".freeai_cache", max_bytes: int = 512 * 1024 * 1024, flush_every: int = 64) -> None:
+        enforce_type(cache_dir, str, "cache_dir")
+        enforce_type(max_bytes, int, "max_bytes")
+        enforce_type(flush_every, int, "flush_every")
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, but got {max_bytes}")
+
+        self.logger = setup_logging(self.__class__.__name__)
+        self._cache_dir = os.path.abspath(cache_dir)
+        self._max_bytes = max_bytes
+        self._flush_every = max(1, flush_every)
+        self._lock = threading.RLock()
+
+        # path -> (size, mtime_ns, content hash), the fast path to skip hashing
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+        # entry key -> stored size in bytes, ordered from least to most recently used
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._pending = 0 #number of changes not yet written to the index file
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        self.__load_index()
+        self.logger.info(f"Initialize successfully at {self._cache_dir} with {len(self._entries)} entries")
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit/miss counters together with the number of entries and bytes stored."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._total_bytes}
+
+    @staticmethod
+    def method_key(method: str, page_separator: str = "\n", backend: Optional[str] = None) -> str:
+        """
+        Returns the name an extraction method is stored under,
+        texts joined with a non default page separator or extracted with a chosen backend are kept apart.
+        """
+        if page_separator != "\n":
+            method = f"{method}-{page_separator.encode('utf-8').hex()}"
+        if backend is not None:
+            method = f"{method}+{backend}"
+        return method
+
+    def get(self, file_path: str, method: str, first_page: int = 0, last_page: Optional[int] = None) -> Optional[str]:
+        """Returns the cached text for the file and page range, or None if it was never stored."""
+        enforce_type(file_path, str, "file_path")
+        enforce_type(method, str, "method")
+
+        with self._lock:
+            try:
+                key = self.__entry_key(file_path, method, first_page, last_page)
+            except OSError:
+                self.misses += 1
+                return None
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self.__entry_path(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+            except OSError:
+                # entry file removed behind our back, forget it
+                self._total_bytes -= self._entries.pop(key)
+                self._pending += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, file_path: str, method: str, first_page: int, last_page: Optional[int], text: str) -> None:
+        """Stores the extracted text for the file and page range, evicting old entries if the cache is full."""
+        enforce_type(file_path, str, "file_path")
+        enforce_type(method, str, "method")
+        enforce_type(text, str, "text")
+
+        data = text.encode("utf-8")
+        if len(data) > self._max_bytes:
+            self.logger.info(f"Skip caching {file_path}: {len(data)} bytes is larger than the whole cache")
+            return
+
+        with self._lock:
+            key = self.__entry_key(file_path, method, first_page, last_page)
+            tmp_path = self.__entry_path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.__entry_path(key))
+
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self.__evict()
+
+            self._pending += 1
+            if self._pending >= self._flush_every:
+                self.flush()
+
+    def flush(self) -> None:
+        """Writes the index to disk so the next process can reuse the entries."""
+        with self._lock:
+            index = {
+                "files": {path: list(value) for path, value in self._files.items()},
+                "entries": [[key, size] for key, size in self._entries.items()],
+            }
+            index_path = os.path.join(self._cache_dir, self._INDEX_NAME)
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+            self._pending = 0
+
+    def clear(self) -> None:
+        """Removes every stored entry and resets the counters."""
+        with self._lock:
+            for key in list(self._entries):
+                self.__remove_entry(key)
+            self._files.clear()
+            self.hits = 0
+            self.misses = 0
+            self.flush()
+
+    def __evict(self) -> None:
+        """Drops least recently used entries until the stored size fits in max_bytes."""
+        while self._total_bytes > self._max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self.__remove_entry(key)
+
+    def __remove_entry(self, key: str) -> None:
+        self._total_bytes -= self._entries.pop(key)
+        try:
+            os.remove(self.__entry_path(key))
+        except OSError:
+            pass
+
+    def __entry_key(self, file_path: str, method: str, first_page: int, last_page: Optional[int]) -> str:
+        content_hash = self.__content_hash(file_path)
+        return f"{content_hash}_{method}_{first_page}_{'end' if last_page is None else last_page}"
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key + ".txt")
+
+    def __content_hash(self, file_path: str) -> str:
+        """Returns the sha256 of the file, reusing the stored hash when size and mtime are unchanged."""
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        known = self._files.get(path)
+        if known is not None and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self._files[path] = (st.st_size, st.st_mtime_ns, digest)
+        self._pending += 1
+        return digest
+
+    def __load_index(self) -> None:
+        index_path = os.path.join(self._cache_dir, self._INDEX_NAME)
+        if not os.path.exists(index_path):
+            return
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            for path, (size, mtime_ns, digest) in index.get("files", {}).items():
+                self._files[path] = (size, mtime_ns, digest)
+            for key, size in index.get("entries", []):
+                if os.path.exists(self.__entry_path(key)):
+                    self._entries[key] = size
+                    self._total_bytes += size
+        except Exception as e:
+            self.logger.error(f"Fail to read cache index {index_path}, starting empty. Error: {e}")
+            self._files.clear()
+            self._entries.clear()
+            self._total_bytes = 0
@@ -4,13 +4,14 @@ import torch # need pip install torch
 import logging
 from typing import Optional
 from .log_set_up import setup_logging
+from .model_registry import get_model_registry, _from_pretrained
 from .utils import enforce_type
 
 #Another model_name : "Salesforce/blip-image-captioning-base"
 
 class ImageCaptioner:
     
-    __slots__ = ("_device", "_processor", "_model", "logger", "_initialized")
+    __slots__ = ("_device", "_processor", "_model", "logger", "_initialized", "__weakref__")
     _device: str
     _processor: AutoProcessor
     _model: AutoModelForImageTextToText
@@ -29,11 +30,10 @@ class ImageCaptioner:
         
         try:
             self._processor = AutoProcessor.from_pretrained(model_name, use_fast=True, local_files_only = True)
-            self._model = AutoModelForImageTextToText.from_pretrained(model_name, local_files_only = True)
         except Exception:
             self.logger.info(f"Detect local model not found, attemp to download {model_name}")
             self._processor = AutoProcessor.from_pretrained(model_name, use_fast=True)
-            self._model = AutoModelForImageTextToText.from_pretrained(model_name)
+        self._model = None
                 
         #init the var to hold device available
         preferred_devices = []
@@ -54,11 +54,15 @@ class ImageCaptioner:
         last_err = None
         
         for dev in preferred_devices:
+            # skip cuda if not available, the registry would read the weights before failing to move them
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                self.logger.info(f"Skipping {dev}: no CUDA available.")
+                continue
             try:
                 self.logger.info(f"Loading '{model_name}' model on {dev}.")
+                # weights are shared with other users of the same model, see ModelRegistry
+                self._model = get_model_registry().acquire(("image_text", model_name, dev, None), lambda: _from_pretrained(AutoModelForImageTextToText, model_name, dev), self)
                 self._device = dev
-                self._model.to(self._device)
-                self._model.eval()
                 self.logger.info(f"Successfully loaded on {dev}.")
                 break
             except RuntimeError as e:
@@ -0,0 +1,229 @@
+import re
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, List, Iterator, Optional, Set
+
+_TOKEN = re.compile(r'\w+')
+
+class KeywordIndex:
+    """
+    Inverted index used by DocumentFilter.search_keyword.
+    Each document is split into sentences on '.', and every token points to the documents, sentences and positions it appears in,
+    so a keyword or phrase lookup only touches the sentences that contain its tokens instead of scanning the whole corpus.
+    Only the offsets of the sentences are kept: their text is read from source (path -> text) when a search needs it,
+    so documents living in a memory-mapped CorpusStore are not copied into the index. Without a source the index keeps the texts given to add().
+    """
+
+    __slots__ = ("_postings", "_starts", "_texts", "_doc_tokens", "_ordinal", "_next_ordinal", "source")
+
+    def __init__(self, source: Optional[Mapping] = None) -> None:
+        # token -> path -> sentence index -> token positions inside the sentence
+        self._postings: Dict[str, Dict[str, Dict[int, List[int]]]] = {}
+        self._starts: Dict[str, "array[int]"] = {} #path -> offset of each sentence in the text, plus the end of the text
+        self._texts: Dict[str, str] = {} #used when there is no source
+        self._doc_tokens: Dict[str, Set[str]] = {} #to remove a document without walking every posting
+        self._ordinal: Dict[str, int] = {} #insertion order of documents, results are returned in this order
+        self._next_ordinal = 0
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, path) -> bool:
+        return path in self._starts
+
+    def add(self, path: str, text: str) -> None:
+        """Indexes the text under path, replacing what was indexed for that path before."""
+        if path in self._starts:
+            self.remove(path, keep_order=True)
+        else:
+            self._ordinal[path] = self._next_ordinal
+            self._next_ordinal += 1
+
+        starts = array("q", [0])
+        tokens = set()
+        for sent_idx, sentence in enumerate(text.split('.')):
+            for pos, match in enumerate(_TOKEN.finditer(sentence.lower())):
+                token = match.group()
+                self._postings.setdefault(token, {}).setdefault(path, {}).setdefault(sent_idx, []).append(pos)
+                tokens.add(token)
+            starts.append(starts[-1] + len(sentence) + 1) #+1 for the '.'
+        self._starts[path] = starts
+        self._doc_tokens[path] = tokens
+        if self.source is None:
+            self._texts[path] = text
+
+    def remove(self, path: str, keep_order: bool = False) -> None:
+        """Drops everything indexed under path."""
+        if path not in self._starts:
+            return
+        for token in self._doc_tokens.pop(path):
+            docs = self._postings[token]
+            del docs[path]
+            if not docs:
+                del self._postings[token]
+        del self._starts[path]
+        self._texts.pop(path, None)
+        if not keep_order:
+            del self._ordinal[path]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._starts.clear()
+        self._texts.clear()
+        self._doc_tokens.clear()
+        self._ordinal.clear()
+        self._next_ordinal = 0
+
+    def search(self, keyword: str) -> Dict[str, List[str]]:
+        """
+        Returns a Dict of path -> list of stripped sentences matching the keyword as a whole word or phrase (case insensitive).
+        Candidates come from the postings, then they are confirmed with the same regex a full scan would use.
+        """
+        pattern = re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE)
+        tokens = _TOKEN.findall(keyword.lower())
+        if not tokens:
+            # nothing to look up (e.g. only punctuation), scan like before
+            return self.__scan(pattern)
+
+        candidates = self.__phrase_candidates(tokens)
+        results = {}
+        for path in sorted(candidates, key=self._ordinal.__getitem__):
+            text = self.__text(path)
+            starts = self._starts[path]
+            sentences = (text[starts[idx]:starts[idx + 1] - 1] for idx in sorted(candidates[path]))
+            matches = [sentence.strip() for sentence in sentences if pattern.search(sentence)]
+            if matches:
+                results[path] = matches
+        return results
+
+    def __phrase_candidates(self, tokens: List[str]) -> Dict[str, Set[int]]:
+        """Returns path -> sentence indexes where the tokens appear one after another."""
+        postings = [self._postings.get(token) for token in tokens]
+        if any(p is None for p in postings):
+            return {}
+        # start from the rarest token's documents to keep the intersection small
+        paths = min(postings, key=len).keys()
+        candidates: Dict[str, Set[int]] = {}
+        for path in paths:
+            per_token = [p.get(path) for p in postings]
+            if any(p is None for p in per_token):
+                continue
+            for sent_idx, first_positions in per_token[0].items():
+                rest = [p.get(sent_idx) for p in per_token[1:]]
+                if any(r is None for r in rest):
+                    continue
+                rest_sets = [set(r) for r in rest]
+                if any(all(start + i + 1 in s for i, s in enumerate(rest_sets)) for start in first_positions):
+                    candidates.setdefault(path, set()).add(sent_idx)
+        return candidates
+
+    def __text(self, path: str) -> str:
+        return self.source[path] if self.source is not None else self._texts[path]
+
+    def __scan(self, pattern: "re.Pattern") -> Dict[str, List[str]]:
+        results = {}
+        for path in sorted(self._starts, key=self._ordinal.__getitem__):
+            matches = [sentence.strip() for sentence in self.__text(path).split('.') if pattern.search(sentence)]
+            if matches:
+                results[path] = matches
+        return results
+
+class IndexedDocuments(MutableMapping):
+    """
+    A dict of path -> text that keeps a KeywordIndex up to date on every change.
+    It can sit on top of a read-only base mapping (e.g. a CorpusStore): texts are read from the base until they are replaced,
+    and the base is only indexed the first time the index is needed, so loading a saved corpus stays a file open.
+    Changes made before that are only recorded, they are indexed together with the base.
+    The index reads sentence texts back through this mapping, the base texts stay in the base.
+    """
+
+    __slots__ = ("_data", "_index", "_base", "_hidden", "_base_pending")
+
+    def __init__(self, index: KeywordIndex) -> None:
+        self._data: Dict[str, str] = {} #texts set on top of the base, a base path set here replaces its base text
+        self._index = index
+        index.source = self
+        self._base: Mapping = {}
+        self._hidden: Set[str] = set() #base paths deleted since the base was loaded
+        self._base_pending = False #base not indexed yet
+
+    @property
+    def index(self) -> KeywordIndex:
+        self.ensure_indexed()
+        return self._index
+
+    @property
+    def base(self) -> Mapping:
+        return self._base
+
+    def load_base(self, base: Mapping) -> None:
+        """Replaces every document with the ones of base, they are indexed lazily."""
+        self.clear()
+        self._base = base
+        self._base_pending = len(base) > 0
+
+    def swap_base(self, base: Mapping, merged: bool = True) -> None:
+        """
+        Replaces the base without touching the index. merged: base holds every current document in the same order
+        (e.g. the corpus they were just saved to), texts set on top of the old base are dropped from memory.
+        merged=False: base holds the same documents as the old base (the same file opened again).
+        """
+        if merged:
+            self._data.clear()
+            self._hidden.clear()
+        self._base = base
+
+    def ensure_indexed(self) -> None:
+        """Indexes the base documents if it was not done yet."""
+        if not self._base_pending:
+            return
+        self._base_pending = False
+        for path in self:
+            self._index.add(path, self[path])
+
+    def __getitem__(self, path: str) -> str:
+        if path in self._data:
+            return self._data[path]
+        if path in self._base and path not in self._hidden:
+            return self._base[path]
+        raise KeyError(path)
+
+    def __setitem__(self, path: str, text: str) -> None:
+        self._data[path] = text
+        self._hidden.discard(path)
+        if not self._base_pending: #otherwise indexed with the base, in iteration order
+            self._index.add(path, text)
+
+    def __delitem__(self, path: str) -> None:
+        if path not in self:
+            raise KeyError(path)
+        self._data.pop(path, None)
+        if path in self._base:
+            self._hidden.add(path)
+        if not self._base_pending:
+            self._index.remove(path)
+
+    def __contains__(self, path) -> bool:
+        return path in self._data or (path in self._base and path not in self._hidden)
+
+    def __iter__(self) -> Iterator[str]:
+        for path in self._base:
+            if path not in self._hidden:
+                yield path
+        for path in self._data:
+            if path not in self._base:
+                yield path
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._hidden) + sum(1 for path in self._data if path not in self._base)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._base = {}
+        self._hidden.clear()
+        self._base_pending = False
+        self._index.clear()
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
@@ -1,5 +1,6 @@
 from langdetect import detect, detect_langs #need pip install langdetect
-from typing import Union, Tuple
+from langdetect.lang_detect_exception import LangDetectException
+from typing import Dict, Iterator, List, Union, Tuple
 import os
 os.environ.setdefault("translators_default_region", "EN") #need to use offline
 import translators as ts
@@ -7,6 +8,7 @@ import torch
 from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer, MBart50TokenizerFast, MBartForConditionalGeneration
 import logging 
 from .log_set_up import setup_logging
+from .model_registry import get_model_registry, _from_pretrained
 from .utils import enforce_type
 
 class LangTranslator:
@@ -121,6 +123,10 @@ class LocalTranslator:
         enforce_type(tgt_lang, str, "tgt_lang")
         return self._model.translate(prompt, src_lang = src_lang, tgt_lang = tgt_lang)
     
+    def translate_batch(self, prompts : List[str], tgt_lang : str, src_lang : Union[str, None] = None, batch_size : int = 32) -> List[str]:
+        """Translates many texts at once, Returns the translations in the same order (see translate_batch of the local model)."""
+        return self._model.translate_batch(prompts, tgt_lang = tgt_lang, src_lang = src_lang, batch_size = batch_size)
+    
     def detect_language(self, prompt) -> Tuple[str, float]:
         """Returns a tuple containing the language code and a confidence score for the detection."""
         return self._model.detect_language(prompt)
@@ -193,9 +199,53 @@ class _Class_Counter:
     
 #################################################################################################################################################
 
+def _check_batch(texts : List[str], tgt_lang : str, src_lang : Union[str, None], batch_size : int, max_batch_tokens : int) -> None:
+    enforce_type(texts, list, "texts")
+    enforce_type(tgt_lang, str, "tgt_lang")
+    enforce_type(src_lang, (str, type(None)), "src_lang")
+    enforce_type(batch_size, int, "batch_size")
+    enforce_type(max_batch_tokens, int, "max_batch_tokens")
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1, but got {batch_size}")
+    if max_batch_tokens < 1:
+        raise ValueError(f"max_batch_tokens must be >= 1, but got {max_batch_tokens}")
+    for text in texts:
+        enforce_type(text, str, "text")
+
+def _group_by_language(texts : List[str], src_lang : Union[str, None]) -> Dict[str, List[int]]:
+    """
+    Returns the indices of texts per source language, detected for each text when src_lang is None.
+    Texts with nothing to detect a language from (empty, numbers, symbols) are left out.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        lang = src_lang
+        if lang is None:
+            try:
+                lang = detect(text)
+            except LangDetectException:
+                continue
+        groups.setdefault(lang, []).append(i)
+    return groups
+
+def _length_buckets(indices : List[int], lengths : Dict[int, int], batch_size : int, max_batch_tokens : int) -> Iterator[List[int]]:
+    """
+    Splits indices into batches of texts of similar token length, so little of each padded batch is padding.
+    A batch holds at most batch_size texts and batch_size * longest length <= max_batch_tokens (at least one text).
+    """
+    batch = []
+    for i in sorted(indices, key=lengths.__getitem__):
+        # sorted by length, so the text being added is the longest of the batch
+        if batch and (len(batch) == batch_size or (len(batch) + 1) * lengths[i] > max_batch_tokens):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
 class M2M100Translator:
     
-    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized")
+    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized", "__weakref__")
     
     _tokenizer: M2M100Tokenizer
     _model: M2M100ForConditionalGeneration
@@ -232,19 +282,21 @@ class M2M100Translator:
         # Load tokenizer and model
         try:
             self._tokenizer = M2M100Tokenizer.from_pretrained(model_name,local_files_only=True)
-            self._model = M2M100ForConditionalGeneration.from_pretrained(model_name, local_files_only=True)
         except Exception as e:
             self.logger.info(f"Detect models not found, attempt to download {model_name}")
             self._tokenizer = M2M100Tokenizer.from_pretrained(model_name)
-            self._model = M2M100ForConditionalGeneration.from_pretrained(model_name)
             
         last_err = None
         for dev in preferred_devices:
+            # skip cuda if not available, the registry would read the weights before failing to move them
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                self.logger.info(f"Skipping {dev}: no CUDA available.")
+                continue
             try:
                 self.logger.info(f"Loading '{model_name}' model on {dev}...")
-                self._model.to(dev)
+                # weights are shared with other users of the same model, see ModelRegistry
+                self._model = get_model_registry().acquire(("m2m100", model_name, dev, None), lambda: _from_pretrained(M2M100ForConditionalGeneration, model_name, dev), self)
                 self._device = dev
-                self._model.eval()
                 self.logger.info(f"Model successfully loaded on {dev}.")
                 break
             except Exception as e:
@@ -302,6 +354,36 @@ class M2M100Translator:
 
         # 5) Decode and return
         return self._tokenizer.decode(generated_tokens[0], skip_special_tokens=True)
+    
+    def translate_batch(self, texts: List[str], tgt_lang: str, src_lang: Union[str, None] = None, batch_size : int = 32, max_batch_tokens : int = 8192, seed_num : int = 42) -> List[str]:
+        """
+        Translates many texts at once, Returns the translations in the same order.
+        Texts are grouped by source language (detected per text if src_lang is not given), then by token length
+        into padded batches of at most batch_size texts and max_batch_tokens tokens, one generate call per batch.
+        Without src_lang, texts whose language cannot be detected (empty, numbers, symbols) are returned unchanged.
+        """
+        _check_batch(texts, tgt_lang, src_lang, batch_size, max_batch_tokens)
+        enforce_type(seed_num, int, "seed_num")
+        
+        self._tokenizer.tgt_lang = tgt_lang
+        forced_bos_id = self._tokenizer.get_lang_id(tgt_lang)
+        torch.manual_seed(seed_num)
+        if self._device == 'cuda':
+            torch.cuda.manual_seed_all(seed_num)
+        
+        results = list(texts) #texts left out of the groups stay as they are
+        for lang, indices in _group_by_language(texts, src_lang).items():
+            self._tokenizer.src_lang = lang #sets the language token added to each text
+            encoded = self._tokenizer([texts[i] for i in indices], truncation=True, max_length=1000)
+            lengths = {i: len(ids) for i, ids in zip(indices, encoded["input_ids"])}
+            for batch in _length_buckets(indices, lengths, batch_size, max_batch_tokens):
+                inputs = self._tokenizer([texts[i] for i in batch], return_tensors='pt', padding=True, truncation=True, max_length=1000)
+                inputs = {k: v.to(self._device) for k, v in inputs.items()}
+                with torch.inference_mode():
+                    generated_tokens = self._model.generate(**inputs, forced_bos_token_id=forced_bos_id, early_stopping=True)
+                for i, translation in zip(batch, self._tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)):
+                    results[i] = translation
+        return results
 
     def detect_language(self, text) -> str:
         """Identifies the language of a given text."""
@@ -315,7 +397,7 @@ class M2M100Translator:
     
 class MBartTranslator:
     
-    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized", "_iso_to_tag")
+    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized", "_iso_to_tag", "__weakref__")
     
     _tokenizer: MBart50TokenizerFast
     _model: MBartForConditionalGeneration
@@ -351,19 +433,21 @@ class MBartTranslator:
         
         try:
             self._tokenizer = MBart50TokenizerFast.from_pretrained(model_name, local_files_only=True)
-            self._model     = MBartForConditionalGeneration.from_pretrained(model_name, local_files_only=True)
         except Exception as e:
             self.logger.info(f"Detect local model not found, attemp to download {model_name}")
             self._tokenizer = MBart50TokenizerFast.from_pretrained(model_name)
-            self._model     = MBartForConditionalGeneration.from_pretrained(model_name)
         
         last_err = None
         for dev in preferred_devices:
+            # skip cuda if not available, the registry would read the weights before failing to move them
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                self.logger.info(f"Skipping {dev}: no CUDA available.")
+                continue
             try:
                 self.logger.info(f"Loading '{model_name}' model on {dev}...")
-                self._model.to(dev)
+                # weights are shared with other users of the same model, see ModelRegistry
+                self._model = get_model_registry().acquire(("mbart", model_name, dev, None), lambda: _from_pretrained(MBartForConditionalGeneration, model_name, dev), self)
                 self._device = dev
-                self._model.eval()
                 self.logger.info(f"Model successfully loaded on {dev}.")
                 break
             except Exception as e:
@@ -423,6 +507,34 @@ class MBartTranslator:
                 early_stopping=True
             )
         return self._tokenizer.decode(out[0], skip_special_tokens=True)
+    
+    def translate_batch(self, texts: List[str], tgt_lang: str, src_lang: Union[str, None] = None, batch_size : int = 32, max_batch_tokens : int = 8192) -> List[str]:
+        """
+        Translates many texts at once, Returns the translations in the same order.
+        Texts are grouped by source language (detected per text if src_lang is not given), then by token length
+        into padded batches of at most batch_size texts and max_batch_tokens tokens, one generate call per batch.
+        Without src_lang, texts whose language cannot be detected (empty, numbers, symbols) are returned unchanged.
+        """
+        _check_batch(texts, tgt_lang, src_lang, batch_size, max_batch_tokens)
+        forced_bos = self._tokenizer.lang_code_to_id[self._resolve_lang_tag(tgt_lang)]
+        
+        # resolve the tags before translating anything, an unknown language fails early
+        groups = {}
+        for lang, indices in _group_by_language(texts, src_lang).items():
+            groups.setdefault(self._resolve_lang_tag(lang), []).extend(indices)
+        
+        results = list(texts) #texts left out of the groups stay as they are
+        for src_tag, indices in groups.items():
+            self._tokenizer.src_lang = src_tag #sets the language token added to each text
+            encoded = self._tokenizer([texts[i] for i in indices], truncation=True, max_length=1000)
+            lengths = {i: len(ids) for i, ids in zip(indices, encoded["input_ids"])}
+            for batch in _length_buckets(indices, lengths, batch_size, max_batch_tokens):
+                inputs = self._tokenizer([texts[i] for i in batch], return_tensors="pt", padding=True, truncation=True, max_length=1000).to(self._device)
+                with torch.inference_mode():
+                    out = self._model.generate(**inputs, forced_bos_token_id=forced_bos, early_stopping=True)
+                for i, translation in zip(batch, self._tokenizer.batch_decode(out, skip_special_tokens=True)):
+                    results[i] = translation
+        return results
 
     def detect_language(self, text) -> str:
         """Identifies the language of a given text."""
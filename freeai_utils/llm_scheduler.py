@@ -0,0 +1,357 @@
+import time
+import asyncio
+import inspect
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Union
+import torch
+from transformers import DynamicCache, LogitsProcessorList, TemperatureLogitsWarper, TopKLogitsWarper, TopPLogitsWarper
+from .localLLM import LocalLLM, _ThinkingBudget, _StopStringCriteria, _cache_tensors
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+class _Request:
+    __slots__ = ("messages", "settings", "future", "arrival")
+
+    def __init__(self, messages: Union[list, str], settings: dict) -> None:
+        self.messages = messages
+        self.settings = settings
+        self.future: Future = Future()
+        self.arrival = time.monotonic()
+
+class _Row:
+    """One request being decoded: its generated ids and the per-request thinking budget and stop strings."""
+    __slots__ = ("request", "generated", "budget", "stop")
+
+    def __init__(self, request: _Request, tokenizer) -> None:
+        settings = request.settings
+        self.request = request
+        self.generated: List[int] = []
+        # prompt_length 0: both are called with the generated ids only
+        self.budget = _ThinkingBudget(settings["thinking_budget"], 0) if settings["enable_thinking"] and settings["thinking_budget"] is not None else None
+        self.stop = _StopStringCriteria(tokenizer, settings["stop_strings"], 0, settings["enable_thinking"]) if settings["stop_strings"] else None
+
+class _UnsupportedCache(Exception):
+    """The model's KV cache cannot be padded and merged (sliding window, linear attention, unknown layout)."""
+    pass
+
+class _DecodeBatch:
+    """
+    Rows decoded together, one token per step (continuous batching). A request joins after a prefill of its prompt
+    and leaves as soon as it finishes, while the others keep decoding. The rows share one left-padded KV cache,
+    which is copied whenever a row joins or leaves. Sampling follows the model's generation_config
+    (do_sample, temperature, top_k, top_p), like generate().
+    """
+    __slots__ = ("_llm", "_model", "_device", "_eos", "_pad", "_warpers", "_forward_kwargs", "_cache", "_mask", "rows")
+
+    def __init__(self, llm: LocalLLM) -> None:
+        self._llm = llm
+        self._model = llm.model
+        self._device = llm.device
+        config = self._model.generation_config
+        eos = config.eos_token_id
+        self._eos = set(eos if isinstance(eos, (list, tuple)) else [] if eos is None else [eos])
+        if llm.tokenizer.eos_token_id is not None:
+            self._eos.add(llm.tokenizer.eos_token_id)
+        self._pad = llm.tokenizer.pad_token_id if llm.tokenizer.pad_token_id is not None else llm.tokenizer.eos_token_id
+        self._warpers = None
+        if config.do_sample:
+            self._warpers = LogitsProcessorList()
+            if config.temperature is not None and config.temperature != 1.0:
+                self._warpers.append(TemperatureLogitsWarper(config.temperature))
+            if config.top_k:
+                self._warpers.append(TopKLogitsWarper(config.top_k))
+            if config.top_p is not None and config.top_p < 1.0:
+                self._warpers.append(TopPLogitsWarper(config.top_p))
+        # only the logits of the last position are needed, older models compute them for the whole prompt
+        self._forward_kwargs = {"logits_to_keep": 1} if "logits_to_keep" in inspect.signature(self._model.forward).parameters else {}
+        self._cache: Optional[DynamicCache] = None
+        self._mask: Optional[torch.Tensor] = None #attention mask of the cached positions, 0 on the left padding
+        self.rows: List[_Row] = []
+
+    @torch.inference_mode()
+    def admit(self, requests: List[_Request], prompts: List[List[int]]) -> Tuple[List[_Row], int]:
+        """Prefills the prompt ids of the requests and adds them to the rows, Returns the rows already finished and the tokens generated."""
+        length = max(len(ids) for ids in prompts)
+        input_ids = torch.tensor([[self._pad] * (length - len(ids)) + ids for ids in prompts], device=self._device)
+        mask = torch.tensor([[0] * (length - len(ids)) + [1] * len(ids) for ids in prompts], device=self._device)
+        cache = DynamicCache()
+        logits = self._model(input_ids=input_ids, attention_mask=mask, position_ids=(mask.cumsum(-1) - 1).clamp(min=0),
+                             past_key_values=cache, use_cache=True, **self._forward_kwargs).logits[:, -1]
+        tensors = _cache_tensors(cache)
+        if tensors is None:
+            raise _UnsupportedCache()
+
+        if self.rows:
+            total = max(self._mask.shape[1], length)
+            tensors = [(torch.cat([_pad_left(keys, total), _pad_left(new_keys, total)]), torch.cat([_pad_left(values, total), _pad_left(new_values, total)]))
+                       for (keys, values), (new_keys, new_values) in zip(_cache_tensors(self._cache), tensors)]
+            mask = torch.cat([_pad_left(self._mask, total), _pad_left(mask, total)])
+            cache = _build_cache(tensors)
+        rows = [_Row(request, self._llm.tokenizer) for request in requests]
+        self._cache, self._mask = cache, mask
+        self.rows.extend(rows)
+        return self.__pick(logits, rows), len(rows)
+
+    @torch.inference_mode()
+    def step(self) -> Tuple[List[_Row], int]:
+        """Generates one token for every row, Returns the rows that finished and the tokens generated."""
+        input_ids = torch.tensor([[row.generated[-1]] for row in self.rows], device=self._device)
+        mask = torch.cat([self._mask, self._mask.new_ones((len(self.rows), 1))], dim=1)
+        logits = self._model(input_ids=input_ids, attention_mask=mask, position_ids=mask.sum(-1, keepdim=True) - 1,
+                             past_key_values=self._cache, use_cache=True, **self._forward_kwargs).logits[:, -1]
+        self._mask = mask
+        return self.__pick(logits, self.rows), len(self.rows)
+
+    def clear(self) -> List[_Row]:
+        """Drops every row, Returns them."""
+        rows, self.rows = self.rows, []
+        self._cache = self._mask = None
+        return rows
+
+    def __pick(self, logits: torch.Tensor, rows: List[_Row]) -> List[_Row]:
+        """Chooses the next token of each row, then removes the finished rows."""
+        scores = logits.float()
+        for i, row in enumerate(rows):
+            if row.budget is not None:
+                scores[i:i + 1] = row.budget(torch.tensor([row.generated], dtype=torch.long), scores[i:i + 1])
+        if self._warpers is None:
+            tokens = scores.argmax(dim=-1)
+        else:
+            tokens = torch.multinomial(torch.softmax(self._warpers(None, scores), dim=-1), num_samples=1).squeeze(1)
+
+        finished = []
+        for row, token in zip(rows, tokens.tolist()):
+            row.generated.append(token)
+            if (token in self._eos or len(row.generated) >= row.request.settings["max_new_tokens"]
+                    or (row.stop is not None and bool(row.stop(torch.tensor([row.generated]), None)[0]))):
+                finished.append(row)
+        if finished:
+            self.__evict(finished)
+        return finished
+
+    def __evict(self, finished: List[_Row]) -> None:
+        keep = [i for i, row in enumerate(self.rows) if row not in finished]
+        if not keep:
+            self.clear()
+            return
+        index = torch.tensor(keep, device=self._device)
+        mask = self._mask.index_select(0, index)
+        start = int(mask.any(dim=0).nonzero()[0]) #columns that are padding for every remaining row are dropped
+        self._mask = mask[:, start:]
+        self._cache = _build_cache([(keys.index_select(0, index)[:, :, start:], values.index_select(0, index)[:, :, start:])
+                                    for keys, values in _cache_tensors(self._cache)])
+        self.rows = [self.rows[i] for i in keep]
+
+def _pad_left(tensor: torch.Tensor, length: int) -> torch.Tensor:
+    """Pads an attention mask (batch, positions) or keys/values (batch, heads, positions, dim) with zeros on the left up to length positions."""
+    missing = length - tensor.shape[1 if tensor.dim() == 2 else 2]
+    if missing == 0:
+        return tensor
+    return torch.nn.functional.pad(tensor, (missing, 0) if tensor.dim() == 2 else (0, 0, missing, 0))
+
+def _build_cache(tensors: List[Tuple[torch.Tensor, torch.Tensor]]) -> DynamicCache:
+    cache = DynamicCache()
+    for idx, (keys, values) in enumerate(tensors):
+        cache.update(keys, values, idx)
+    return cache
+
+class LLMScheduler:
+    """
+    Queues prompts from many threads or asyncio tasks and runs them on one LocalLLM with continuous batching:
+    the running requests generate one token per step together, a finished request leaves the batch right away
+    and waiting ones join between two steps, up to max_batch_size at a time.
+    When nothing is running, the first request waits up to max_wait seconds for others to start with it.
+    Only the scheduler thread touches the model, so callers never block each other on it.
+    Models whose KV cache cannot be merged (e.g. sliding window attention) fall back to one generate call per
+    group of waiting requests with the same settings, new requests then join once that call finishes.
+    """
+
+    __slots__ = ("_llm", "_max_batch_size", "_max_wait", "_queue", "_cond", "_closed", "_thread", "_batch", "_stats", "logger")
+
+    def __init__(self, llm: LocalLLM, max_batch_size: int = 8, max_wait: float = 0.02) -> None:
+        enforce_type(llm, LocalLLM, "llm")
+        enforce_type(max_batch_size, int, "max_batch_size")
+        enforce_type(max_wait, (int, float), "max_wait")
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be >= 1, but got {max_batch_size}")
+        if max_wait < 0:
+            raise ValueError(f"max_wait must be >= 0, but got {max_wait}")
+
+        self.logger = setup_logging(self.__class__.__name__)
+        self._llm = llm
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue: "deque[_Request]" = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._batch: Optional[_DecodeBatch] = _DecodeBatch(llm) #None once the fallback is used
+        # running totals behind metrics, a step is one forward pass over the running requests
+        self._stats = {"requests": 0, "steps": 0, "step_rows": 0, "tokens": 0, "generate_seconds": 0.0, "wait_seconds": 0.0, "last_batch_size": 0}
+        self._thread = threading.Thread(target=self.__run, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    @property
+    def llm(self) -> LocalLLM:
+        return self._llm
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        """
+        Returns queue depth, running requests, batch sizes (requests per step), mean queue wait
+        and generated tokens per second since the scheduler started.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            queue_depth = len(self._queue)
+            running = len(self._batch.rows) if self._batch is not None else 0
+        steps = stats["steps"]
+        return {
+            "queue_depth": queue_depth,
+            "running": running,
+            "requests": stats["requests"],
+            "steps": steps,
+            "last_batch_size": stats["last_batch_size"],
+            "mean_batch_size": stats["step_rows"] / steps if steps else 0.0,
+            "mean_wait_seconds": stats["wait_seconds"] / stats["requests"] if stats["requests"] else 0.0,
+            "tokens": stats["tokens"],
+            "tokens_per_sec": stats["tokens"] / stats["generate_seconds"] if stats["generate_seconds"] else 0.0,
+        }
+
+    def submit(self, messages: Union[list, str], **generation) -> Future:
+        """
+        Queues a prompt (a str or a list of messages, like LocalLLM.ask) and Returns a Future of (content, thinking_content).
+        generation overrides the settings of LocalLLM.configure_generation for this request.
+        """
+        enforce_type(messages, (list, str), "messages")
+        request = _Request(messages, self._llm._resolve_generation(generation))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The scheduler is closed")
+            self._queue.append(request)
+            self._cond.notify_all()
+        return request.future
+
+    def ask(self, messages: Union[list, str], timeout: Optional[float] = None, **generation) -> Tuple[str, str]:
+        """Blocking version of submit, Returns (content, thinking_content)."""
+        return self.submit(messages, **generation).result(timeout)
+
+    async def ask_async(self, messages: Union[list, str], **generation) -> Tuple[str, str]:
+        """Awaitable version of submit for asyncio code, the event loop is not blocked while the request runs."""
+        return await asyncio.wrap_future(self.submit(messages, **generation))
+
+    def close(self, wait: bool = True) -> None:
+        """Stops accepting requests, the ones already queued are still answered."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self._thread.join()
+
+    def __enter__(self) -> "LLMScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __next_requests(self, running: int) -> Optional[List[_Request]]:
+        """
+        Returns the requests to start, up to the free slots of the batch, None once closed and drained.
+        With requests running it does not wait: they keep decoding and an empty list comes back.
+        """
+        with self._cond:
+            if running == 0:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return None
+                # keep the window open for more requests, counted from the oldest one's arrival
+                deadline = self._queue[0].arrival + self._max_wait
+                while len(self._queue) < self._max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(len(self._queue), self._max_batch_size - running))]
+
+    def __run(self) -> None:
+        while True:
+            running = len(self._batch.rows) if self._batch is not None else 0
+            requests = self.__next_requests(running)
+            if requests is None:
+                return
+            requests = [request for request in requests if request.future.set_running_or_notify_cancel()] #skip cancelled ones
+            if self._batch is not None:
+                self.__step(requests)
+            else:
+                self.__generate_groups(requests)
+
+    def __step(self, requests: List[_Request]) -> None:
+        """Admits the new requests, then runs one decoding step of the batch."""
+        start = time.monotonic()
+        prompts = []
+        for request in list(requests):
+            try:
+                prompts.append(self._llm._prompt_ids(request.messages, request.settings))
+            except Exception as e: #a malformed prompt only fails its own request
+                self.logger.error(f"Request failed with error {e}")
+                request.future.set_exception(e)
+                requests.remove(request)
+        finished = []
+        tokens = rows = 0
+        try:
+            if requests:
+                finished, tokens = self._batch.admit(requests, prompts)
+            if self._batch.rows:
+                done, rows = self._batch.step()
+                finished += done
+                tokens += rows
+        except _UnsupportedCache:
+            self.logger.warning("The KV cache of this model cannot be merged, falling back to one generate call per batch")
+            self._batch = None
+            self.__generate_groups(requests)
+            return
+        except Exception as e:
+            failed = self._batch.clear()
+            self.logger.error(f"Batch of {len(failed) + len(requests)} requests failed with error {e}")
+            for request in {id(request): request for request in requests + [row.request for row in failed]}.values():
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        self.__record(requests, start, time.monotonic() - start, tokens, rows)
+        for row in finished:
+            row.request.future.set_result(self._llm._split_output(row.generated, row.request.settings))
+
+    def __generate_groups(self, requests: List[_Request]) -> None:
+        """Fallback: one generate call per distinct settings, in order of arrival."""
+        groups: Dict[tuple, List[_Request]] = {}
+        for request in requests:
+            groups.setdefault(tuple(sorted(request.settings.items())), []).append(request)
+        for group in groups.values():
+            self.__generate(group)
+
+    def __generate(self, batch: List[_Request]) -> None:
+        """The whole batch in one generate call."""
+        start = time.monotonic()
+        try:
+            results, tokens = self._llm._ask_batch_counted([request.messages for request in batch], batch[0].settings)
+        except Exception as e:
+            self.logger.error(f"Batch of {len(batch)} requests failed with error {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self.__record(batch, start, time.monotonic() - start, tokens, len(batch))
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def __record(self, started: List[_Request], start: float, elapsed: float, tokens: int, rows: int) -> None:
+        with self._cond:
+            self._stats["requests"] += len(started)
+            self._stats["wait_seconds"] += sum(start - request.arrival for request in started)
+            self._stats["tokens"] += tokens
+            self._stats["generate_seconds"] += elapsed
+            if rows:
+                self._stats["steps"] += 1
+                self._stats["step_rows"] += rows
+                self._stats["last_batch_size"] = rows
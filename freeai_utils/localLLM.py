@@ -1,13 +1,252 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, LogitsProcessor, LogitsProcessorList, DynamicCache
+from transformers.generation.streamers import BaseStreamer
 from .log_set_up import setup_logging
+from .model_registry import get_model_registry
 import logging
+import hashlib
+import queue
+import threading
 import torch
-from typing import Union
+from collections import OrderedDict
+from typing import Union, Dict, List, Optional, Tuple, Iterator
 from .utils import enforce_type
 
+_THINK_END = 151668 #</think> token id of the Qwen3 tokenizer
+
+_LOAD_MODES = ("auto", "bfloat16", "int8")
+
+class _Int8Linear(torch.nn.Module):
+    """A dynamically quantized nn.Linear between layers kept in the checkpoint dtype: it only takes float32 inputs."""
+    
+    def __init__(self, quantized: torch.nn.Module):
+        super().__init__()
+        self.quantized = quantized
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.quantized(x.float()).to(x.dtype)
+
+def _quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Replaces every nn.Linear with a dynamically quantized int8 one (CPU only), the other weights keep the checkpoint dtype.
+    Each layer is upcast to float32 just before it is quantized, so the peak memory stays close to the loaded model.
+    Uses torch.ao.quantization.quantize_dynamic, which torch deprecates in favour of torchao (not a dependency);
+    torch shows its deprecation warning when the model is loaded.
+    """
+    from torch.ao.quantization import quantize_dynamic
+    linears = [(name, module) for name, module in model.named_modules() if _is_quantizable(model, module)]
+    for name, module in linears:
+        parent_name, _, child_name = name.rpartition(".")
+        parent = model.get_submodule(parent_name) if parent_name else model
+        quantized = quantize_dynamic(torch.nn.Sequential(module.float()), {torch.nn.Linear}, dtype=torch.qint8)[0]
+        setattr(parent, child_name, _Int8Linear(quantized))
+    return model
+
+def _load_causal_lm(model_name: str, load_mode: str, device: str) -> AutoModelForCausalLM:
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        torch_dtype=torch.bfloat16 if load_mode == "bfloat16" else "auto",   
+        low_cpu_mem_usage=True 
+    )
+    model.eval()
+    if load_mode == "int8":
+        model = _quantize_int8(model)
+    return model.to(device)
+
+def _is_quantizable(model: torch.nn.Module, module: torch.nn.Module) -> bool:
+    """nn.Linear layers, except an output head tied to the input embeddings: it stays shared instead of adding an int8 copy."""
+    if type(module) is not torch.nn.Linear:
+        return False
+    embeddings = model.get_input_embeddings() if hasattr(model, "get_input_embeddings") else None
+    return embeddings is None or module.weight is not embeddings.weight
+
+# defaults of the generation settings, see LocalLLM.configure_generation
+_GENERATION_DEFAULTS = {"max_new_tokens": 32768, "enable_thinking": True, "thinking_budget": None, "stop_strings": None}
+
+def _check_generation(params: dict) -> dict:
+    """Validates generation settings and Returns them with stop_strings as a tuple (None when empty)."""
+    for name in params:
+        if name not in _GENERATION_DEFAULTS:
+            raise TypeError(f"Unknown generation setting '{name}', expected one of {', '.join(_GENERATION_DEFAULTS)}")
+    checked = dict(params)
+    if "max_new_tokens" in checked:
+        enforce_type(checked["max_new_tokens"], int, "max_new_tokens")
+        if checked["max_new_tokens"] < 1:
+            raise ValueError(f"max_new_tokens must be >= 1, but got {checked['max_new_tokens']}")
+    if "enable_thinking" in checked:
+        enforce_type(checked["enable_thinking"], bool, "enable_thinking")
+    if "thinking_budget" in checked:
+        enforce_type(checked["thinking_budget"], (int, type(None)), "thinking_budget")
+        if checked["thinking_budget"] is not None and checked["thinking_budget"] < 0:
+            raise ValueError(f"thinking_budget must be >= 0, but got {checked['thinking_budget']}")
+    if "stop_strings" in checked:
+        stop_strings = checked["stop_strings"]
+        enforce_type(stop_strings, (list, tuple, str, type(None)), "stop_strings")
+        if type(stop_strings) is str:
+            stop_strings = [stop_strings]
+        for stop in stop_strings or ():
+            enforce_type(stop, str, "stop_strings")
+            if not stop:
+                raise ValueError("stop_strings cannot contain an empty string")
+        checked["stop_strings"] = tuple(stop_strings) if stop_strings else None
+    return checked
+
+def _cut_at_stop(text: str, stop_strings: Optional[Tuple[str, ...]]) -> str:
+    """Returns text up to the first stop string, the stop string itself is left out."""
+    if not stop_strings:
+        return text
+    cut = min((i for i in (text.find(stop) for stop in stop_strings) if i >= 0), default=len(text))
+    return text[:cut]
+
+class _PhaseStreamer(BaseStreamer):
+    """
+    Receives token ids from generate() and queues ("thinking" | "answer", text) pieces.
+    Everything up to and including </think> is the thinking phase, like the split done by LocalLLM.ask.
+    Text is decoded incrementally and held back while a multi-byte character is incomplete.
+    """
+
+    def __init__(self, tokenizer, stop_strings: Optional[Tuple[str, ...]] = None, enable_thinking: bool = True) -> None:
+        self.queue = queue.Queue()
+        self._tokenizer = tokenizer
+        self._stop_strings = stop_strings
+        self._pending = "" #answer text held back while it could be the start of a stop string
+        self._stopped = False
+        self._prompt_skipped = False
+        self._ended = False
+        self._phase = "thinking" if enable_thinking else "answer" #without thinking, </think> is already in the prompt
+        self._ids: List[int] = [] #ids since the last newline of the current phase
+        self._emitted = 0 #characters of the decoded ids already queued
+        self._started = False #leading newlines of a phase are dropped, like ask() strips them
+
+    def put(self, value) -> None:
+        if not self._prompt_skipped: #the first call carries the prompt
+            self._prompt_skipped = True
+            return
+        for token_id in value.reshape(-1).tolist():
+            self._ids.append(token_id)
+            if token_id == _THINK_END and self._phase == "thinking":
+                self.__flush(final=True)
+                self._phase = "answer"
+                self._ids, self._emitted, self._started = [], 0, False
+        self.__flush()
+
+    def end(self) -> None:
+        if self._ended:
+            return
+        self._ended = True
+        self.__flush(final=True)
+        self.queue.put(None)
+
+    def __flush(self, final: bool = False) -> None:
+        text = self._tokenizer.decode(self._ids, skip_special_tokens=True)
+        if not final and text.endswith("\ufffd"):
+            return
+        new = text[self._emitted:]
+        if not self._started:
+            new = new.lstrip("\n")
+        self._emitted = len(text)
+        if new:
+            self._started = True
+            if self._phase == "answer" and self._stop_strings:
+                self.__put_answer(new, final)
+            else:
+                self.queue.put((self._phase, new))
+        elif final and self._pending:
+            self.__put_answer("", final)
+        if text.endswith("\n"): #start over so decoding cost does not grow with the answer
+            self._ids, self._emitted = [], 0
+    
+    def __put_answer(self, new: str, final: bool) -> None:
+        """Queues answer text up to the first stop string, like ask() cuts the content."""
+        if self._stopped:
+            return
+        pending = self._pending + new
+        cut = _cut_at_stop(pending, self._stop_strings)
+        if len(cut) < len(pending):
+            self._stopped = True
+            ready, self._pending = cut, ""
+        elif final:
+            ready, self._pending = pending, ""
+        else:
+            # keep the longest tail that may still grow into a stop string
+            keep = max((n for stop in self._stop_strings for n in range(1, len(stop)) if pending.endswith(stop[:n])), default=0)
+            ready, self._pending = pending[:len(pending) - keep], pending[len(pending) - keep:]
+        if ready:
+            self.queue.put(("answer", ready))
+
+class _CancelCriteria(StoppingCriteria):
+    """Stops generation once the event is set, e.g. when a stream is closed early."""
+
+    def __init__(self, event: threading.Event) -> None:
+        self._event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self._event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+class _ThinkingBudget(LogitsProcessor):
+    """Forces </think> on rows still thinking once budget tokens were generated after the prompt."""
+
+    def __init__(self, budget: int, prompt_length: int) -> None:
+        self._budget = budget
+        self._prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores):
+        generated = input_ids[:, self._prompt_length:]
+        if generated.shape[1] < self._budget:
+            return scores
+        thinking = ~(generated == _THINK_END).any(dim=1)
+        if thinking.any():
+            scores = scores.clone()
+            scores[thinking] = float("-inf")
+            scores[thinking, _THINK_END] = 0.0
+        return scores
+
+class _StopStringCriteria(StoppingCriteria):
+    """Stops a row once its answer (the text after </think>) contains one of the stop strings."""
+
+    def __init__(self, tokenizer, stop_strings: Tuple[str, ...], prompt_length: int, enable_thinking: bool) -> None:
+        self._tokenizer = tokenizer
+        self._stop_strings = stop_strings
+        self._prompt_length = prompt_length
+        self._enable_thinking = enable_thinking
+        # only the newest tokens are decoded, a token is at least one byte of the stop string
+        self._window = max(len(stop.encode("utf-8")) for stop in stop_strings) + 1
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = []
+        for row in input_ids[:, self._prompt_length:].tolist():
+            start = 0
+            if self._enable_thinking: #stop strings in the thinking part do not count
+                try:
+                    start = row.index(_THINK_END) + 1
+                except ValueError:
+                    done.append(False)
+                    continue
+            tail = self._tokenizer.decode(row[max(start, len(row) - self._window):], skip_special_tokens=True)
+            done.append(any(stop in tail for stop in self._stop_strings))
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+class _ForwardCounter:
+    """Counts the forward() calls of a model while active, used for the speculative decoding statistics."""
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        self.calls = 0
+        self._model = model
+        self._handle = None
+
+    def __enter__(self) -> "_ForwardCounter":
+        self._handle = self._model.register_forward_pre_hook(self.__count)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._handle.remove()
+
+    def __count(self, module, args) -> None:
+        self.calls += 1
+
 #other model: Qwen/Qwen3-4B, or any models that is Qwen
 class LocalLLM:
-    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized", "_history", "_max_length")
+    __slots__ = ("_model", "_tokenizer", "_device", "logger", "_initialized", "_history", "_max_length", "_session", "_generation", "_load_mode",
+                 "_draft_model", "_draft_tokenizer", "_speculative_stats", "_stats_lock", "_prefix_cache", "__weakref__")
     
     _model: AutoModelForCausalLM
     _tokenizer: AutoTokenizer
@@ -16,12 +255,39 @@ class LocalLLM:
     _initialized: bool
     _history: list
     _max_length: int
+    _session: "ChatSession"
+    _generation: dict
+    _load_mode: str
+    _draft_model: Optional[AutoModelForCausalLM]
+    _draft_tokenizer: Optional[AutoTokenizer]
+    _speculative_stats: dict
+    _stats_lock: threading.Lock
+    _prefix_cache: Optional["PrefixCache"]
     
-    def __init__(self, model_name: str = "Qwen/Qwen3-0.6B", preferred_device: str = "cuda", memories_length: int = 4):
+    def __init__(self, model_name: str = "Qwen/Qwen3-0.6B", preferred_device: str = "cuda", memories_length: int = 4,
+                 max_new_tokens: int = 32768, enable_thinking: bool = True, thinking_budget: Optional[int] = None, stop_strings: Optional[List[str]] = None,
+                 load_mode: str = "auto", draft_model_name: Optional[str] = None, prefix_cache_bytes: int = 0):
+        """
+        load_mode: "auto" keeps the checkpoint dtype, "bfloat16" halves the memory of float32 weights,
+        "int8" quantizes the linear layers on CPU (about a quarter of float32, usually faster on CPU too).
+        draft_model_name: a small model of the same family (e.g. "Qwen/Qwen3-0.6B" for "Qwen/Qwen3-4B") that proposes tokens
+        the large model checks several at a time (assisted generation), the answers stay those of the large model.
+        Generations then start from an empty KV cache, sessions and the prefix cache do not reuse one.
+        prefix_cache_bytes: memory for the KV cache of prompt prefixes shared between ask calls (system prompts, few-shot examples), 0 = off, see PrefixCache.
+        """
         #check type
         enforce_type(preferred_device, str, "preferred_device")
         enforce_type(model_name, str, "model_name")
         enforce_type(memories_length, int, "memories_length")
+        enforce_type(draft_model_name, (str, type(None)), "draft_model_name")
+        if draft_model_name == model_name:
+            raise ValueError("draft_model_name must be a smaller model than model_name, not the same one")
+        enforce_type(load_mode, str, "load_mode")
+        enforce_type(prefix_cache_bytes, int, "prefix_cache_bytes")
+        if load_mode not in _LOAD_MODES:
+            raise ValueError(f"load_mode could only be {', '.join(_LOAD_MODES)}. Current value: {load_mode}")
+        generation = _check_generation({"max_new_tokens": max_new_tokens, "enable_thinking": enable_thinking,
+                                        "thinking_budget": thinking_budget, "stop_strings": stop_strings})
         
         #init
         super().__setattr__("_initialized", False)
@@ -35,6 +301,9 @@ class LocalLLM:
             preferred_devices.append("cuda")
         if "cpu" not in preferred_devices:
             preferred_devices.append("cpu")
+        if load_mode == "int8" and preferred_devices != ["cpu"]:
+            self.logger.warning("int8 dynamic quantization only runs on CPU, the model will be loaded on cpu")
+            preferred_devices = ["cpu"]
         
         #download if not founnd
         try:
@@ -46,18 +315,21 @@ class LocalLLM:
         self._model = None
         self._device = None
         
-        model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            torch_dtype="auto",   
-            low_cpu_mem_usage=True 
-        )
-        model.eval()
-
+        try:
+            estimate = self.estimate_memory(model_name, load_mode)
+            self.logger.info(f"Estimated memory for the weights of '{model_name}' ({load_mode}): {estimate / 1024 ** 3:.2f} GB")
+        except Exception as e:
+            self.logger.warning(f"Could not estimate the memory of '{model_name}': {e}")
+        
         for dev in preferred_devices:
+            # skip cuda if not available, the registry would read the weights before failing to move them
+            if dev.startswith("cuda") and not torch.cuda.is_available():
+                self.logger.info(f"Skipping {dev}: no CUDA available.")
+                continue
             try:
                 self.logger.info(f"Loading '{model_name}' model on {dev}...")
-                model_on_dev = model.to(dev)
-                self._model = model_on_dev
+                # shared with any other LocalLLM on the same weights, see ModelRegistry
+                self._model = get_model_registry().acquire(("causal_lm", model_name, dev, load_mode), lambda: _load_causal_lm(model_name, load_mode, dev), self)
                 self._device = dev
                 self.logger.info(f"Model successfully running on {dev}.")
                 break
@@ -66,9 +338,32 @@ class LocalLLM:
         
         if self._model is None:
             raise RuntimeError(f"Could not load model on any device: {preferred_devices}")
+        
+        self._draft_model = None
+        self._draft_tokenizer = None
+        if draft_model_name is not None:
+            self.logger.info(f"Loading draft model '{draft_model_name}' on {self._device}...")
+            self._draft_model = get_model_registry().acquire(("causal_lm", draft_model_name, self._device, load_mode),
+                                                             lambda: _load_causal_lm(draft_model_name, load_mode, self._device), self)
+            try:
+                draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name, local_files_only=True)
+            except Exception:
+                draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name)
+            if draft_tokenizer.get_vocab() != self._tokenizer.get_vocab():
+                # different vocabularies: candidates go through text (universal assisted generation), slower than sharing ids
+                self.logger.warning(f"'{draft_model_name}' does not share the tokenizer of '{model_name}', its tokens are re-encoded")
+                self._draft_tokenizer = draft_tokenizer
+        self._stats_lock = threading.Lock()
+        self._prefix_cache = PrefixCache(max_bytes=prefix_cache_bytes) if prefix_cache_bytes > 0 else None
+        if self._prefix_cache is not None and self._draft_model is not None:
+            self.logger.warning("The prefix cache is not used together with a draft model")
+        self._speculative_stats = {"generations": 0, "tokens": 0, "target_passes": 0, "draft_tokens": 0, "accepted_tokens": 0}
     
         self._history = []
         self._max_length = memories_length
+        self._generation = generation
+        self._load_mode = load_mode
+        self._session = ChatSession(self, history=self._history) #ask_with_memories turns, follows memories_length
         
         #lock
         super().__setattr__("_initialized", True)
@@ -85,6 +380,72 @@ class LocalLLM:
     def tokenizer(self):
         return self._tokenizer
     
+    @property
+    def load_mode(self) -> str:
+        return self._load_mode
+    
+    @property
+    def draft_model(self):
+        return self._draft_model
+    
+    @property
+    def prefix_cache(self) -> Optional["PrefixCache"]:
+        return self._prefix_cache
+    
+    @property
+    def speculative_stats(self) -> dict:
+        """
+        Returns the totals of the generations that used the draft model: tokens generated, passes of the large model,
+        tokens proposed by the draft and how many were accepted. acceptance_rate = accepted / proposed,
+        tokens_per_pass is the average number of tokens each pass of the large model produced (1.0 without a draft).
+        draft_tokens and accepted_tokens are approximations counted from the forward passes, not read from transformers:
+        draft_tokens is the number of draft passes (one proposed token each), accepted_tokens is tokens minus the passes
+        of the large model (each pass adds the accepted tokens plus one of its own), the last pass of a generation
+        cut by max_new_tokens or an end token can make them slightly off. tokens and target_passes are exact.
+        """
+        with self._stats_lock:
+            stats = dict(self._speculative_stats)
+        stats["acceptance_rate"] = stats["accepted_tokens"] / stats["draft_tokens"] if stats["draft_tokens"] else 0.0
+        stats["tokens_per_pass"] = stats["tokens"] / stats["target_passes"] if stats["target_passes"] else 0.0
+        return stats
+    
+    def reset_speculative_stats(self) -> None:
+        with self._stats_lock:
+            for name in self._speculative_stats:
+                self._speculative_stats[name] = 0
+    
+    @staticmethod
+    def estimate_memory(model_name: str, load_mode: str = "auto") -> int:
+        """
+        Returns the estimated bytes the weights of model_name take once loaded with load_mode, only the config is read.
+        Activations and the KV cache come on top of it and grow with the prompt and answer length.
+        """
+        enforce_type(model_name, str, "model_name")
+        if load_mode not in _LOAD_MODES:
+            raise ValueError(f"load_mode could only be {', '.join(_LOAD_MODES)}. Current value: {load_mode}")
+        try:
+            config = AutoConfig.from_pretrained(model_name, local_files_only=True)
+        except Exception:
+            config = AutoConfig.from_pretrained(model_name)
+        # build the model on the meta device: shapes only, no memory
+        with torch.device("meta"):
+            model = AutoModelForCausalLM.from_config(config)
+        
+        dtype = getattr(config, "dtype", None) or getattr(config, "torch_dtype", None) or torch.float32
+        if isinstance(dtype, str):
+            dtype = getattr(torch, dtype)
+        width = {"auto": dtype.itemsize, "bfloat16": 2, "int8": dtype.itemsize}[load_mode]
+        seen = set()
+        total = 0
+        for module in model.modules():
+            quantized = load_mode == "int8" and _is_quantizable(model, module)
+            for name, param in module.named_parameters(recurse=False):
+                if id(param) in seen:
+                    continue
+                seen.add(id(param))
+                total += param.numel() * (1 if quantized and name == "weight" else width) #int8 linear weights take 1 byte
+        return total
+    
     @property
     def memories_length(self):
         return self._max_length
@@ -95,63 +456,359 @@ class LocalLLM:
             raise ValueError("memories_length must be a non-negative integer.")
         self._max_length = value
     
-    def ask(self, messages: Union[list, str]):
-        """Sends a prompt to Qwen model and Returns the text response."""
+    @property
+    def generation_config(self) -> dict:
+        """Returns a copy of the default generation settings, see configure_generation."""
+        return dict(self._generation)
+    
+    def configure_generation(self, **settings) -> None:
+        """
+        Changes the default generation settings used by every ask method, the ones not given are kept:
+        max_new_tokens: cap on generated tokens (thinking included).
+        enable_thinking: False skips the thinking phase entirely, the cheapest option for simple prompts.
+        thinking_budget: tokens the model may think before </think> is forced and it has to answer (None = no limit).
+        stop_strings: the answer ends at the first of these strings, which is left out of the content.
+        Each ask method also takes these as keyword arguments to override them for one call.
+        """
+        self._generation.update(_check_generation(settings))
+    
+    def _resolve_generation(self, overrides: dict) -> dict:
+        """helper that Returns the default generation settings updated with the per-call overrides."""
+        settings = dict(self._generation)
+        settings.update(_check_generation(overrides))
+        return settings
+    
+    def ask(self, messages: Union[list, str], **generation):
+        """Sends a prompt to Qwen model and Returns the text response. generation overrides the settings of configure_generation."""
+        enforce_type(messages, (list, str), "messages")
+        settings = self._resolve_generation(generation)
+        
+        text = self.__chat_text(messages, settings["enable_thinking"])
+        
+        model_inputs = self._tokenizer([text], return_tensors="pt").to(self._device)
+        prompt_length = len(model_inputs.input_ids[0])
+        kwargs = self.__generate_kwargs(settings, prompt_length)
+        prefix = self.__use_prefix(model_inputs.input_ids, kwargs)
+        with torch.inference_mode():
+            generated_ids = self.__generate(
+                **model_inputs,
+                **kwargs
+            )
+        self.__keep_prefix(prefix, kwargs)
+        output_ids = generated_ids[0][prompt_length:].tolist()
+        return self.__split_output(output_ids, settings["stop_strings"])
+    
+    def ask_batch(self, batch: List[Union[list, str]], batch_size: Optional[int] = None, **generation) -> List[Tuple[str, str]]:
+        """
+        Sends several prompts (each one a str or a list of messages, like ask) through the model together
+        and Returns a (content, thinking_content) tuple for each, in the same order.
+        Prompts are left-padded into one generate call per batch_size prompts (None = all at once).
+        generation overrides the settings of configure_generation for the whole batch.
+        """
+        enforce_type(batch, list, "batch")
+        enforce_type(batch_size, (int, type(None)), "batch_size")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1, but got {batch_size}")
+        for messages in batch:
+            enforce_type(messages, (list, str), "messages")
+        settings = self._resolve_generation(generation)
+        
+        texts = [self.__chat_text(messages, settings["enable_thinking"]) for messages in batch]
+        step = batch_size or max(1, len(texts))
+        results = []
+        for start in range(0, len(texts), step):
+            results.extend(self.__generate_batch(texts[start:start + step], settings)[0])
+        return results
+    
+    def _prompt_ids(self, messages: Union[list, str], settings: dict) -> List[int]:
+        """helper for LLMScheduler: Returns the token ids of the prompt with the chat template applied."""
+        return self._tokenizer(self.__chat_text(messages, settings["enable_thinking"])).input_ids
+    
+    def _split_output(self, output_ids: List[int], settings: dict) -> Tuple[str, str]:
+        """helper for LLMScheduler: Returns (content, thinking_content) of generated ids, like ask."""
+        return self.__split_output(output_ids, settings["stop_strings"])
+    
+    def _ask_batch_counted(self, batch: List[Union[list, str]], settings: Optional[dict] = None) -> Tuple[List[Tuple[str, str]], int]:
+        """helper for LLMScheduler: one ask_batch generate call, also Returns the number of tokens generated."""
+        if not batch:
+            return [], 0
+        settings = settings or self._generation
+        return self.__generate_batch([self.__chat_text(messages, settings["enable_thinking"]) for messages in batch], settings)
+    
+    def ask_stream(self, messages: Union[list, str], **generation) -> Iterator[Tuple[str, str]]:
+        """
+        Same as ask, but yields (phase, text) pieces while the tokens are generated, phase is "thinking" or "answer".
+        Joining the pieces of each phase gives the thinking_content and content of ask.
+        Closing the generator early (e.g. break) stops the generation.
+        """
         enforce_type(messages, (list, str), "messages")
+        settings = self._resolve_generation(generation)
+        model_inputs = self._tokenizer([self.__chat_text(messages, settings["enable_thinking"])], return_tensors="pt").to(self._device)
+        return self.__stream(model_inputs, settings)
+    
+    def __stream(self, model_inputs, settings: dict) -> Iterator[Tuple[str, str]]:
+        streamer = _PhaseStreamer(self._tokenizer, settings["stop_strings"], settings["enable_thinking"])
+        cancel = threading.Event()
+        errors = []
+        kwargs = self.__generate_kwargs(settings, model_inputs.input_ids.shape[1])
+        kwargs["stopping_criteria"].append(_CancelCriteria(cancel))
+        prefix = self.__use_prefix(model_inputs.input_ids, kwargs)
+        
+        def run():
+            try:
+                with torch.inference_mode():
+                    self.__generate(
+                        **model_inputs,
+                        **kwargs,
+                        streamer=streamer
+                    )
+                self.__keep_prefix(prefix, kwargs)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                streamer.end()
+        
+        # generate runs on its own thread, pieces come back through the streamer queue
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = streamer.queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            cancel.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+    
+    def __use_prefix(self, input_ids: torch.Tensor, kwargs: dict) -> Optional[tuple]:
+        """Starts generation from the cached keys/values of the longest known prefix, Returns what __keep_prefix needs."""
+        # transformers' assisted generation gives other tokens when the cache already holds part of the prompt,
+        # with a draft model every generation starts from an empty cache
+        if self._prefix_cache is None or self._draft_model is not None:
+            return None
+        ids = input_ids[0].tolist()
+        cache, reused, source = self._prefix_cache.lookup(ids)
+        # a fresh cache also goes in, so the prompt keys/values can be kept afterwards
+        kwargs["past_key_values"] = cache if cache is not None else DynamicCache()
+        return ids, reused, source
+    
+    def __keep_prefix(self, prefix: Optional[tuple], kwargs: dict) -> None:
+        if prefix is not None:
+            ids, reused, source = prefix
+            self._prefix_cache.store(ids, kwargs["past_key_values"], reused, source)
+    
+    def __generate(self, **kwargs) -> torch.Tensor:
+        """Runs generate(), counting the passes of both models when the draft model is used."""
+        if "assistant_model" not in kwargs:
+            return self._model.generate(**kwargs)
+        with _ForwardCounter(self._model) as target, _ForwardCounter(self._draft_model) as draft:
+            generated_ids = self._model.generate(**kwargs)
+        tokens = generated_ids.shape[1] - kwargs["input_ids"].shape[1]
+        with self._stats_lock:
+            stats = self._speculative_stats
+            stats["generations"] += 1
+            stats["tokens"] += tokens
+            stats["target_passes"] += target.calls
+            stats["draft_tokens"] += draft.calls #one draft pass per proposed token
+            stats["accepted_tokens"] += max(0, tokens - target.calls) #every pass adds the accepted tokens plus one of its own
+        return generated_ids
+    
+    def __generate_kwargs(self, settings: dict, prompt_length: int, batch_size: int = 1) -> dict:
+        """Returns the generate() arguments for the settings: token cap, thinking budget, stop strings and the draft model."""
+        logits_processor = LogitsProcessorList()
+        stopping_criteria = StoppingCriteriaList()
+        if settings["enable_thinking"] and settings["thinking_budget"] is not None:
+            logits_processor.append(_ThinkingBudget(settings["thinking_budget"], prompt_length))
+        if settings["stop_strings"]:
+            stopping_criteria.append(_StopStringCriteria(self._tokenizer, settings["stop_strings"], prompt_length, settings["enable_thinking"]))
+        kwargs = {"max_new_tokens": settings["max_new_tokens"], "logits_processor": logits_processor, "stopping_criteria": stopping_criteria}
+        if self._draft_model is not None and batch_size == 1: #assisted generation only handles one sequence at a time
+            kwargs["assistant_model"] = self._draft_model
+            if self._draft_tokenizer is not None:
+                kwargs["tokenizer"] = self._tokenizer
+                kwargs["assistant_tokenizer"] = self._draft_tokenizer
+        return kwargs
+    
+    def __generate_batch(self, texts: List[str], settings: dict) -> Tuple[List[Tuple[str, str]], int]:
+        # decoder-only models continue from the last position, so padding must go on the left
+        padding_side = self._tokenizer.padding_side
+        self._tokenizer.padding_side = "left"
+        try:
+            model_inputs = self._tokenizer(texts, return_tensors="pt", padding=True).to(self._device)
+        finally:
+            self._tokenizer.padding_side = padding_side
         
+        pad_token_id = self._tokenizer.pad_token_id if self._tokenizer.pad_token_id is not None else self._tokenizer.eos_token_id
+        prompt_length = model_inputs.input_ids.shape[1]
+        with torch.inference_mode():
+            generated_ids = self.__generate(
+                **model_inputs,
+                **self.__generate_kwargs(settings, prompt_length, len(texts)),
+                pad_token_id=pad_token_id
+            )
+        results = []
+        generated = 0
+        for row in generated_ids:
+            output_ids = row[prompt_length:].tolist()
+            # rows that finished early are filled with padding up to the longest one
+            while output_ids and output_ids[-1] == pad_token_id:
+                output_ids.pop()
+            generated += len(output_ids)
+            results.append(self.__split_output(output_ids, settings["stop_strings"]))
+        return results, generated
+    
+    def __chat_text(self, messages: Union[list, str], enable_thinking: bool = True) -> str:
+        """Applies the chat template to a prompt or a list of messages."""
         if type(messages) is str:
             sent_mes = [{"role": "user", "content": messages}]
         else: sent_mes = messages
-        text = self._tokenizer.apply_chat_template(
+        return self._tokenizer.apply_chat_template(
             sent_mes,
             tokenize=False,
             add_generation_prompt=True,
-            enable_thinking=True
+            enable_thinking=enable_thinking
         )
-        
-        model_inputs = self._tokenizer([text], return_tensors="pt").to(self._device)
-        with torch.inference_mode():
-            generated_ids = self._model.generate(
-                **model_inputs,
-                max_new_tokens=32768
-            )
-        output_ids = generated_ids[0][len(model_inputs.input_ids[0]):].tolist()
-            
+    
+    def __split_output(self, output_ids: List[int], stop_strings: Optional[Tuple[str, ...]] = None) -> Tuple[str, str]:
+        """Splits generated ids at the last </think> token (151668) into (content, thinking_content), content ends before any stop string."""
         try:
-            index = len(output_ids) - output_ids[::-1].index(151668)
+            index = len(output_ids) - output_ids[::-1].index(_THINK_END)
         except ValueError:
             index = 0
     
         thinking_content = self._tokenizer.decode(output_ids[:index], skip_special_tokens=True).strip("\n")
-        content = self._tokenizer.decode(output_ids[index:], skip_special_tokens=True).strip("\n")
+        content = _cut_at_stop(self._tokenizer.decode(output_ids[index:], skip_special_tokens=True), stop_strings).strip("\n")
 
         return content, thinking_content
         
-    def ask_with_memories(self, prompt: str) -> tuple[str, str]:
+    def ask_with_memories(self, prompt: str, **generation) -> tuple[str, str]:
         """ 
         Sends a prompt to a language model, 
         including the history of the conversation to provide context, 
         then stores the new turn in its memory.
+        The keys/values computed for the previous turn are kept, so only the new part of the conversation is prefilled.
+        Since 0.7.0 the history is sent as user/assistant chat turns instead of one "Here's our previous conversation" message,
+        so answers can differ from earlier versions.
         """
         enforce_type(prompt, str, "prompt")
+        return self._session.ask(prompt, **generation)
+    
+    def new_session(self, memories_length: Optional[int] = None, max_cache_tokens: int = 8192) -> "ChatSession":
+        """Returns a separate conversation on this model with its own history and KV cache, see ChatSession."""
+        return ChatSession(self, memories_length=memories_length, max_cache_tokens=max_cache_tokens)
         
+    def _clear_history(self) -> None:
+        """helper function that clears the entire conversation history."""
+        self._session.clear()
+    
+    def _generate_cached(self, messages: list, cache: Optional[DynamicCache], cached_ids: List[int], settings: dict) -> Tuple[str, str, DynamicCache, List[int], int, int]:
+        """
+        helper for ChatSession: generates a reply reusing the cache for the longest token prefix shared with cached_ids.
+        Returns content, thinking_content, the cache after generation, the token ids it covers,
+        the number of reused tokens and the prompt length.
+        """
+        text = self.__chat_text(messages, settings["enable_thinking"])
+        input_ids = self._tokenizer([text], return_tensors="pt").input_ids.to(self._device)
+        ids = input_ids[0].tolist()
+        
+        reused = 0
+        if cache is not None and self._draft_model is None: #assisted generation cannot start from a filled cache, see __use_prefix
+            limit = min(len(cached_ids), len(ids) - 1) #at least one token has to go through the model
+            while reused < limit and cached_ids[reused] == ids[reused]:
+                reused += 1
+            if reused < cache.get_seq_length():
+                cache.crop(reused - cache.get_seq_length()) #negative: number of tokens to drop from the end
+        if reused == 0:
+            cache = DynamicCache()
+        
+        with torch.inference_mode():
+            generated_ids = self.__generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=cache,
+                **self.__generate_kwargs(settings, len(ids))
+            )
+        sequence = generated_ids[0].tolist()
+        content, thinking_content = self.__split_output(sequence[len(ids):], settings["stop_strings"])
+        # the last generated token was never fed back, the cache stops one short of the sequence
+        return content, thinking_content, cache, sequence[:cache.get_seq_length()], reused, len(ids)
+    
+    def __setattr__(self, name, value):
+        # once initialized, block these core attributes
+        if getattr(self, "_initialized", False) and name in ("_model", "_device", "_tokenizer", "_draft_model", "_draft_tokenizer"):
+            raise AttributeError(f"Cannot reassign '{name}' after initialization")
+        super().__setattr__(name, value)
+
+class ChatSession:
+    """
+    A conversation with a LocalLLM that keeps the keys/values (KV cache) of its last turn.
+    Every turn is sent as chat messages, and the cache is cropped to the longest token prefix shared with the previous turn,
+    so only the previous answer and the new prompt are prefilled instead of the whole conversation.
+    Dropping the oldest turn (memories_length reached) shifts every position, the cache is thrown away then.
+    A cache longer than max_cache_tokens is not kept.
+    """
+    __slots__ = ("_llm", "_history", "_max_length", "_cache", "_cached_ids", "max_cache_tokens", "last_reused_tokens", "last_prefilled_tokens")
+    
+    def __init__(self, llm: LocalLLM, memories_length: Optional[int] = None, max_cache_tokens: int = 8192, history: Optional[list] = None) -> None:
+        # memories_length None follows llm.memories_length, history is the list turns are stored in
+        enforce_type(llm, LocalLLM, "llm")
+        enforce_type(memories_length, (int, type(None)), "memories_length")
+        enforce_type(max_cache_tokens, int, "max_cache_tokens")
+        enforce_type(history, (list, type(None)), "history")
+        if memories_length is not None and memories_length < 0:
+            raise ValueError("memories_length must be a non-negative integer.")
+        self._llm = llm
+        self._history = history if history is not None else []
+        self._max_length = memories_length
+        self._cache: Optional[DynamicCache] = None
+        self._cached_ids: List[int] = []
+        self.max_cache_tokens = max_cache_tokens
+        self.last_reused_tokens = 0 #prompt tokens served from the cache on the last turn
+        self.last_prefilled_tokens = 0 #prompt tokens that went through the model on the last turn
+    
+    @property
+    def history(self) -> list:
+        return self._history
+    
+    @property
+    def memories_length(self) -> int:
+        return self._max_length if self._max_length is not None else self._llm.memories_length
+    
+    def ask(self, prompt: str, **generation) -> Tuple[str, str]:
+        """
+        Sends the prompt after the previous turns and Returns (content, thinking_content), the turn is then remembered.
+        generation overrides the settings of LocalLLM.configure_generation for this turn.
+        """
+        enforce_type(prompt, str, "prompt")
+        settings = self._llm._resolve_generation(generation)
         messages = []
-        line = "Here's our previous conversation:\n"
-        if self._history:
-            for turn in self._history:
-                line += f"User: {turn['question']}\nAI: {turn['answer']}\n"
-        line += "Now, continue the conversation:\n"
-        line += prompt
-        messages.append({"role": "user", "content": line})
-
-        content, thinking_content = self.ask(messages)
+        for turn in self._history:
+            messages.append({"role": "user", "content": turn["question"]})
+            messages.append({"role": "assistant", "content": turn["answer"]})
+        messages.append({"role": "user", "content": prompt})
+        
+        content, thinking_content, cache, cached_ids, reused, prompt_length = self._llm._generate_cached(messages, self._cache, self._cached_ids, settings)
+        self.last_reused_tokens = reused
+        self.last_prefilled_tokens = prompt_length - reused
+        if len(cached_ids) <= self.max_cache_tokens:
+            self._cache, self._cached_ids = cache, cached_ids
+        else:
+            self.invalidate()
         self.__add_turn(prompt, content)
         return content, thinking_content
-        
-    def _clear_history(self) -> None:
-        """helper function that clears the entire conversation history."""
-        if self._history:
-            self._history.clear()
+    
+    def clear(self) -> None:
+        """Forgets every turn and the cache."""
+        self._history.clear()
+        self.invalidate()
+    
+    def invalidate(self) -> None:
+        """Drops the cache, the next turn prefills the whole conversation."""
+        self._cache = None
+        self._cached_ids = []
     
     def __add_turn(self, question, answer) -> None:
         """
@@ -161,12 +818,164 @@ class LocalLLM:
         enforce_type(question, str, "question")
         enforce_type(answer, str, "answer")
     
-        while len(self._history) >= self._max_length:
-            self._history.pop(0)
+        if self.memories_length == 0:
+            self._history.clear()
+            self.invalidate()
+            return
+        if len(self._history) >= self.memories_length:
+            del self._history[:len(self._history) - self.memories_length + 1]
+            self.invalidate() #every cached position after the dropped turn moved
         self._history.append({"question": question, "answer": answer})
+
+class _Prefix:
+    __slots__ = ("length", "tensors", "hashes")
+
+    def __init__(self, length: int, tensors: List[Tuple[torch.Tensor, torch.Tensor]], hashes: List[bytes]) -> None:
+        self.length = length
+        self.tensors = tensors #keys and values of every layer, may be views of a longer entry
+        self.hashes = hashes #hash of every block boundary up to length
+
+class PrefixCache:
+    """
+    Keys/values (KV cache) of prompt prefixes shared by many LocalLLM.ask calls, e.g. the same system prompt or few-shot examples.
+    Prompts are cut into blocks of block_size tokens and every block boundary is keyed by a hash of the tokens before it,
+    so a new prompt finds the longest stored prefix it starts with and only its remaining tokens are prefilled.
+    A prompt with no match is stored whole (block aligned), one that matches part of a stored prompt stores that shared part,
+    entries are evicted least recently used first once they take more than max_bytes. Built by LocalLLM(prefix_cache_bytes=...).
+    """
+    __slots__ = ("max_bytes", "block_size", "min_tokens", "_entries", "_index", "_lock", "hits", "misses", "reused_tokens")
     
-    def __setattr__(self, name, value):
-        # once initialized, block these core attributes
-        if getattr(self, "_initialized", False) and name in ("_model", "_device", "_tokenizer"):
-            raise AttributeError(f"Cannot reassign '{name}' after initialization")
-        super().__setattr__(name, value)
\ No newline at end of file
+    def __init__(self, max_bytes: int = 1024 ** 3, block_size: int = 16, min_tokens: int = 64) -> None:
+        enforce_type(max_bytes, int, "max_bytes")
+        enforce_type(block_size, int, "block_size")
+        enforce_type(min_tokens, int, "min_tokens")
+        if block_size < 1:
+            raise ValueError(f"block_size must be >= 1, but got {block_size}")
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.min_tokens = min_tokens #shorter prefixes are not worth a copy of their cache
+        self._entries: "OrderedDict[bytes, _Prefix]" = OrderedDict() #least recently used first
+        self._index: Dict[bytes, set] = {} #block boundary hash -> keys of the entries that contain it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def memory(self) -> int:
+        with self._lock:
+            return self.__memory()
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+    
+    def lookup(self, ids: List[int]) -> Tuple[Optional[DynamicCache], int, Optional[bytes]]:
+        """
+        Returns a copy of the cache of the longest stored prefix of ids (at least one token is left to prefill),
+        its length and the key of the entry it came from, (None, 0, None) without a match.
+        """
+        hashes = self.__hashes(ids, len(ids) - 1)
+        with self._lock:
+            for blocks in range(len(hashes), 0, -1):
+                length = blocks * self.block_size
+                if length < self.min_tokens:
+                    break
+                keys = self._index.get(hashes[blocks - 1])
+                if keys:
+                    key = next(iter(keys))
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.reused_tokens += length
+                    return _build_cache(self._entries[key].tensors, length), length, key
+            self.misses += 1
+        return None, 0, None
+    
+    def store(self, ids: List[int], cache: DynamicCache, reused: int, source: Optional[bytes]) -> None:
+        """
+        Keeps the prefix of ids worth sharing after a generation whose cache covers at least the prompt ids:
+        the whole prompt after a miss, the shared part after a partial match of a longer entry, nothing after a full match.
+        The shared part is a view of the longer entry's keys/values, so it takes no memory of its own.
+        """
+        if source is None:
+            length = (len(ids) - 1) // self.block_size * self.block_size
+            tensors = _cache_tensors(cache)
+            if tensors is None:
+                return
+        else:
+            with self._lock:
+                entry = self._entries.get(source)
+                if entry is None or entry.length <= reused:
+                    return
+                tensors = entry.tensors
+            length = reused
+        if length < max(self.min_tokens, 1):
+            return
+        hashes = self.__hashes(ids, length)
+        key = hashes[-1]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+        tensors = [(keys[:, :, :length], values[:, :, :length]) for keys, values in tensors]
+        if source is None:
+            if sum(keys.nbytes + values.nbytes for keys, values in tensors) > self.max_bytes:
+                return
+            tensors = [(keys.clone(), values.clone()) for keys, values in tensors]
+        with self._lock:
+            self._entries[key] = _Prefix(length, tensors, hashes)
+            for h in hashes:
+                self._index.setdefault(h, set()).add(key)
+            while self.__memory() > self.max_bytes:
+                old_key, old = self._entries.popitem(last=False)
+                for h in old.hashes:
+                    self._index[h].discard(old_key)
+                    if not self._index[h]:
+                        del self._index[h]
+    
+    def __memory(self) -> int:
+        """Bytes held by the entries, storage shared between an entry and the views of it is counted once."""
+        storages = {}
+        for entry in self._entries.values():
+            for keys, values in entry.tensors:
+                for tensor in (keys, values):
+                    storage = tensor.untyped_storage()
+                    storages[storage.data_ptr()] = storage.nbytes()
+        return sum(storages.values())
+    
+    def __hashes(self, ids: List[int], limit: int) -> List[bytes]:
+        """Chained hashes of ids[:block_size], ids[:2 * block_size], ... for the blocks that fit in limit tokens."""
+        hashes = []
+        digest = b""
+        for end in range(self.block_size, limit + 1, self.block_size):
+            block = ",".join(map(str, ids[end - self.block_size:end])).encode("ascii")
+            digest = hashlib.blake2b(digest + block, digest_size=16).digest()
+            hashes.append(digest)
+        return hashes
+
+def _cache_tensors(cache: DynamicCache) -> Optional[List[Tuple[torch.Tensor, torch.Tensor]]]:
+    """
+    Returns the keys and values of every layer, read from cache.layers (transformers >= 4.54) or key_cache/value_cache before,
+    None when some layer cannot be cut to a prefix (sliding window, linear attention, or a layout this code does not know).
+    """
+    layers = getattr(cache, "layers", None)
+    if layers is not None:
+        if any(getattr(layer, "is_sliding", False) for layer in layers):
+            return None
+        tensors = [(getattr(layer, "keys", None), getattr(layer, "values", None)) for layer in layers]
+    else:
+        tensors = list(zip(getattr(cache, "key_cache", []), getattr(cache, "value_cache", [])))
+    if not tensors or not all(isinstance(keys, torch.Tensor) and isinstance(values, torch.Tensor) and keys.dim() == 4 for keys, values in tensors):
+        return None
+    return tensors
+
+def _build_cache(tensors: List[Tuple[torch.Tensor, torch.Tensor]], length: int) -> DynamicCache:
+    """Returns a new cache with the first length positions of every layer, generation never writes into the stored tensors."""
+    cache = DynamicCache()
+    for idx, (keys, values) in enumerate(tensors):
+        cache.update(keys[:, :, :length], values[:, :, :length], idx)
+    return cache
@@ -0,0 +1,142 @@
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from .log_set_up import setup_logging
+from .utils import enforce_type
+
+class _Entry:
+    __slots__ = ("value", "refs", "nbytes")
+
+    def __init__(self, value: Any, nbytes: int) -> None:
+        self.value = value
+        self.refs = 0
+        self.nbytes = nbytes
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models, so classes built on the same weights share one copy instead of each loading it.
+    Models are keyed by (kind, model name, device, dtype) and reference counted: acquire() ties a reference to its owner,
+    which is released when the owner is garbage collected.
+    Models nobody uses any more stay loaded while the total stays under max_memory bytes, the least recently used
+    are dropped first. max_memory None keeps nothing idle (a model is freed with its last owner), models in use are never dropped.
+    """
+
+    __slots__ = ("_entries", "_lock", "_max_memory", "logger")
+
+    def __init__(self, max_memory: Optional[int] = None) -> None:
+        enforce_type(max_memory, (int, type(None)), "max_memory")
+        self.logger = setup_logging(self.__class__.__name__)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict() #least recently used first
+        # loads happen under the lock, two owners asking for the same model at once wait for a single load
+        self._lock = threading.RLock()
+        self._max_memory = max_memory
+
+    @property
+    def max_memory(self) -> Optional[int]:
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, value: Optional[int]) -> None:
+        enforce_type(value, (int, type(None)), "max_memory")
+        with self._lock:
+            self._max_memory = value
+            self.__evict()
+
+    @property
+    def memory(self) -> int:
+        """Returns the bytes held by every registered model, in use or idle."""
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def acquire(self, key: Tuple[Hashable, ...], loader: Callable[[], Any], owner: Optional[object] = None) -> Any:
+        """
+        Returns the model registered under key, calling loader() to load it the first time.
+        The reference is released when owner is garbage collected, or by release(key) when owner is None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.logger.info(f"Loading {key}")
+                value = loader()
+                entry = _Entry(value, _size_of(value))
+                self._entries[key] = entry
+            else:
+                self.logger.info(f"Reusing {key} ({entry.refs} other users)")
+            entry.refs += 1
+            self._entries.move_to_end(key)
+            self.__evict()
+        if owner is not None:
+            weakref.finalize(owner, self.release, key)
+        return entry.value
+
+    def release(self, key: Tuple[Hashable, ...]) -> None:
+        """Drops one reference to the model, it may then be evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refs == 0:
+                return
+            entry.refs -= 1
+            self.__evict()
+
+    def info(self) -> List[Dict[str, Any]]:
+        """Returns key, users and bytes of every registered model, least recently used first."""
+        with self._lock:
+            return [{"key": key, "refs": entry.refs, "bytes": entry.nbytes} for key, entry in self._entries.items()]
+
+    def clear(self) -> None:
+        """Drops every idle model."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.refs == 0]:
+                del self._entries[key]
+
+    def __evict(self) -> None:
+        if self._max_memory is None:
+            self.clear()
+            return
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self._max_memory:
+                return
+            entry = self._entries[key]
+            if entry.refs == 0:
+                self.logger.info(f"Evicting {key} ({entry.nbytes / 1024 ** 2:.0f} MB)")
+                total -= entry.nbytes
+                del self._entries[key]
+        if total > self._max_memory:
+            self.logger.warning(f"Models in use take {total / 1024 ** 3:.2f} GB, above max_memory ({self._max_memory / 1024 ** 3:.2f} GB)")
+
+def _size_of(value: Any) -> int:
+    """Bytes of the tensors of a torch module (quantized packed weights included), 0 for anything else."""
+    state_dict = getattr(value, "state_dict", None)
+    if not callable(state_dict):
+        return 0
+    seen = set()
+    total = 0
+    pending = list(state_dict(keep_vars=True).values())
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (tuple, list)):
+            pending.extend(item)
+        elif hasattr(item, "element_size") and hasattr(item, "data_ptr"):
+            if item.data_ptr() in seen: #tied weights
+                continue
+            seen.add(item.data_ptr())
+            total += item.numel() * item.element_size()
+    return total
+
+def _from_pretrained(model_cls, model_name: str, device: str, **kwargs) -> Any:
+    """Loads a transformers model from the local cache (downloading it if missing) onto device, in eval mode."""
+    try:
+        model = model_cls.from_pretrained(model_name, local_files_only=True, **kwargs)
+    except Exception:
+        model = model_cls.from_pretrained(model_name, **kwargs)
+    model.to(device)
+    model.eval()
+    return model
+
+_registry = ModelRegistry()
+
+def get_model_registry() -> ModelRegistry:
+    """Returns the registry shared by LocalLLM, DecisionMaker, the translators, OpenAIWhisper and ImageCaptioner."""
+    return _registry
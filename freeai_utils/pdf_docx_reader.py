@@ -1,40 +1,159 @@
 import os
+import json
+import time
+import queue
+import hashlib
+import threading
+import multiprocessing
 import fitz # pip install pymupdf
 from pypdf import PdfReader # need pip install pypdf
 import pdfplumber # need pip install pdfplumber
-from typing import Optional
+from typing import Optional, Iterator, Tuple, List, Dict
 import logging
 logging.getLogger("pdfminer").setLevel(logging.ERROR) #stop the pdfminer from displaying logs that just info or debug
 from .log_set_up import setup_logging
 from .utils import enforce_type
+from .extraction_cache import ExtractionCache
 try:
     from docx import Document # need pip install python-docx
 except ImportError:
     Document = None
 
+def _page_range(total: int, fp: int, lp: Optional[int]) -> range:
+    end = lp + 1 if lp is not None else total
+    return range(fp, min(end, total))
+
+# page generators, one per backend: each opens its own handle and yields (page index, text)
+def _pypdf_pages(file_path: str, fp: int, lp: Optional[int]) -> Iterator[Tuple[int, str]]:
+    reader = PdfReader(file_path)
+    for i in _page_range(len(reader.pages), fp, lp):
+        yield i, reader.pages[i].extract_text() or ''
+
+def _fitz_pages(file_path: str, fp: int, lp: Optional[int]) -> Iterator[Tuple[int, str]]:
+    with fitz.open(file_path) as doc:
+        for i in _page_range(doc.page_count, fp, lp):
+            yield i, doc.load_page(i).get_text()
+
+def _pdfplumber_pages(file_path: str, fp: int, lp: Optional[int]) -> Iterator[Tuple[int, str]]:
+    with pdfplumber.open(file_path) as pdf:
+        for i in _page_range(len(pdf.pages), fp, lp):
+            page = pdf.pages[i]
+            # preserve layout spacing
+            txt = page.extract_text(x_tolerance=2, y_tolerance=2) or ''
+            page.close() #drop the parsed layout, pdfplumber keeps it for every page otherwise
+            yield i, txt
+
+_PDF_BACKENDS = {"pymupdf": _fitz_pages, "pypdf": _pypdf_pages, "pdfplumber": _pdfplumber_pages}
+_BACKEND_CHOICES = tuple(_PDF_BACKENDS) + ("auto",)
+
+# backends tried in order, a failing one hands over to the next from the page it stopped at
+_ALL_TEXT_BACKENDS = (("pypdf", _pypdf_pages), ("pymupdf", _fitz_pages))
+_ORDERED_TEXT_BACKENDS = (("pdfplumber", _pdfplumber_pages),) + _ALL_TEXT_BACKENDS
+
+# "auto" backend: time every backend on a few pages, smaller files keep the default order
+_AUTO_SAMPLE_PAGES = 3
+_AUTO_MIN_PAGES = 8
+_AUTO_MIN_WORDS_RATIO = 0.9 #a backend must find at least 90% of the words the best one found
+
+# page-level parallel extraction: smaller ranges are not worth starting processes for
+_PARALLEL_MIN_PAGES = 16
+_TASKS_PER_WORKER = 2 #each task re-opens the file, a few tasks per worker still balance uneven pages
+
+class _ImageWriter:
+    """
+    Writes files on background threads from a buffer bounded in bytes, put() waits while the buffer is full.
+    With 0 writers files are written right away in the calling thread.
+    """
+
+    def __init__(self, writers: int, max_bytes: int) -> None:
+        self._queue = queue.Queue()
+        self._space = threading.Condition()
+        self._pending = 0 #bytes queued and not written yet
+        self._max_bytes = max_bytes
+        self._error: Optional[BaseException] = None
+        self._threads = [threading.Thread(target=self.__run, daemon=True) for _ in range(writers)]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, path: str, data: bytes) -> None:
+        if self._error is not None:
+            raise self._error
+        if not self._threads:
+            _write_file(path, data)
+            return
+        with self._space:
+            # an image larger than the whole buffer still goes through once the buffer is empty
+            while self._pending and self._pending + len(data) > self._max_bytes:
+                self._space.wait()
+            self._pending += len(data)
+        self._queue.put((path, data))
+
+    def close(self) -> None:
+        """Waits for every queued file to be written, raises the first write error if any."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._error is not None:
+            raise self._error
+
+    def __run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, data = item
+            try:
+                if self._error is None:
+                    _write_file(path, data)
+            except Exception as e:
+                self._error = e
+            finally:
+                with self._space:
+                    self._pending -= len(data)
+                    self._space.notify_all()
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
+
 class PDF_DOCX_Reader:
-    def __init__(self, start_page: int = 0, last_page: Optional[int] = None) -> None:
+    def __init__(self, start_page: int = 0, last_page: Optional[int] = None, cache: Optional[ExtractionCache] = None, backend: Optional[str] = None) -> None:
         # Initialize with optional page range.
         # Supports PDF and DOCX formats.
         # param first_page: zero-based index of first page to process
         # param last_page: zero-based index of last page, None means all pages
+        # param cache: optional ExtractionCache, extracted text is reused across runs when the file is unchanged
+        # param backend: PDF backend tried first, "pymupdf", "pypdf", "pdfplumber" or "auto" (sample a few pages, keep the fastest good one)
+        #                None keeps the default order of each method, the other backends stay as fallbacks
         enforce_type(start_page, int, "first_page")
         enforce_type(last_page, (int, type(None)), "last_page")
+        enforce_type(cache, (ExtractionCache, type(None)), "cache")
+        self.__check_backend(backend)
         
         self.first_page = start_page
         self.last_page = last_page
+        self.cache = cache
+        self.backend = backend
         #for logging only this class rather
         self.logger = setup_logging(self.__class__.__name__)
         self.logger.info(f"Initialize successfully")
 
-    def extract_all_text(self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None) -> str:
+    def extract_all_text(self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None, page_separator: str = '\n',
+                         backend: Optional[str] = None, workers: Optional[int] = 1) -> str:
         """ Extracts and returns all text from a .pdf or .docx file into a single string. It can process a specific range of pages from a file."""
         # Extract all text into a single string.
         # Tries pypdf for PDF, Document for DOCX, and falls back to fitz for PDFs.
+        # PDF pages are joined with page_separator (use '\f' to keep page boundaries)
+        # workers > 1 splits the pages of a large PDF across worker processes (None = every core)
         
         #check type
         enforce_type(first_page, (int, type(None)), "first_page")
         enforce_type(last_page, (int, type(None)), "last_page")
+        enforce_type(page_separator, str, "page_separator")
+        backend = self.__check_backend(backend)
+        workers = self.__check_workers(workers)
         
         enforce_type(file_path, str, file_path)
         ext = self.__isSupported(file_path) #extract the end (file type)
@@ -45,6 +164,15 @@ class PDF_DOCX_Reader:
 
         self.logger.info(f"Detect file type: {ext}")
         
+        method = ExtractionCache.method_key("all", page_separator, backend)
+        cached = self.__cache_get(file_path, ext, method, fp, lp)
+        if cached is not None:
+            return cached
+        text = self.__extract_all_text(file_path, ext, fp, lp, page_separator, backend, workers)
+        self.__cache_put(file_path, ext, method, fp, lp, text)
+        return text
+
+    def __extract_all_text(self, file_path: str, ext: str, fp: int, lp: Optional[int], sep: str, backend: Optional[str] = None, workers: int = 1) -> str:
         # DOCX
         if ext == '.docx':
             if Document is None:
@@ -66,42 +194,23 @@ class PDF_DOCX_Reader:
                 self.logger.error(f"Fail to get text from file {file_path} with error {e}")
                 return ""
 
-        # PDF
-        text = []
-        try:
-            reader = PdfReader(file_path)
-            pages = reader.pages
-            total = len(pages)
-            end = lp + 1 if lp is not None else total
-            for i in range(fp, min(end, total)):
-                page = pages[i]
-                txt = page.extract_text() or ''
-                text.append(txt)
-            return '\n'.join(text)
-           
-        except Exception:
-            # fallback to fitz if can't use pypdf
-            self.logger.error(f"Fail to use pypdf, fallback to fitz to extract file")
-            doc = fitz.open(file_path)
-            total = doc.page_count
-            end = lp + 1 if lp is not None else total
-            try:
-                for i in range(fp, min(end, total)):
-                    page = doc.load_page(i)
-                    text.append(page.get_text())
-                return '\n'.join(text)
-            except Exception as e:
-                self.logger.error(f"Fail to get text from file {file_path} with error {e}")
-                return ""
+        # PDF, pypdf then fitz unless another backend is chosen
+        return sep.join(txt for _, txt in self.__stream_pages(file_path, fp, lp, _ALL_TEXT_BACKENDS, backend, workers, ordered=False))
 
-    def extract_ordered_text( self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None) -> str:
+    def extract_ordered_text( self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None, page_separator: str = '\n',
+                             backend: Optional[str] = None, workers: Optional[int] = 1) -> str:
         """Extracts and returns text from a file while preserving its layout and order."""
         # Extract text maintaining layout using pdfplumber for PDFs,
         # or fallback to fitz. DOCX behaves same as extract_all_text.
+        # PDF pages are joined with page_separator (use '\f' to keep page boundaries)
+        # workers > 1 splits the pages of a large PDF across worker processes (None = every core)
         
         #check type
         enforce_type(first_page, (int, type(None)), "first_page")
         enforce_type(last_page, (int, type(None)), "last_page")
+        enforce_type(page_separator, str, "page_separator")
+        backend = self.__check_backend(backend)
+        workers = self.__check_workers(workers)
 
         #path, file checking
         enforce_type(file_path, str, "file_path")
@@ -110,6 +219,15 @@ class PDF_DOCX_Reader:
         fp = first_page if first_page is not None else self.first_page
         lp = last_page if last_page is not None else self.last_page
         
+        method = ExtractionCache.method_key("ordered", page_separator, backend)
+        cached = self.__cache_get(file_path, ext, method, fp, lp)
+        if cached is not None:
+            return cached
+        text = self.__extract_ordered_text(file_path, ext, fp, lp, page_separator, backend, workers)
+        self.__cache_put(file_path, ext, method, fp, lp, text)
+        return text
+
+    def __extract_ordered_text(self, file_path: str, ext: str, fp: int, lp: Optional[int], sep: str, backend: Optional[str] = None, workers: int = 1) -> str:
         # DOCX same as extract_all_text
         if ext == '.docx':
             #adjust here the code please
@@ -132,33 +250,177 @@ class PDF_DOCX_Reader:
                 return "\n".join(parts)
             except Exception:
                 self.logger.error("Fail to do extract_ordered_text for docx file, trying extract_all_text instead")
-                return self.extract_all_text(file_path, fp, lp)
+                return self.extract_all_text(file_path, fp, lp, sep, backend)
         
-        # PDF using pdfplumber
-        text = []
+        # PDF using pdfplumber, then the extract_all_text backends, unless another backend is chosen
+        return sep.join(txt for _, txt in self.__stream_pages(file_path, fp, lp, _ORDERED_TEXT_BACKENDS, backend, workers, ordered=True))
+
+    def iter_pages(self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None,
+                   backend: Optional[str] = None, workers: Optional[int] = 1) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (page index, text) for every page of a .pdf as soon as it is extracted, with the same backends as extract_all_text.
+        Pages are never gathered into one string, so the caller can start working on the first page while the rest is parsed.
+        A .docx file has no pages and is yielded once as page 0. With workers > 1 pages are extracted ahead by worker processes and still yielded in order.
+        """
+        return self.__iter(file_path, first_page, last_page, backend, workers, False)
+
+    def iter_ordered_pages(self, file_path: str = None, first_page: Optional[int] = None, last_page: Optional[int] = None,
+                           backend: Optional[str] = None, workers: Optional[int] = 1) -> Iterator[Tuple[int, str]]:
+        """Same as iter_pages, with the layout preserving extraction of extract_ordered_text."""
+        return self.__iter(file_path, first_page, last_page, backend, workers, True)
+
+    def __iter(self, file_path: str, first_page: Optional[int], last_page: Optional[int], backend: Optional[str], workers: Optional[int], ordered: bool) -> Iterator[Tuple[int, str]]:
+        # checks run now, not on the first next() of the generator
+        enforce_type(first_page, (int, type(None)), "first_page")
+        enforce_type(last_page, (int, type(None)), "last_page")
+        enforce_type(file_path, str, "file_path")
+        backend = self.__check_backend(backend)
+        workers = self.__check_workers(workers)
+        ext = self.__isSupported(file_path)
+
+        fp = first_page if first_page is not None else self.first_page
+        lp = last_page if last_page is not None else self.last_page
+        if ext == '.docx':
+            docx_extract = self.__extract_ordered_text if ordered else self.__extract_all_text
+            return iter([(0, docx_extract(file_path, ext, fp, lp, '\n', backend))])
+        backends = _ORDERED_TEXT_BACKENDS if ordered else _ALL_TEXT_BACKENDS
+        return self.__stream_pages(file_path, fp, lp, backends, backend, workers, ordered)
+
+    def __stream_pages(self, file_path: str, fp: int, lp: Optional[int], backends, backend: Optional[str] = None,
+                       workers: int = 1, ordered: bool = False) -> Iterator[Tuple[int, str]]:
+        """Yields the pages from the first backend, if it fails the next one resumes from the page it could not read."""
+        if backend == "auto":
+            backend = self.__pick_backend(file_path, fp, lp, backends)
+        if workers != 1:
+            yield from self.__parallel_pages(file_path, fp, lp, backends, backend, workers, ordered)
+            return
+        if backend is not None: #chosen backend first, the default ones stay as fallbacks
+            backends = ((backend, _PDF_BACKENDS[backend]),) + tuple(b for b in backends if b[0] != backend)
+        next_page = fp
+        error = None
+        for name, pages in backends:
+            try:
+                for i, txt in pages(file_path, next_page, lp):
+                    next_page = i + 1
+                    yield i, txt
+                return
+            except Exception as e:
+                error = e
+                self.logger.error(f"Fail to use {name} from page {next_page} with error {e}, fallback to the next backend")
+        if next_page == fp: #no backend could read anything, the file itself is the problem
+            raise error
+        self.logger.error(f"Fail to get text from file {file_path} from page {next_page}")
+
+    def __pick_backend(self, file_path: str, fp: int, lp: Optional[int], backends) -> str:
+        """
+        Times every backend on a few pages from the middle of the range and returns the fastest one
+        whose text is acceptable (close to the word count of the best backend). Small ranges keep the default backend.
+        """
         try:
-            with pdfplumber.open(file_path) as pdf:
-                total = len(pdf.pages)
-                end = lp + 1 if lp is not None else total
-                for i in range(fp, min(end, total)):
-                    page = pdf.pages[i]
-                    # preserve layout spacing
-                    txt = page.extract_text(x_tolerance=2, y_tolerance=2) or ''
-                    text.append(txt)
-            return '\n'.join(text)
+            with fitz.open(file_path) as doc:
+                pages = _page_range(doc.page_count, fp, lp)
         except Exception:
-            # fallback to fitz
-            self.logger.info(f"Fail to use pdflumber, fallback to fitz to extract file")
-            return self.extract_all_text(file_path, fp, lp)
+            return backends[0][0]
+        if len(pages) < _AUTO_MIN_PAGES:
+            return backends[0][0]
+
+        start_page = pages[(len(pages) - _AUTO_SAMPLE_PAGES) // 2]
+        results = {}
+        fastest, fastest_words = float("inf"), [] #time and words per sample page of the fastest finished backend
+        for name, extract in _PDF_BACKENDS.items(): #usually fastest first, so the slow ones are cut short
+            start = time.perf_counter()
+            words = []
+            try:
+                for _, txt in extract(file_path, start_page, start_page + _AUTO_SAMPLE_PAGES - 1):
+                    words.append(len(txt.split()))
+                    # slower than the fastest one and not finding clearly more text: cannot win anymore
+                    if time.perf_counter() - start > fastest and sum(words) * _AUTO_MIN_WORDS_RATIO <= sum(fastest_words[:len(words)]):
+                        break
+                else:
+                    elapsed = time.perf_counter() - start
+                    results[name] = (elapsed, sum(words))
+                    if elapsed < fastest:
+                        fastest, fastest_words = elapsed, words
+            except Exception as e:
+                self.logger.info(f"Backend {name} failed on the sample pages of {file_path}: {e}")
+        if not results:
+            return backends[0][0]
+
+        most_words = max(words for _, words in results.values())
+        good = [name for name, (_, words) in results.items() if words >= most_words * _AUTO_MIN_WORDS_RATIO]
+        chosen = min(good, key=lambda name: results[name][0])
+        self.logger.info(f"Auto backend for {file_path}: {chosen} ({', '.join(f'{n} {t * 1000:.0f}ms/{w} words' for n, (t, w) in results.items())})")
+        return chosen
+
+    def __parallel_pages(self, file_path: str, fp: int, lp: Optional[int], backends, backend: Optional[str], workers: int, ordered: bool) -> Iterator[Tuple[int, str]]:
+        """
+        Splits the page range into contiguous slices extracted by a process pool, each worker opening the file itself.
+        Slices come back in page order. Small ranges, and callers that are pool workers themselves, stay sequential.
+        """
+        try:
+            with fitz.open(file_path) as doc:
+                pages = _page_range(doc.page_count, fp, lp)
+        except Exception: #let the sequential path try every backend
+            pages = range(0)
+        if len(pages) < _PARALLEL_MIN_PAGES or multiprocessing.current_process().daemon:
+            yield from self.__stream_pages(file_path, fp, lp, backends, backend)
+            return
+
+        n_tasks = min(len(pages), workers * _TASKS_PER_WORKER)
+        step = -(-len(pages) // n_tasks)
+        tasks = [(file_path, start, min(start + step, pages.stop) - 1, backend, ordered) for start in range(pages.start, pages.stop, step)]
+        self.logger.info(f"Extracting {len(pages)} pages of {file_path} with {min(workers, len(tasks))} workers")
+
+        found = False
+        pool = multiprocessing.Pool(processes=min(workers, len(tasks)), initializer=_init_page_worker)
+        try:
+            for (_, start, last, _, _), (results, error) in zip(tasks, pool.imap(_extract_page_range, tasks)):
+                if error is not None:
+                    self.logger.error(f"Fail to get pages {start}-{last} from file {file_path} with error {error}")
+                for item in results:
+                    found = True
+                    yield item
+        finally:
+            pool.terminate()
+            pool.join()
+        if not found:
+            raise RuntimeError(f"Fail to get any page from file {file_path}")
+
+    def __check_workers(self, workers: Optional[int]) -> int:
+        enforce_type(workers, (int, type(None)), "workers")
+        if workers is None:
+            return os.cpu_count() or 1
+        if workers < 1:
+            raise ValueError(f"workers must be >= 1, but got {workers}")
+        return workers
+
+    def __check_backend(self, backend: Optional[str]) -> Optional[str]:
+        """Validates a per call backend and returns the one to use, falling back to the one given at init."""
+        enforce_type(backend, (str, type(None)), "backend")
+        if backend is not None and backend not in _BACKEND_CHOICES:
+            raise ValueError(f"backend could only be {', '.join(_BACKEND_CHOICES)}. Current value: {backend}")
+        return backend if backend is not None else getattr(self, "backend", None)
 
-    def extract_images(self, file_path: str = None, folder_extract: str = "extracted_images", first_page: Optional[int] = None, last_page: Optional[int] = None) -> int:
+    def extract_images(self, file_path: str = None, folder_extract: str = "extracted_images", first_page: Optional[int] = None, last_page: Optional[int] = None,
+                       writers: int = 1, max_buffer_bytes: int = 64 * 1024 * 1024, manifest: bool = False) -> int:
         """Extracts images from a PDF or DOCX file and saves them to a specified folder. """
         # Extract images from PDF using fitz (PyMuPDF).
-        # Saves images to folder_extract, and returns count.
+        # Saves images to folder_extract, and returns count (every occurrence, a repeated image counts on each page).
+        # Each image is decoded and written once: repeats are found by xref, then by content hash.
+        # param writers: threads writing the files while extraction goes on, 0 writes in the calling thread
+        # param max_buffer_bytes: image bytes allowed to wait for the writers, extraction pauses above it
+        # param manifest: also write manifest.json mapping each page number to its image files (DOCX images are under page 0)
    
         #check type
         enforce_type(first_page, (int, type(None)), "first_page")
         enforce_type(last_page, (int, type(None)), "last_page")
+        enforce_type(writers, int, "writers")
+        enforce_type(max_buffer_bytes, int, "max_buffer_bytes")
+        enforce_type(manifest, bool, "manifest")
+        if writers < 0:
+            raise ValueError(f"writers must be >= 0, but got {writers}")
+        if max_buffer_bytes <= 0:
+            raise ValueError(f"max_buffer_bytes must be positive, but got {max_buffer_bytes}")
 
         #path, file checking
         enforce_type(file_path, str, "file_path")
@@ -169,48 +431,110 @@ class PDF_DOCX_Reader:
 
         os.makedirs(folder_extract, exist_ok=True) #folder create or use existence one
         count = 0
+        pages: Dict[int, List[str]] = {} #page number -> image files, in order of appearance
+        files: Dict[str, dict] = {} #image file -> hash, size and pages it appears on
+        by_hash: Dict[str, str] = {} #content hash -> image file
+
+        def store(img_bytes: bytes, name: str) -> str:
+            """Queues the image for writing unless the same bytes were already stored, returns the file holding them."""
+            digest = hashlib.sha256(img_bytes).hexdigest()
+            if digest not in by_hash:
+                by_hash[digest] = name
+                files[name] = {"sha256": digest, "bytes": len(img_bytes), "pages": []}
+                writer.put(os.path.join(folder_extract, name), img_bytes)
+            return by_hash[digest]
 
         self.logger.info(f"Detect file type: {ext}")
         
-        if ext == '.pdf':
-            doc = fitz.open(file_path)
-            total = doc.page_count
-            end = lp + 1 if lp is not None else total
-            for i in range(fp, min(end, total)):
-                page = doc.load_page(i)
-                images = page.get_images(full=True)
-                for img_index, img in enumerate(images):
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    img_bytes = base_image["image"]
-                    extn = base_image.get("ext", "png")
-                    img_name = f"page{i+1}_img{img_index+1}.{extn}"
-                    out_path = os.path.join(folder_extract, img_name)
-                    with open(out_path, 'wb') as f:
-                        f.write(img_bytes)
+        writer = _ImageWriter(writers, max_buffer_bytes)
+        try:
+            if ext == '.pdf':
+                by_xref: Dict[int, str] = {} #image object -> file, a repeated logo is only decoded once
+                with fitz.open(file_path) as doc:
+                    for i in _page_range(doc.page_count, fp, lp):
+                        page = doc.load_page(i)
+                        names = pages.setdefault(i + 1, [])
+                        for img_index, img in enumerate(page.get_images(full=True)):
+                            xref = img[0]
+                            if xref not in by_xref:
+                                base_image = doc.extract_image(xref)
+                                extn = base_image.get("ext", "png")
+                                by_xref[xref] = store(base_image["image"], f"page{i+1}_img{img_index+1}.{extn}")
+                            names.append(by_xref[xref])
+                            count += 1
+            else:
+                # DOCX image extraction using related_parts
+                if Document is None:
+                    raise ImportError("python-docx is required to extract images from DOCX files.")
+                doc = Document(file_path)
+                # collect all image parts
+                image_parts = [part for part in doc.part.related_parts.values()
+                               if hasattr(part, 'content_type') and part.content_type.startswith('image/')]
+                names = pages.setdefault(0, [])
+                for part in image_parts:
+                    names.append(store(part.blob, os.path.basename(part.partname)))
                     count += 1
-        else:
-            # DOCX image extraction using related_parts
-            if Document is None:
-                raise ImportError("python-docx is required to extract images from DOCX files.")
-            doc = Document(file_path)
-            # collect all image parts
-            image_parts = [part for part in doc.part.related_parts.values()
-                           if hasattr(part, 'content_type') and part.content_type.startswith('image/')]
-            for part in image_parts:
-                img_bytes = part.blob
-                img_name = os.path.basename(part.partname)
-                out_path = os.path.join(folder_extract, img_name)
-                with open(out_path, 'wb') as f:
-                    f.write(img_bytes)
-                count += 1
-
-        self.logger.info(f"Complete extracted images in file {file_path} to folder {folder_extract}")
+        except BaseException:
+            # the extraction error is the one to report, a write error on top of it is only logged
+            try:
+                writer.close()
+            except Exception as e:
+                self.logger.error(f"Fail to write images to {folder_extract} with error {e}")
+            raise
+        writer.close()
+
+        for page_number, names in pages.items():
+            for name in dict.fromkeys(names):
+                files[name]["pages"].append(page_number)
+        if manifest:
+            with open(os.path.join(folder_extract, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"source": file_path, "pages": {str(k): v for k, v in pages.items()}, "files": files}, f, indent=2)
+
+        self.logger.info(f"Complete extracted images in file {file_path} to folder {folder_extract}: {count} found, {len(files)} unique written")
         return count #return number of images found in the file
 
+    def __cache_get(self, file_path: str, ext: str, method: str, fp: int, lp: Optional[int]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        if ext == '.docx': #docx has no pages, every range gives the same text
+            fp, lp = 0, None
+        text = self.cache.get(file_path, method, fp, lp)
+        if text is not None:
+            self.logger.info(f"Cache hit for {file_path}")
+        return text
+
+    def __cache_put(self, file_path: str, ext: str, method: str, fp: int, lp: Optional[int], text: str) -> None:
+        if self.cache is None:
+            return
+        if ext == '.docx':
+            fp, lp = 0, None
+        try:
+            self.cache.put(file_path, method, fp, lp, text)
+        except OSError as e:
+            self.logger.error(f"Fail to store {file_path} in cache with error {e}")
+
     def __isSupported(self, file_path : str) -> str:
         if file_path:
             ext = os.path.splitext(file_path)[1].lower()
             if ext not in ['.pdf', '.docx']:
                 raise ValueError(f"Unsupported file type: {ext}")
-            return ext
\ No newline at end of file
+            return ext
+
+# one reader per page worker process, created by the pool initializer
+_page_reader: Optional[PDF_DOCX_Reader] = None
+
+def _init_page_worker() -> None:
+    global _page_reader
+    _page_reader = PDF_DOCX_Reader()
+
+def _extract_page_range(task: Tuple[str, int, int, Optional[str], bool]) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """Extracts one slice of pages in a worker, returning ((page index, text) list, error)."""
+    global _page_reader
+    file_path, start, last, backend, ordered = task
+    if _page_reader is None:
+        _page_reader = PDF_DOCX_Reader()
+    extract = _page_reader.iter_ordered_pages if ordered else _page_reader.iter_pages
+    try:
+        return list(extract(file_path, start, last, backend=backend)), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
@@ -0,0 +1,77 @@
+import pytest
+from freeai_utils.corpus_store import CorpusStore
+from freeai_utils.keyword_index import KeywordIndex, IndexedDocuments
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    documents = {"a.pdf": "Python is a language. Snakes", "b.docx": "Tiếng Việt có dấu. Python again", "empty.pdf": ""}
+    CorpusStore.write(path, documents, {"a.pdf": (10, 20), "b.docx": (30, 40)})
+    return path
+
+def test_round_trip(corpus_file):
+    store = CorpusStore(corpus_file)
+    assert list(store) == ["a.pdf", "b.docx", "empty.pdf"]
+    assert store["b.docx"] == "Tiếng Việt có dấu. Python again"
+    assert store["empty.pdf"] == ""
+    assert "missing.pdf" not in store
+    assert store.manifest == {"a.pdf": (10, 20), "b.docx": (30, 40), "empty.pdf": (-1, -1)}
+    store.close()
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a corpus file at all, just some bytes")
+    with pytest.raises(ValueError):
+        CorpusStore(str(path))
+    with pytest.raises(FileNotFoundError):
+        CorpusStore(str(tmp_path / "missing.bin"))
+
+def test_overwrite_while_open(corpus_file):
+    store = CorpusStore(corpus_file)
+    CorpusStore.write(corpus_file, {"c.pdf": "New text"})
+    assert store["a.pdf"] == "Python is a language. Snakes" #the old mapping stays readable
+    store.close()
+    assert dict(CorpusStore(corpus_file)) == {"c.pdf": "New text"}
+
+def test_indexed_documents_over_base(corpus_file):
+    docs = IndexedDocuments(KeywordIndex())
+    docs.load_base(CorpusStore(corpus_file))
+    assert len(docs) == 3
+    assert list(docs.index.search("python").keys()) == ["a.pdf", "b.docx"]
+
+    docs["a.pdf"] = "No snakes here"
+    docs["c.pdf"] = "More python"
+    del docs["b.docx"]
+    assert list(docs) == ["a.pdf", "empty.pdf", "c.pdf"]
+    assert docs["a.pdf"] == "No snakes here"
+    assert "b.docx" not in docs and len(docs) == 3
+    assert docs.index.search("python") == {"c.pdf": ["More python"]}
+    with pytest.raises(KeyError):
+        del docs["b.docx"]
+
+
+def test_changes_wait_for_base_indexing(corpus_file):
+    index = KeywordIndex()
+    docs = IndexedDocuments(index)
+    docs.load_base(CorpusStore(corpus_file))
+    docs["c.pdf"] = "More python"
+    del docs["a.pdf"]
+    assert len(index) == 0 #nothing indexed before the first search
+    assert list(docs.index.search("python").keys()) == ["b.docx", "c.pdf"]
+    assert len(index) == 3
+
+def test_swap_base_keeps_index(corpus_file, tmp_path):
+    docs = IndexedDocuments(KeywordIndex())
+    docs.load_base(CorpusStore(corpus_file))
+    docs["c.pdf"] = "More python"
+    before = docs.index.search("python")
+    saved = str(tmp_path / "saved.bin")
+    CorpusStore.write(saved, docs)
+    docs.swap_base(CorpusStore(saved))
+    assert list(docs) == ["a.pdf", "b.docx", "empty.pdf", "c.pdf"]
+    assert docs.index.search("python") == before #sentences are now read from the new file
+
+def test_before_replace(corpus_file):
+    store = CorpusStore(corpus_file)
+    CorpusStore.write(corpus_file, dict(store), before_replace=store.close)
+    assert dict(CorpusStore(corpus_file))["a.pdf"] == "Python is a language. Snakes"
@@ -1,5 +1,6 @@
 import pytest
 import gc
+import time
 from freeai_utils.decider import DecisionMaker
 
 @pytest.fixture(scope="module")
@@ -69,4 +70,71 @@ def test_func(decision_model):
     ]
     decision_model.config_default_internet_search() #guide for model
     for idx, ques in enumerate(example_questions):
-        assert decision_model.decide(ques) == example_ans[idx]
\ No newline at end of file
+        assert decision_model.decide(ques) == example_ans[idx]
+
+
+def test_decide_batch(decision_model):
+    decision_model.config_default_internet_search()
+    questions = ["What is the price of gold today?", "What is the boiling point of water?", "Who won the last Champions League final?"]
+    assert decision_model.decide_batch(questions, batch_size=2) == [decision_model.decide(q) for q in questions]
+    assert decision_model.decide_batch([]) == []
+    with pytest.raises(ValueError):
+        decision_model.decide_batch(questions, batch_size=0)
+
+
+def test_score(decision_model):
+    decision_model.config_default_internet_search()
+    label, confidence = decision_model.score("What is the price of Bitcoin right now?")
+    assert label in ("SEARCH_INTERNET", "NO_SEARCH_NEEDED")
+    assert 0.5 <= confidence <= 1.0
+    
+    questions = ["What is the weather like in Paris tomorrow?", "What is the chemical formula for salt?"]
+    batch = decision_model.score_batch(questions, batch_size=1)
+    for question, (label, confidence) in zip(questions, batch):
+        single = decision_model.score(question)
+        assert single[0] == label
+        assert abs(single[1] - confidence) < 1e-4
+    
+    label, _ = decision_model.score("Is the sky blue?", labels=["yes", "no", "maybe"])
+    assert label in ("YES", "NO", "MAYBE")
+    with pytest.raises(ValueError):
+        decision_model.score("Is the sky blue?", labels=["yes"])
+
+
+def test_decision_cache(decision_model):
+    decision_model.config_default_internet_search()
+    decision_model.clear_cache()
+    info = decision_model.cache_info
+    first = decision_model.decide("What is the price of Bitcoin right now?")
+    assert decision_model.decide("  what is the price of bitcoin right now ") == first #normalized to the same question
+    assert decision_model.cache_info["hits"] == info["hits"] + 1
+    assert decision_model.cache_info["size"] == 1
+    
+    #scores and other prompts are cached apart
+    decision_model.score("What is the price of Bitcoin right now?")
+    decision_model.decide("What is the price of Bitcoin right now?", temp_prompt="Respond with 'YES' or 'NO'.")
+    assert decision_model.cache_info["size"] == 3
+    decision_model.clear_cache()
+    assert decision_model.cache_info["size"] == 0
+
+
+def test_decision_cache_disabled():
+    with pytest.raises(ValueError):
+        DecisionMaker(cache_size=-1)
+    model = DecisionMaker(cache_size=0)
+    assert model.cache_info is None
+    question = "What is the price of Bitcoin right now?"
+    assert model.decide(question) == model.decide_batch([question])[0]
+    model.clear_cache()
+    del model
+    gc.collect()
+
+
+def test_decision_cache_ttl():
+    model = DecisionMaker(cache_ttl=0.5)
+    model.decide("What is the price of Bitcoin right now?")
+    assert model.cache_info["size"] == 1
+    time.sleep(1)
+    assert model.cache_info["size"] == 0 #expired entries are not counted
+    del model
+    gc.collect()
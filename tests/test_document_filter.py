@@ -1,6 +1,8 @@
 import pytest
 import gc
-from freeai_utils.document_filter import AIDocumentSearcher, DocumentFilter
+import os
+import shutil
+from freeai_utils.document_filter import AIDocumentSearcher, DocumentFilter, SemanticDocumentSearcher
 from haystack import Document
 @pytest.fixture(scope="module")
 def searcher_model():
@@ -27,6 +29,11 @@ def test_model_initialized(searcher_model):
         searcher_model.reader = None
     with pytest.raises(AttributeError, match="Cannot reassign '_reader' after initialization"):
         searcher_model._reader = None
+    
+    with pytest.raises(ValueError):
+        AIDocumentSearcher(auto_init=False, chunk_by="paragraph")
+    with pytest.raises(ValueError):
+        AIDocumentSearcher(auto_init=False, chunk_size=10, chunk_overlap=10)
         
 def test_search_document(searcher_model):
     searcher_model._documents.append(Document(id = "0110", content="Python is a popular programming language known for its readability."))
@@ -34,6 +41,22 @@ def test_search_document(searcher_model):
 
     assert result[0][1] >= 0.6
     assert len(result) == 1
+    assert len(result[0]) == 3
+    assert result[0][2] == "0110" #passages report their source document
+    assert searcher_model.search_document("What is python?", return_pages=True)[0][3] == 1 #and the page they start on
+    assert set(searcher_model.last_timings) == {"retrieve", "read"}
+
+
+def test_semantic_search(tmp_path):
+    model = SemanticDocumentSearcher(device="cpu", chunk_by="sentence", chunk_size=1)
+    docs = [Document(id="a", content="Python is a popular programming language."),
+            Document(id="b", content="The recipe needs flour, sugar and eggs.\fBake it for twenty minutes.")]
+    assert model.index_documents(docs, index_dir=str(tmp_path)) == 3
+    assert model.search("Which programming language is popular?", top_k=1)[0][2] == "a"
+    
+    reloaded = SemanticDocumentSearcher(device="cpu", index_dir=str(tmp_path))
+    text, score, doc_id, page = reloaded.search("How long should it bake?", top_k=1)[0]
+    assert doc_id == "b" and page == 2
 
 def test_filter_initialized(filter_model):
     assert filter_model.documents == {}
@@ -43,4 +66,64 @@ def test_filter_document(filter_model):
     result = filter_model.search_keyword("Text")
     sentences = result["filePath"]
     assert sentences[0] == "Text 1"
-    assert sentences[1] == "Text 2"
\ No newline at end of file
+    assert sentences[1] == "Text 2"
+
+
+def test_filter_phrase(filter_model):
+    filter_model._documents["otherPath"] = "Machine learning rocks. Learning machine parts"
+    result = filter_model.search_keyword("machine learning")
+    assert result == {"otherPath": ["Machine learning rocks"]}
+    del filter_model._documents["otherPath"]
+    assert filter_model.search_keyword("machine learning") == {}
+
+
+def test_filter_refresh(tmp_path):
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample")
+    shutil.copy(os.path.join(sample, "sample.pdf"), tmp_path)
+    model = DocumentFilter(path=str(tmp_path))
+    assert len(model.documents) == 1
+    
+    shutil.copy(os.path.join(sample, "sample3.docx"), tmp_path)
+    os.remove(tmp_path / "sample.pdf")
+    added, changed, removed = model.refresh()
+    assert len(added) == 1 and len(changed) == 0 and len(removed) == 1
+    assert list(model.search_keyword("conclusion").keys()) == added
+    assert model.search_keyword("second line") == {}
+
+
+def test_filter_refresh_retries_failed(tmp_path):
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample")
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    model = DocumentFilter(path=str(tmp_path))
+    assert len(model.documents) == 0
+    
+    #never loaded, so it is retried as a new file
+    shutil.copy(os.path.join(sample, "sample.pdf"), broken)
+    added, changed, removed = model.refresh()
+    assert added == [str(broken).replace('\\', '/')]
+    assert len(model.documents) == 1
+
+
+def test_filter_corpus(tmp_path):
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample")
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    shutil.copy(os.path.join(sample, "sample.pdf"), folder)
+    corpus = str(tmp_path / "corpus.bin")
+    model = DocumentFilter(path=str(folder), corpus_path=corpus)
+    assert os.path.isfile(corpus)
+    
+    reloaded = DocumentFilter(path=str(folder), corpus_path=corpus) #nothing changed, nothing extracted
+    assert dict(reloaded.documents) == dict(model.documents)
+    assert reloaded.search_keyword("second line") == model.search_keyword("second line")
+    
+    shutil.copy(os.path.join(sample, "sample3.docx"), folder)
+    reloaded.refresh()
+    assert len(DocumentFilter(path=str(folder), corpus_path=corpus).documents) == 2
+    assert reloaded.documents.base.file_path == corpus #the saved texts are read back from the file, not kept in memory
+    
+    shutil.copy(os.path.join(sample, "sample2.docx"), folder)
+    restarted = DocumentFilter(path=str(folder), corpus_path=corpus)
+    assert len(restarted._index) == 0 #the change is saved, but indexing still waits for the first search
+    assert restarted.search_keyword("second line") == model.search_keyword("second line")
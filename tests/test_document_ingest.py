@@ -0,0 +1,118 @@
+import pytest
+import os
+import threading
+import time
+import multiprocessing
+import signal
+from freeai_utils import document_ingest
+from freeai_utils.document_ingest import ingest_documents, scan_manifest, diff_manifest, PollingWatcher
+from freeai_utils.extraction_cache import ExtractionCache
+from freeai_utils.pdf_docx_reader import PDF_DOCX_Reader
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample")
+files = [os.path.join(path, name) for name in ("sample.docx", "sample2.docx", "sample3.docx", "sample.pdf", "sample2.pdf", "sample3.pdf")]
+
+def test_ingest_sequential_matches_reader():
+    texts = ingest_documents(files)
+    reader = PDF_DOCX_Reader()
+    assert list(texts.keys()) == files
+    for file in files:
+        assert texts[file] == reader.extract_ordered_text(file)
+
+def test_ingest_parallel_keeps_order():
+    sequential = ingest_documents(files, method="all")
+    parallel = ingest_documents(files, workers=2, chunksize=2, file_timeout=60, method="all")
+    assert list(parallel.keys()) == files
+    assert parallel == sequential
+
+def test_ingest_uses_cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    first = ingest_documents(files, workers=2, cache=cache)
+    assert cache.stats["misses"] == len(files)
+    second = ingest_documents(files, workers=2, cache=cache)
+    assert cache.stats["hits"] == len(files)
+    assert first == second
+
+def test_ingest_skips_failed_files(tmp_path):
+    broken = str(tmp_path / "broken.pdf")
+    with open(broken, "wb") as f:
+        f.write(b"not a pdf")
+    texts = ingest_documents([files[0], broken])
+    assert list(texts.keys()) == [files[0]]
+
+def test_ingest_timeout_off_main_thread(monkeypatch):
+    # from a PollingWatcher thread alarms cannot be used, the timeout still has to hold
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("the patched reader only reaches forked workers")
+    def slow(self, *args, **kwargs):
+        time.sleep(30)
+    monkeypatch.setattr(PDF_DOCX_Reader, "extract_all_text", slow)
+    result = {}
+    start = time.monotonic()
+    thread = threading.Thread(target=lambda: result.update(ingest_documents(files[:2], file_timeout=0.5, method="all")))
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive()
+    assert result == {}
+    assert time.monotonic() - start < 20
+
+
+def test_ingest_stalled_worker_keeps_other_files(tmp_path, monkeypatch):
+    # a file that ignores the alarm, like a parser stuck in native code: only the chunks running it are lost
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("the patched reader only reaches forked workers")
+    extract = PDF_DOCX_Reader.extract_all_text
+    def hang_on_stuck(self, file_path, *args, **kwargs):
+        if "stuck" in os.path.basename(file_path):
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+            time.sleep(60)
+        return extract(self, file_path, *args, **kwargs)
+    monkeypatch.setattr(PDF_DOCX_Reader, "extract_all_text", hang_on_stuck)
+    monkeypatch.setattr(document_ingest, "_STALL_GRACE", 1)
+    stuck = []
+    for name in ("stuck1.pdf", "stuck2.pdf"):
+        with open(files[3], "rb") as src, open(tmp_path / name, "wb") as dst:
+            dst.write(src.read())
+        stuck.append(str(tmp_path / name))
+    # chunks of 2: [stuck1, f0], [f1, f2], [stuck2, f3], [f4, f5], both workers end up stuck before the last chunk starts
+    paths = [stuck[0]] + files[:3] + [stuck[1]] + files[3:]
+    start = time.monotonic()
+    texts = ingest_documents(paths, workers=2, chunksize=2, file_timeout=1, method="all")
+    assert list(texts.keys()) == [files[1], files[2], files[4], files[5]]
+    assert time.monotonic() - start < 30
+
+def test_ingest_invalid_args():
+    with pytest.raises(ValueError):
+        ingest_documents(files, workers=0)
+    with pytest.raises(ValueError):
+        ingest_documents(files, method="unknown")
+
+def test_manifest_diff(tmp_path):
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for name in ("sample.pdf", "sample.docx"):
+        with open(os.path.join(path, name), "rb") as src, open(folder / name, "wb") as dst:
+            dst.write(src.read())
+    old = scan_manifest(str(folder))
+    assert [os.path.basename(p) for p in old] == ["sample.docx", "sample.pdf"]
+    
+    os.remove(folder / "sample.pdf")
+    with open(folder / "new.pdf", "wb") as f:
+        f.write(b"%PDF")
+    with open(folder / "sample.docx", "ab") as f:
+        f.write(b"changed")
+    added, changed, removed = diff_manifest(old, scan_manifest(str(folder)))
+    assert [os.path.basename(p) for p in added] == ["new.pdf"]
+    assert [os.path.basename(p) for p in changed] == ["sample.docx"]
+    assert [os.path.basename(p) for p in removed] == ["sample.pdf"]
+
+def test_polling_watcher():
+    calls = threading.Event()
+    watcher = PollingWatcher(calls.set, interval=0.01)
+    watcher.start()
+    assert watcher.is_running
+    assert calls.wait(5)
+    watcher.stop()
+    assert not watcher.is_running
+    with pytest.raises(ValueError):
+        PollingWatcher(calls.set, interval=0)
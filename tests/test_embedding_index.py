@@ -0,0 +1,64 @@
+import pytest
+import time
+import numpy as np
+from freeai_utils.embedding_index import EmbeddingIndex
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 32))
+    vectors = np.concatenate([c + 0.1 * rng.normal(size=(100, 32)) for c in centers]).astype(np.float32)
+    payloads = [{"id": str(i), "text": f"passage {i}"} for i in range(len(vectors))]
+    return vectors, payloads
+
+def brute_force(vectors, query, top_k):
+    x = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    q = query / np.linalg.norm(query)
+    return [str(i) for i in np.argsort(-(x @ q))[:top_k]]
+
+def test_build_and_search(data):
+    vectors, payloads = data
+    index = EmbeddingIndex.build(vectors, payloads, n_lists=20)
+    assert len(index) == 2000
+    assert index.dim == 32
+    assert index.n_lists == 20
+    
+    rng = np.random.default_rng(2)
+    hits = 0
+    for _ in range(20):
+        query = vectors[rng.integers(len(vectors))] + 0.05 * rng.normal(size=32)
+        expected = brute_force(vectors, query, 5)
+        result = index.search(query, top_k=5, n_probe=4)
+        assert len(result) == 5
+        assert result[0][1] >= result[-1][1]
+        hits += len(set(p["id"] for p, _ in result) & set(expected))
+    assert hits / 100 >= 0.9
+
+def test_exact_with_one_list(data):
+    vectors, payloads = data
+    index = EmbeddingIndex.build(vectors, payloads, n_lists=1)
+    query = vectors[7]
+    assert [p["id"] for p, _ in index.search(query, top_k=3)] == brute_force(vectors, query, 3)
+
+def test_save_and_load(data, tmp_path):
+    vectors, payloads = data
+    index = EmbeddingIndex.build(vectors, payloads)
+    index.save(str(tmp_path / "index"))
+    
+    start = time.perf_counter()
+    loaded = EmbeddingIndex.load(str(tmp_path / "index"))
+    assert time.perf_counter() - start < 0.5
+    assert isinstance(loaded._vectors, np.memmap)
+    assert loaded._vectors.dtype == np.float16
+    
+    query = vectors[42]
+    assert loaded.search(query, top_k=5) == index.search(query, top_k=5)
+    loaded.close()
+
+def test_empty_and_invalid():
+    index = EmbeddingIndex.build(np.zeros((0, 8), dtype=np.float32), [])
+    assert index.search(np.ones(8)) == []
+    with pytest.raises(ValueError):
+        EmbeddingIndex.build(np.ones((2, 8)), [{}])
+    with pytest.raises(ValueError):
+        EmbeddingIndex.build(np.ones((2, 8)), [{}, {}]).search(np.ones(4))
@@ -0,0 +1,60 @@
+import pytest
+import os
+import shutil
+from freeai_utils.extraction_cache import ExtractionCache
+from freeai_utils.pdf_docx_reader import PDF_DOCX_Reader
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample")
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+def test_cache_hit_and_miss(cache_dir):
+    cache = ExtractionCache(cache_dir)
+    reader = PDF_DOCX_Reader(cache=cache)
+    first = reader.extract_ordered_text(os.path.join(path, "sample.pdf"))
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 0
+    
+    second = reader.extract_ordered_text(os.path.join(path, "sample.pdf"))
+    assert second == first
+    assert cache.stats["hits"] == 1
+    assert cache.stats["entries"] == 1
+    
+    # different page range and method are different entries
+    reader.extract_all_text(os.path.join(path, "sample.pdf"))
+    assert cache.stats["entries"] == 2
+
+def test_cache_persists_across_instances(cache_dir):
+    cache = ExtractionCache(cache_dir)
+    expected = PDF_DOCX_Reader(cache=cache).extract_ordered_text(os.path.join(path, "sample3.docx"))
+    cache.flush()
+    
+    reloaded = ExtractionCache(cache_dir)
+    assert reloaded.get(os.path.join(path, "sample3.docx"), "ordered", 0, None) == expected
+    assert reloaded.stats["hits"] == 1
+
+def test_cache_keyed_by_content(cache_dir, tmp_path):
+    cache = ExtractionCache(cache_dir)
+    copy_path = str(tmp_path / "copy.pdf")
+    shutil.copy(os.path.join(path, "sample2.pdf"), copy_path)
+    cache.put(os.path.join(path, "sample2.pdf"), "ordered", 0, None, "stored text")
+    assert cache.get(copy_path, "ordered", 0, None) == "stored text"
+    
+    # changed content must miss
+    with open(copy_path, "ab") as f:
+        f.write(b"\n% changed")
+    assert cache.get(copy_path, "ordered", 0, None) is None
+
+def test_cache_lru_eviction(cache_dir):
+    cache = ExtractionCache(cache_dir, max_bytes=10)
+    cache.put(os.path.join(path, "sample.pdf"), "ordered", 0, None, "aaaaaa")
+    cache.put(os.path.join(path, "sample2.pdf"), "ordered", 0, None, "bbbbbb")
+    assert cache.get(os.path.join(path, "sample.pdf"), "ordered", 0, None) is None
+    assert cache.get(os.path.join(path, "sample2.pdf"), "ordered", 0, None) == "bbbbbb"
+    assert cache.stats["bytes"] <= 10
+
+def test_cache_invalid_size(cache_dir):
+    with pytest.raises(ValueError):
+        ExtractionCache(cache_dir, max_bytes=0)
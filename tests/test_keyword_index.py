@@ -0,0 +1,54 @@
+import pytest
+import re
+import random
+from freeai_utils.keyword_index import KeywordIndex, IndexedDocuments
+
+def scan(documents, keyword):
+    # the full scan DocumentFilter used before the index, results must stay identical
+    results = {}
+    pattern = re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE)
+    for path, text in documents.items():
+        matches = [sentence.strip() for sentence in text.split('.') if pattern.search(sentence)]
+        if matches:
+            results[path] = matches
+    return results
+
+@pytest.fixture
+def documents():
+    docs = IndexedDocuments(KeywordIndex())
+    docs["a.pdf"] = "Python is a language. The python snake is long. Pythonic code is nice"
+    docs["b.docx"] = "Machine learning with Python. Deep machine learning. machine-learning"
+    docs["c.pdf"] = "Nothing to see here"
+    return docs
+
+def test_keyword_search(documents):
+    result = documents.index.search("python")
+    assert list(result.keys()) == ["a.pdf", "b.docx"]
+    assert result["a.pdf"] == ["Python is a language", "The python snake is long"]
+    assert result["b.docx"] == ["Machine learning with Python"]
+
+def test_phrase_search(documents):
+    result = documents.index.search("machine learning")
+    assert result == {"b.docx": ["Machine learning with Python", "Deep machine learning"]}
+    assert documents.index.search("machine-learning") == {"b.docx": ["machine-learning"]}
+    assert documents.index.search("learning machine") == {}
+    assert documents.index.search("missing") == {}
+
+def test_index_follows_changes(documents):
+    documents["c.pdf"] = "Now it talks about python"
+    assert list(documents.index.search("python").keys()) == ["a.pdf", "b.docx", "c.pdf"]
+    del documents["a.pdf"]
+    assert list(documents.index.search("python").keys()) == ["b.docx", "c.pdf"]
+    documents.clear()
+    assert documents == {}
+    assert documents.index.search("python") == {}
+
+def test_index_matches_scan():
+    rng = random.Random(0)
+    words = ["alpha", "Beta", "gamma", "delta", "e-mail", "x_y", "42", "Ωmega"]
+    docs = IndexedDocuments(KeywordIndex())
+    for i in range(30):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(0, 6))) for _ in range(rng.randint(1, 5))]
+        docs[f"file{i}.pdf"] = ". ".join(sentences)
+    for keyword in words + ["alpha beta", "beta gamma delta", "e", "mail", "ωMEGA", "...", ""]:
+        assert docs.index.search(keyword) == scan(docs, keyword), keyword
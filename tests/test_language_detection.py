@@ -54,4 +54,18 @@ def test_mbart():
     assert model.translate(text="Xin chào bạn", tgt_lang='en') == "Hi there."
     assert model.detect_language("Xin chào bạn.") == "vi"
     del model
-    gc.collect()
\ No newline at end of file
+    gc.collect()
+
+
+def test_translate_batch():
+    texts = ["Xin chào bạn", "Bonjour mes amis, comment allez-vous ?", "Xin chào bạn, hôm nay bạn thế nào?"]
+    for model in (M2M100Translator(), MBartTranslator()):
+        batch = model.translate_batch(texts, tgt_lang='en', batch_size=2)
+        assert batch == [model.translate(text=text, tgt_lang='en') for text in texts] #same order as the inputs
+        assert model.translate_batch([], tgt_lang='en') == []
+        mixed = model.translate_batch(["Bonjour mes amis, comment allez-vous ?", "123", ""], tgt_lang='en')
+        assert mixed[0] == model.translate(text=texts[1], tgt_lang='en') and mixed[1:] == ["123", ""] #no language to detect, kept as is
+        with pytest.raises(ValueError):
+            model.translate_batch(texts, tgt_lang='en', batch_size=0)
+        del model
+        gc.collect()
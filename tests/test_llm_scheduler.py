@@ -0,0 +1,50 @@
+import pytest
+import gc
+import threading
+import time
+import asyncio
+from freeai_utils.localLLM import LocalLLM
+from freeai_utils.llm_scheduler import LLMScheduler
+
+@pytest.fixture(scope="module")
+def lc_model():
+    model = LocalLLM()
+    yield model
+    del model
+    gc.collect()
+
+def test_scheduler_batches(lc_model):
+    prompt = "This is a test of connecting. Please just answer \'yes\'"
+    with LLMScheduler(lc_model, max_batch_size=4, max_wait=0.5) as scheduler:
+        results = [None] * 4
+        def call(i):
+            results[i] = scheduler.ask(prompt)
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [content for content, _ in results] == ["yes"] * 4
+        
+        async def gather():
+            return await asyncio.gather(*[scheduler.ask_async(prompt) for _ in range(2)])
+        assert [content for content, _ in asyncio.run(gather())] == ["yes"] * 2
+        
+        metrics = scheduler.metrics
+        assert metrics["requests"] == 6 and metrics["queue_depth"] == 0
+        assert metrics["mean_batch_size"] > 1 and metrics["tokens_per_sec"] > 0
+    with pytest.raises(RuntimeError):
+        scheduler.submit(prompt)
+    with pytest.raises(ValueError):
+        LLMScheduler(lc_model, max_batch_size=0)
+
+
+def test_scheduler_joins_running_batch(lc_model):
+    with LLMScheduler(lc_model, max_batch_size=4, max_wait=0) as scheduler:
+        long = scheduler.submit("Count from 1 to 200, separated by commas.", enable_thinking=False, max_new_tokens=400)
+        time.sleep(1)
+        short = scheduler.submit("This is a test of connecting. Please just answer \'yes\'", enable_thinking=False, max_new_tokens=8)
+        assert short.result()[0] == "yes"
+        assert not long.done() #the short request joined between decoding steps instead of waiting for the long one
+        assert "1, 2, 3" in long.result()[0]
+        assert scheduler.metrics["mean_batch_size"] > 1
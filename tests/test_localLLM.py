@@ -1,6 +1,8 @@
 import pytest
 import gc
-from freeai_utils.localLLM import LocalLLM
+import torch
+from transformers import DynamicCache
+from freeai_utils.localLLM import LocalLLM, PrefixCache
 
 @pytest.fixture(scope="module")
 def lc_model():
@@ -25,4 +27,116 @@ def test_ask(lc_model):
 def test_ask_memories(lc_model):
     lc_model.ask_with_memories("The provided name is An, please remember it.")
     result = lc_model.ask_with_memories("This is a test of memory, please return the provided name.")
-    assert "An" in result[0]
\ No newline at end of file
+    assert "An" in result[0]
+
+
+def test_ask_batch(lc_model):
+    prompts = ["This is a test of connecting. Please just answer \'yes\'", [{"role": "user", "content": "This is a test of connecting. Please just answer \'no\'"}]]
+    results = lc_model.ask_batch(prompts)
+    assert [content for content, _ in results] == ["yes", "no"]
+    assert lc_model.ask_batch(prompts, batch_size=1) == results
+    assert lc_model.ask_batch([]) == []
+
+
+def test_ask_stream(lc_model):
+    prompt = "This is a test of connecting. Please just answer \'yes\'"
+    pieces = list(lc_model.ask_stream(prompt))
+    assert {phase for phase, _ in pieces} <= {"thinking", "answer"}
+    answer = "".join(text for phase, text in pieces if phase == "answer").strip("\n")
+    assert answer == lc_model.ask(prompt)[0]
+
+
+def test_session_cache(lc_model):
+    session = lc_model.new_session(memories_length=2)
+    session.ask("The provided name is An, please remember it.")
+    result = session.ask("This is a test of memory, please return the provided name.")
+    assert "An" in result[0]
+    assert session.last_reused_tokens > 0 #the first turn was not prefilled again
+    assert session.last_prefilled_tokens > 0
+    session.ask("Thanks.")
+    assert len(session.history) == 2
+    session.clear()
+    assert session.history == []
+
+
+def test_generation_settings(lc_model):
+    prompt = "Count from 1 to 10, separated by commas."
+    content, thinking_content = lc_model.ask(prompt, enable_thinking=False, max_new_tokens=64)
+    assert thinking_content == ""
+    assert "1" in content
+    assert len(lc_model.tokenizer(lc_model.ask(prompt, max_new_tokens=8)[1]).input_ids) <= 8
+    assert lc_model.ask(prompt, thinking_budget=0, max_new_tokens=64)[1] in ("", "</think>") #forced before any thinking
+    stopped = lc_model.ask(prompt, enable_thinking=False, max_new_tokens=64, stop_strings=["5"])[0]
+    assert "5" not in stopped and "4" in stopped
+    with pytest.raises(TypeError):
+        lc_model.ask(prompt, temperature=0.1)
+    defaults = lc_model.generation_config
+    lc_model.configure_generation(max_new_tokens=16)
+    assert lc_model.generation_config["max_new_tokens"] == 16
+    lc_model.configure_generation(**defaults)
+
+
+def test_load_modes():
+    estimates = {mode: LocalLLM.estimate_memory("Qwen/Qwen3-0.6B", mode) for mode in ("auto", "bfloat16", "int8")}
+    assert estimates["int8"] < estimates["bfloat16"] <= estimates["auto"]
+    with pytest.raises(ValueError):
+        LocalLLM(load_mode="int4")
+    model = LocalLLM(preferred_device="cpu", load_mode="int8")
+    assert model.load_mode == "int8" and model.device == "cpu"
+    assert model.ask("This is a test of connecting. Please just answer \'yes\'", enable_thinking=False, max_new_tokens=16)[0]
+    del model
+    gc.collect()
+
+
+def test_draft_model():
+    with pytest.raises(ValueError):
+        LocalLLM(draft_model_name="Qwen/Qwen3-0.6B")
+    model = LocalLLM("Qwen/Qwen3-1.7B", draft_model_name="Qwen/Qwen3-0.6B")
+    assert model.draft_model is not None
+    assert model.ask("This is a test of connecting. Please just answer \'yes\'", enable_thinking=False, max_new_tokens=16)[0] == "yes"
+    stats = model.speculative_stats
+    assert stats["generations"] == 1 and stats["draft_tokens"] > 0
+    assert 0.0 <= stats["acceptance_rate"] <= 1.0 and stats["tokens_per_pass"] >= 1.0
+    model.reset_speculative_stats()
+    assert model.speculative_stats["tokens"] == 0
+    del model
+    gc.collect()
+
+
+def _fake_cache(length):
+    cache = DynamicCache()
+    cache.update(torch.zeros(1, 2, length, 4), torch.zeros(1, 2, length, 4), 0)
+    return cache
+
+
+def test_prefix_cache_lookup():
+    prefix_cache = PrefixCache(max_bytes=10 * 1024, block_size=4, min_tokens=8)
+    shared = list(range(20))
+    first = shared + [100, 101, 102]
+    assert prefix_cache.lookup(first)[0] is None
+    prefix_cache.store(first, _fake_cache(len(first)), 0, None) #miss: stored up to the last full block
+    cache, reused, source = prefix_cache.lookup(shared + [200, 201, 202, 203, 204])
+    assert reused == 20 and cache.get_seq_length() == 20
+    prefix_cache.store(shared + [200], cache, reused, source) #partial match of the 20 stored tokens: nothing new to keep
+    assert len(prefix_cache) == 1
+    assert prefix_cache.lookup(list(range(50, 70)))[0] is None
+    assert (prefix_cache.hits, prefix_cache.misses) == (1, 2)
+    memory = prefix_cache.memory
+    cache, reused, source = prefix_cache.lookup(shared[:12] + [300, 301, 302])
+    assert reused == 12
+    prefix_cache.store(shared[:12] + [300], cache, reused, source) #the shared part is a view of the stored 20 tokens
+    assert len(prefix_cache) == 2 and prefix_cache.memory == memory
+    prefix_cache.max_bytes = 0
+    prefix_cache.store(list(range(300, 340)), _fake_cache(40), 0, None) #larger than the cap, not kept
+    assert len(prefix_cache) == 2
+
+
+def test_prefix_cache():
+    model = LocalLLM(prefix_cache_bytes=256 * 1024 ** 2)
+    system = {"role": "system", "content": "You are a test assistant. Follow the instructions exactly and keep every answer to a single word. " * 4}
+    model.ask([system, {"role": "user", "content": "This is a test of connecting. Please just answer \'yes\'"}], enable_thinking=False, max_new_tokens=16)
+    result = model.ask([system, {"role": "user", "content": "This is a test of connecting. Please just answer \'no\'"}], enable_thinking=False, max_new_tokens=16)
+    assert result[0] == "no"
+    assert model.prefix_cache.hits == 1 and model.prefix_cache.reused_tokens > 0
+    del model
+    gc.collect()
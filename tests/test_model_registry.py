@@ -0,0 +1,41 @@
+import gc
+import torch
+from freeai_utils.model_registry import ModelRegistry, get_model_registry
+
+class _Owner:
+    pass
+
+def _linear(calls, size=16):
+    calls.append(size)
+    return torch.nn.Linear(size, size, bias=False) #size * size * 4 bytes
+
+def test_shared_and_released():
+    registry = ModelRegistry()
+    calls = []
+    a, b = _Owner(), _Owner()
+    first = registry.acquire(("linear", "m", "cpu", None), lambda: _linear(calls), a)
+    second = registry.acquire(("linear", "m", "cpu", None), lambda: _linear(calls), b)
+    assert first is second and calls == [16]
+    assert registry.info()[0]["refs"] == 2 and registry.memory == 16 * 16 * 4
+    del a
+    gc.collect()
+    assert registry.info()[0]["refs"] == 1
+    del b
+    gc.collect()
+    assert registry.info() == [] #nothing kept idle without max_memory
+
+def test_lru_eviction():
+    registry = ModelRegistry(max_memory=2 * 16 * 16 * 4)
+    calls = []
+    for name in ("a", "b"):
+        registry.acquire(("linear", name, "cpu", None), lambda: _linear(calls))
+        registry.release(("linear", name, "cpu", None))
+    registry.acquire(("linear", "a", "cpu", None), lambda: _linear(calls)) #a is now the most recent
+    assert calls == [16, 16]
+    registry.acquire(("linear", "c", "cpu", None), lambda: _linear(calls))
+    assert [entry["key"][1] for entry in registry.info()] == ["a", "c"] #b, idle and least recent, was evicted
+    registry.max_memory = None
+    assert [entry["key"][1] for entry in registry.info()] == ["a", "c"] #both still in use
+
+def test_default_registry():
+    assert get_model_registry() is get_model_registry()
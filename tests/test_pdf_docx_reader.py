@@ -88,4 +88,134 @@ def test_docx_reading_s3(reader):
     expected = "Paragraph 1: This is the introduction.\nHeader 1\tHeader 2\nRow 1, Col 1\tRow 1, Col 2\nParagraph 2: Following the first table.\nR1C1\tR1C2\tR1C3\nR2C1\tR2C2\tR2C3\nR3C1\tR3C2\tR3C3\nParagraph 3: Conclusion under the second table."
     print(repr(text))
     print(repr(expected))
-    assert text == expected
\ No newline at end of file
+    assert text == expected
+
+
+def test_page_separator(reader, tmp_path):
+    import fitz
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {i + 1}")
+    file = str(tmp_path / "pages.pdf")
+    doc.save(file)
+    
+    for text in (reader.extract_all_text(file, page_separator="\f"), reader.extract_ordered_text(file, page_separator="\f")):
+        pages = [p.strip() for p in text.split("\f")]
+        assert pages == ["Page number 1", "Page number 2", "Page number 3"]
+    assert "\f" not in reader.extract_ordered_text(file)
+
+
+def test_iter_pages(reader, tmp_path, monkeypatch):
+    import fitz
+    from freeai_utils import pdf_docx_reader
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {i + 1}")
+    file = str(tmp_path / "pages.pdf")
+    doc.save(file)
+    
+    for pages in (reader.iter_pages(file), reader.iter_ordered_pages(file)):
+        assert [(i, text.strip()) for i, text in pages] == [(0, "Page number 1"), (1, "Page number 2"), (2, "Page number 3")]
+    assert [i for i, _ in reader.iter_pages(file, first_page=1, last_page=1)] == [1]
+    assert list(reader.iter_pages(os.path.join(path, "sample.docx"))) == [(0, reader.extract_all_text(os.path.join(path, "sample.docx")))]
+    
+    # a backend failing mid-file hands over to the next one from the page it stopped at
+    def broken(file_path, fp, lp):
+        yield fp, "from broken"
+        raise RuntimeError("page cannot be parsed")
+    monkeypatch.setattr(pdf_docx_reader, "_ALL_TEXT_BACKENDS", (("broken", broken), ("fitz", pdf_docx_reader._fitz_pages)))
+    assert [(i, text.strip()) for i, text in reader.iter_pages(file)] == [(0, "from broken"), (1, "Page number 2"), (2, "Page number 3")]
+
+
+def test_backends(reader, tmp_path):
+    import fitz
+    doc = fitz.open()
+    for i in range(10):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {i + 1}")
+    file = str(tmp_path / "pages.pdf")
+    doc.save(file)
+    
+    expected = [f"Page number {i + 1}" for i in range(10)]
+    for backend in ("pymupdf", "pypdf", "pdfplumber", "auto"):
+        assert [text.strip() for _, text in reader.iter_pages(file, backend=backend)] == expected
+        text = PDF_DOCX_Reader(backend=backend).extract_ordered_text(file, page_separator="\f")
+        assert [p.strip() for p in text.split("\f")] == expected
+    with pytest.raises(ValueError):
+        reader.extract_all_text(file, backend="tesseract")
+    with pytest.raises(ValueError):
+        PDF_DOCX_Reader(backend="fitz")
+
+
+def test_parallel_pages(reader, tmp_path):
+    import fitz
+    doc = fitz.open()
+    for i in range(20):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page number {i + 1}")
+    file = str(tmp_path / "pages.pdf")
+    doc.save(file)
+    
+    for extract in (reader.extract_all_text, reader.extract_ordered_text):
+        assert extract(file, page_separator="\f", workers=2) == extract(file, page_separator="\f")
+    assert [i for i, _ in reader.iter_ordered_pages(file, first_page=2, last_page=18, workers=3)] == list(range(2, 19))
+    with pytest.raises(ValueError):
+        reader.extract_all_text(file, workers=0)
+
+
+def test_extract_images_dedup(reader, tmp_path):
+    import fitz
+    import json
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    logo.clear_with(200)
+    other = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+    other.clear_with(50)
+    doc = fitz.open()
+    for i in range(5):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(0, 0, 50, 50), pixmap=logo) #same bytes, new object on every page
+        if i == 2:
+            page.insert_image(fitz.Rect(100, 100, 150, 150), pixmap=other)
+    file = str(tmp_path / "images.pdf")
+    doc.save(file)
+    
+    for writers in (0, 2):
+        folder = tmp_path / f"out{writers}"
+        assert reader.extract_images(file, str(folder), writers=writers, max_buffer_bytes=16, manifest=True) == 6
+        manifest = json.loads((folder / "manifest.json").read_text())
+        assert len(manifest["files"]) == 2
+        assert sorted(p.name for p in folder.iterdir()) == sorted(list(manifest["files"]) + ["manifest.json"])
+        logo_file = manifest["pages"]["1"][0]
+        assert manifest["files"][logo_file]["pages"] == [1, 2, 3, 4, 5]
+        assert len(manifest["pages"]["3"]) == 2 and manifest["pages"]["3"][0] == logo_file
+    
+    folder = tmp_path / "plain"
+    assert reader.extract_images(file, str(folder)) == 6
+    assert not (folder / "manifest.json").exists() #only written on request
+
+
+def test_extract_images_keeps_extraction_error(reader, tmp_path, monkeypatch):
+    import fitz
+    from freeai_utils import pdf_docx_reader
+    doc = fitz.open()
+    for shade in (50, 200):
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+        pixmap.clear_with(shade)
+        doc.new_page().insert_image(fitz.Rect(0, 0, 50, 50), pixmap=pixmap)
+    file = str(tmp_path / "images.pdf")
+    doc.save(file)
+    
+    def fail_write(path, data):
+        raise OSError("disk full")
+    extract_image = fitz.Document.extract_image
+    def fail_second(self, xref):
+        if getattr(fail_second, "called", False):
+            raise RuntimeError("broken image")
+        fail_second.called = True
+        return extract_image(self, xref)
+    monkeypatch.setattr(pdf_docx_reader, "_write_file", fail_write)
+    monkeypatch.setattr(fitz.Document, "extract_image", fail_second)
+    with pytest.raises(RuntimeError, match="broken image"):
+        reader.extract_images(file, str(tmp_path / "out"), writers=1)